@@ -6,10 +6,14 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from .forms import CustomUserCreationForm, CustomUserUpdateForm 
 from django.db import IntegrityError
+from django.db.models import Prefetch
 
-from stores.models import Order
+from stores.models import Order, OrderItem
 from framings.models import CustomFrameOrder 
 from plaques.models import CustomPlaqueOrder
+from core.models import OrderLedgerEntry
+from core.ledger import status_counts
+from core.pagination import paginate_keyset
 
 # View สำหรับหน้าล็อกอิน
 def login_view(request):
@@ -85,48 +89,74 @@ def change_password_view(request):
 
     return render(request, 'accounts/change_password.html', {'form': form})
 
+# ประเภทใน URL -> ประเภทในสมุดรวมออเดอร์
+HISTORY_ORDER_TYPES = {'products': 'product', 'framings': 'framing', 'plaques': 'plaque'}
+
+# แท็บสถานะของหน้าประวัติ (เรียงตามที่แสดง)
+HISTORY_STATUS_LABELS = {
+    'all': 'ทั้งหมด',
+    'pending': 'รอตรวจสอบชำระเงิน',
+    'processing': 'กำลังผลิต/เตรียมพัสดุ',
+    'shipped': 'จัดส่งแล้ว',
+    'cancelled': 'ยกเลิก',
+}
+
 @login_required
 def order_dashboard(request):
-    """แสดงหน้า Dashboard ให้เลือกประเภท"""
-    return render(request, 'accounts/order_dashboard.html')
+    """แสดงหน้า Dashboard ให้เลือกประเภท พร้อมออเดอร์ล่าสุดทุกประเภทรวมกัน"""
+    # อ่านจากสมุดรวมออเดอร์ query เดียว แทนการดึงสามตารางมาเรียงรวมกัน
+    entries = OrderLedgerEntry.objects.filter(user=request.user)
+    page = paginate_keyset(request, entries, 10)
+    return render(request, 'accounts/order_dashboard.html', {'entries': page.object_list, 'page_obj': page})
 
 @login_required
 def order_history(request, order_type):
-    context = {}
     current_status = request.GET.get('status', 'all')
     
     # 1. เช็คประเภทและดึงข้อมูล (แก้ชื่อ field user/customer ให้ตรง database)
     if order_type == 'products':
         page_title = "รายการสั่งซื้อสินค้า"
         template_name = 'stores/order_history_products.html'
-        # สินค้าปกติใช้ 'customer'
-        orders = Order.objects.filter(customer=request.user).order_by('-created_at')
+        # สินค้าปกติใช้ 'customer' และดึงรายการสินค้า + สินค้าของทุกออเดอร์ในหน้าพร้อมกัน (ไม่ query ทีละออเดอร์)
+        orders = Order.objects.filter(customer=request.user).prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.select_related('product'))
+        )
         
     elif order_type == 'framings':
         page_title = "รายการสั่งทำกรอบรูป"
         template_name = 'framings/order_history_framings.html'
         # กรอบรูปใช้ 'user' (ตาม Error log)
-        orders = CustomFrameOrder.objects.filter(user=request.user).order_by('-created_at')
+        orders = CustomFrameOrder.objects.filter(user=request.user)
         
     elif order_type == 'plaques':
         page_title = "รายการสั่งทำป้ายหินอ่อน"
         template_name = 'plaques/order_history_plaques.html'
         # ป้ายหินอ่อนใช้ 'user' (ตาม Error log)
-        orders = CustomPlaqueOrder.objects.filter(user=request.user).order_by('-created_at')
+        orders = CustomPlaqueOrder.objects.filter(user=request.user)
         
     else:
         # ถ้า URL ผิด ให้กลับไปหน้า Dashboard
         return redirect('order_dashboard')
 
-    # 2. Logic กรองสถานะ (เหมือนเดิม)
+    # 2. Logic กรองสถานะ (เทียบตรงตัว ใช้ index ได้ สถานะที่ไม่รู้จักแสดงทั้งหมด)
+    if current_status not in HISTORY_STATUS_LABELS:
+        current_status = 'all'
     if current_status != 'all':
-        orders = orders.filter(status__iexact=current_status)
+        orders = orders.filter(status=current_status)
+
+    # 3. แบ่งหน้าด้วย keyset (created_at, id) และนับจำนวนต่อสถานะจากสมุดรวมออเดอร์ query เดียว
+    page = paginate_keyset(request, orders, 20)
+    counts = status_counts(request.user)[HISTORY_ORDER_TYPES[order_type]]
 
     context = {
-        'orders': orders,
+        'orders': page.object_list,
+        'page_obj': page,
         'page_title': page_title,
         'order_type': order_type,
-        'current_status': current_status
+        'current_status': current_status,
+        'status_tabs': [
+            (key, label, counts.get(key, 0)) for key, label in HISTORY_STATUS_LABELS.items()
+        ],
     }
 
     return render(request, template_name, context)
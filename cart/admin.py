@@ -2,5 +2,11 @@ from django.contrib import admin
 from .models import Cart, CartItem
 
 # ลงทะเบียนให้ Model ไปโผล่ในหน้า Admin
-admin.site.register(Cart)
+@admin.register(Cart)
+class CartAdmin(admin.ModelAdmin):
+    # subtotal/item_count อ่านจากยอดสรุปบนแถวตะกร้า ไม่ต้องนับรายการสินค้าทีละตะกร้า
+    list_display = ('id', 'user', 'session_key', 'item_count', 'subtotal', 'updated_at')
+    list_select_related = ('user',)
+    readonly_fields = ('subtotal', 'item_count')
+
 admin.site.register(CartItem)
\ No newline at end of file
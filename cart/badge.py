@@ -0,0 +1,85 @@
+"""
+จำนวนสินค้าในตะกร้าสำหรับ badge บน navbar
+
+เก็บผลรวมจำนวนสินค้าไว้ใน session (ซึ่งถูกโหลดอยู่แล้วทุก request ที่ล็อกอิน)
+view ที่แก้ตะกร้า (เพิ่ม/แก้จำนวน/ลบ/สั่งซื้อ) เป็นคนอัปเดตค่านี้
+context processor จึงไม่ต้อง query ตะกร้าทุกหน้า
+ถ้ายังไม่มีค่าใน session (เพิ่งล็อกอิน) จะนับจากฐานข้อมูล 1 ครั้งแล้วเก็บไว้
+
+ค่าใน session เก็บคู่กับเลขเวอร์ชันตะกร้าของเจ้าของ (user หรือ session ของ guest) ที่อยู่ใน cache
+ตะกร้าถูกแก้จากที่อื่น (อีกอุปกรณ์ของ user เดียวกัน, สินค้าถูกลบแล้วรายการในตะกร้าหายตาม CASCADE)
+ก็แค่ bump เวอร์ชัน ค่าใน session ทุกอันจะไม่ตรงแล้วนับใหม่เองในหน้าถัดไป
+"""
+from django.db.models import Sum
+
+from core.cache import VersionedCache
+
+from .models import Cart
+
+SESSION_KEY = 'cart_item_count'
+
+
+def _versions(user_id=None, session_key=None):
+    owner = f'user:{user_id}' if user_id else f'session:{session_key}'
+    return VersionedCache(f'cart-badge:{owner}')
+
+
+def _request_versions(request):
+    if request.user.is_authenticated:
+        return _versions(user_id=request.user.pk)
+    return _versions(session_key=request.session.session_key)
+
+
+def bump(user_id=None, session_key=None):
+    """ตะกร้าของเจ้าของนี้เปลี่ยน: จำนวนที่ทุก session ของเจ้าของนี้เก็บไว้ใช้ไม่ได้แล้ว"""
+    _versions(user_id, session_key).bump()
+
+
+def count_items(request):
+    """อ่านจากยอดสรุปบนแถวตะกร้า (Cart.item_count) ไม่ต้องไล่รายการสินค้า"""
+    if request.user.is_authenticated:
+        carts = Cart.objects.filter(user=request.user)
+    elif request.session.session_key:
+        carts = Cart.objects.filter(session_key=request.session.session_key, user__isnull=True)
+    else:
+        return 0
+    return carts.aggregate(total=Sum('item_count'))['total'] or 0
+
+
+def store(request, count):
+    """เก็บจำนวนที่รู้อยู่แล้ว (เช่น Cart.item_count หลัง refresh_summary) ลง session"""
+    value = {'count': count, 'version': _request_versions(request).version()}
+    if request.session.get(SESSION_KEY) != value:
+        request.session[SESSION_KEY] = value
+    return count
+
+
+def changed(request, count):
+    """ตะกร้าของ request นี้เพิ่งถูกแก้: ให้ session อื่นของเจ้าของเดียวกันนับใหม่ แล้วเก็บจำนวนใหม่ของ request นี้"""
+    _request_versions(request).bump()
+    return store(request, count)
+
+
+def refresh(request):
+    """นับใหม่แล้วเก็บลง session (เรียกหลังแก้ตะกร้า)"""
+    return store(request, count_items(request))
+
+
+def clear(request):
+    """ตะกร้าว่างแล้ว (เช่น หลังสั่งซื้อ)"""
+    changed(request, 0)
+
+
+def invalidate(request):
+    """ล้างค่าใน session ให้นับใหม่ตอนที่ต้องแสดง badge ครั้งถัดไป"""
+    request.session.pop(SESSION_KEY, None)
+
+
+def get_count(request):
+    # ยังไม่มี session ก็ยังไม่มีตะกร้า ไม่ต้องนับ และไม่สร้าง session ให้เปล่าๆ
+    if not request.user.is_authenticated and not request.session.session_key:
+        return 0
+    value = request.session.get(SESSION_KEY)
+    if isinstance(value, dict) and value.get('version') == _request_versions(request).version():
+        return value['count']
+    return refresh(request)
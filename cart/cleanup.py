@@ -0,0 +1,98 @@
+"""
+ลบตะกร้าของ Guest ที่ไม่มีใครใช้แล้ว และ session ที่หมดอายุ
+
+ตะกร้าของ Guest ผูกกับ session_key ถ้า session หมดอายุหรือถูกลบไปแล้ว
+ก็ไม่มีใครเปิดตะกร้าใบนั้นได้อีก (ตะกร้าที่ล็อกอินแล้วจะถูกรวมเข้าตะกร้าของ User ไปแล้ว)
+
+ลบทีละชุดเล็กๆ ตาม primary key (แต่ละชุดเป็น transaction สั้นๆ ของตัวเอง)
+แล้วพักระหว่างชุด จึงไม่ถือ lock นานจนหน้าเว็บที่ใช้ตะกร้า/session ต้องรอ
+"""
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.db import connection
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import Cart
+
+# session engine ที่เก็บ session ในตาราง django_session (ตรวจ session ที่ยังใช้อยู่ได้ด้วย SQL)
+DB_SESSION_ENGINES = (
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+)
+
+
+def uses_db_sessions():
+    return settings.SESSION_ENGINE in DB_SESSION_ENGINES
+
+
+def stale_guest_carts(now=None):
+    """ตะกร้าที่ไม่มีเจ้าของ และไม่มี session ที่ยังไม่หมดอายุอ้างถึง"""
+    now = now or timezone.now()
+    carts = Cart.objects.filter(user__isnull=True)
+    if uses_db_sessions():
+        live = Session.objects.filter(session_key=OuterRef('session_key'), expire_date__gt=now)
+        return carts.filter(~Exists(live))
+    # session เก็บที่อื่น (เช่น cache) ใช้อายุของตะกร้าเทียบกับอายุ cookie แทน
+    return carts.filter(updated_at__lt=now - timedelta(seconds=settings.SESSION_COOKIE_AGE))
+
+
+def expired_sessions(now=None):
+    return Session.objects.filter(expire_date__lte=now or timezone.now())
+
+
+def average_row_bytes(model):
+    """ขนาดเฉลี่ยต่อแถวของตาราง (อ่านจากสถิติของ MySQL) ฐานข้อมูลอื่นคืนค่า None"""
+    if connection.vendor != 'mysql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT avg_row_length FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() AND table_name = %s",
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def delete_in_batches(queryset, batch_size=500, pause=0.2, dry_run=False):
+    """
+    ลบแถวใน queryset ทีละ batch_size แถว (เรียงตาม pk) พัก pause วินาทีระหว่างชุด
+    คืนค่า Counter ของจำนวนแถวที่ลบต่อ model (รวมแถวที่ถูกลบตาม CASCADE)
+
+    ตอนลบใช้เงื่อนไขของ queryset ซ้ำอีกรอบ แถวที่กลับมาใช้งานหลังอ่าน pk (เช่น session ถูกต่ออายุ) จึงไม่ถูกลบ
+    """
+    model = queryset.model
+    deleted = Counter()
+    last_pk = None
+    while True:
+        page = queryset.order_by('pk')
+        if last_pk is not None:
+            page = page.filter(pk__gt=last_pk)
+        pks = list(page.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            break
+        last_pk = pks[-1]
+
+        if dry_run:
+            deleted[model._meta.label] += len(pks)
+            continue
+
+        _, per_model = queryset.filter(pk__in=pks).delete()
+        deleted.update(per_model)
+        if len(pks) == batch_size and pause:
+            time.sleep(pause)
+    return deleted
+
+
+def purge(batch_size=500, pause=0.2, dry_run=False, now=None):
+    """ลบตะกร้า Guest ที่ค้าง (พร้อมรายการสินค้า) แล้วลบ session ที่หมดอายุ"""
+    now = now or timezone.now()
+    deleted = delete_in_batches(stale_guest_carts(now), batch_size, pause, dry_run)
+    if uses_db_sessions():
+        deleted += delete_in_batches(expired_sessions(now), batch_size, pause, dry_run)
+    return deleted
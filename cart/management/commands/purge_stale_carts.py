@@ -0,0 +1,47 @@
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+
+from cart.cleanup import average_row_bytes, purge
+from cart.models import Cart, CartItem
+
+
+class Command(BaseCommand):
+    help = (
+        "ลบตะกร้าของ Guest ที่ session หมดอายุแล้ว (พร้อมรายการสินค้า) และลบ session ที่หมดอายุ "
+        "ทำทีละชุดแล้วพักระหว่างชุด ตั้งเป็น cron รันวันละครั้งได้"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="จำนวนแถวที่ลบต่อรอบ")
+        parser.add_argument('--sleep', type=float, default=0.2, help="วินาทีที่พักระหว่างรอบ")
+        parser.add_argument('--dry-run', action='store_true', help="นับอย่างเดียว ไม่ลบ (ไม่รวมแถวที่จะถูกลบตาม CASCADE)")
+
+    def handle(self, *args, **options):
+        # อ่านขนาดต่อแถวก่อนลบ (สถิติของตารางจะเปลี่ยนหลังลบ)
+        models = {model._meta.label: model for model in (Cart, CartItem, Session)}
+        row_bytes = {label: average_row_bytes(model) for label, model in models.items()}
+        deleted = purge(
+            batch_size=options['batch_size'],
+            pause=options['sleep'],
+            dry_run=options['dry_run'],
+        )
+
+        total_rows = 0
+        total_bytes = 0
+        for label, rows in sorted(deleted.items()):
+            model = models[label]
+            size = row_bytes[label]
+            total_rows += rows
+            if size is None:
+                self.stdout.write(f"{model._meta.db_table}: {rows:,} แถว")
+            else:
+                total_bytes += rows * size
+                self.stdout.write(f"{model._meta.db_table}: {rows:,} แถว (~{rows * size:,} bytes)")
+
+        summary = f"รวม {total_rows:,} แถว"
+        if total_bytes:
+            summary += f" ประมาณ {total_bytes:,} bytes (InnoDB จะนำพื้นที่กลับมาใช้กับแถวใหม่ ถ้าต้องการคืนให้ระบบให้รัน OPTIMIZE TABLE)"
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"dry-run: จะลบ{summary}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"ลบแล้ว{summary}"))
@@ -0,0 +1,66 @@
+"""
+รวมตะกร้าของ Guest เข้ากับตะกร้าของ User ตอนล็อกอิน
+
+ตอนล็อกอิน Django เปลี่ยน session key ใหม่ (cycle_key) ตะกร้าที่ผูกกับ session เดิม
+จึงหาด้วย session_key ไม่เจออีก เลยเก็บ id ของตะกร้า Guest ไว้ใน session แทน
+(ข้อมูลใน session ยังอยู่หลัง cycle_key) แล้วรวมเข้าตะกร้าของ User ใน signal user_logged_in
+
+สินค้าที่มีอยู่แล้วในตะกร้าของ User จะถูกบวกจำนวนเพิ่ม ทั้งหมดทำด้วย bulk upsert ครั้งเดียว
+(อาศัย unique constraint ของ cart + product) ไม่ต้อง get_or_create ทีละรายการ
+"""
+from django.db import connection, transaction
+
+from .models import Cart, CartItem
+
+SESSION_KEY = 'guest_cart_id'
+
+
+def remember_guest_cart(request, cart):
+    if request.session.get(SESSION_KEY) != cart.pk:
+        request.session[SESSION_KEY] = cart.pk
+
+
+def _upsert_target():
+    # MySQL ใช้ ON DUPLICATE KEY UPDATE ซึ่งระบุคอลัมน์ไม่ได้ ส่วน SQLite/PostgreSQL ต้องระบุ
+    if connection.features.supports_update_conflicts_with_target:
+        return ['cart', 'product']
+    return None
+
+
+def merge_carts(guest, cart):
+    """ย้ายรายการจากตะกร้า guest เข้าตะกร้า cart (บวกจำนวนถ้าซ้ำ) แล้วลบตะกร้า guest ทิ้ง"""
+    with transaction.atomic():
+        lines = dict(CartItem.objects.filter(cart=guest).values_list('product_id', 'quantity'))
+        if lines:
+            existing = dict(
+                CartItem.objects
+                .select_for_update()
+                .filter(cart=cart, product_id__in=lines)
+                .values_list('product_id', 'quantity')
+            )
+            CartItem.objects.bulk_create(
+                [
+                    CartItem(cart=cart, product_id=product_id, quantity=existing.get(product_id, 0) + quantity)
+                    for product_id, quantity in lines.items()
+                ],
+                update_conflicts=True,
+                update_fields=['quantity'],
+                unique_fields=_upsert_target(),
+            )
+        guest.delete()
+        cart.refresh_summary()
+    return cart
+
+
+def merge_guest_cart(request, user):
+    """เรียกหลังล็อกอิน: รวมตะกร้าที่ใช้ตอนเป็น Guest (ถ้ามี) เข้าตะกร้าของ user"""
+    cart_id = request.session.pop(SESSION_KEY, None)
+    if cart_id is None:
+        return None
+
+    guest = Cart.objects.filter(pk=cart_id, user__isnull=True).first()
+    if guest is None:
+        return None
+
+    cart, _ = Cart.objects.get_or_create(user=user)
+    return merge_carts(guest, cart)
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:12
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_summary(apps, schema_editor):
+    Cart = apps.get_model('cart', 'Cart')
+    CartItem = apps.get_model('cart', 'CartItem')
+    money = models.DecimalField(max_digits=12, decimal_places=2)
+    items = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+    Cart.objects.update(
+        subtotal=Coalesce(
+            Subquery(items.annotate(total=Sum(F('quantity') * F('product__price'), output_field=money)).values('total'), output_field=money),
+            Value(Decimal('0')), output_field=money,
+        ),
+        item_count=Coalesce(
+            Subquery(items.annotate(total=Sum('quantity')).values('total'), output_field=models.IntegerField()),
+            0,
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0003_cart_session_key_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(backfill_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:14
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Min, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def merge_duplicates(apps, schema_editor):
+    """รวมตะกร้าซ้ำของ user เดียวกันเข้าใบที่เก่าที่สุด และรวมสินค้าซ้ำในตะกร้าเดียวกันเป็นแถวเดียว"""
+    Cart = apps.get_model('cart', 'Cart')
+    CartItem = apps.get_model('cart', 'CartItem')
+
+    duplicate_carts = (
+        Cart.objects.filter(user__isnull=False)
+        .values('user').annotate(carts=Count('pk'), keep=Min('pk'))
+        .filter(carts__gt=1).order_by()
+    )
+    touched = set()
+    for row in duplicate_carts:
+        CartItem.objects.filter(cart__user=row['user']).exclude(cart=row['keep']).update(cart=row['keep'])
+        Cart.objects.filter(user=row['user']).exclude(pk=row['keep']).delete()
+        touched.add(row['keep'])
+
+    duplicate_items = (
+        CartItem.objects
+        .values('cart', 'product').annotate(rows=Count('pk'), keep=Min('pk'), quantity_sum=Sum('quantity'))
+        .filter(rows__gt=1).order_by()
+    )
+    for row in duplicate_items:
+        CartItem.objects.filter(pk=row['keep']).update(quantity=row['quantity_sum'])
+        CartItem.objects.filter(cart=row['cart'], product=row['product']).exclude(pk=row['keep']).delete()
+        touched.add(row['cart'])
+
+    if touched:
+        money = models.DecimalField(max_digits=12, decimal_places=2)
+        items = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+        Cart.objects.filter(pk__in=touched).update(
+            subtotal=Coalesce(
+                Subquery(items.annotate(total=Sum(F('quantity') * F('product__price'), output_field=money)).values('total'), output_field=money),
+                Value(Decimal('0')), output_field=money,
+            ),
+            item_count=Coalesce(
+                Subquery(items.annotate(total=Sum('quantity')).values('total'), output_field=models.IntegerField()),
+                0,
+            ),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0004_cart_summary'),
+        ('stores', '0010_product_image_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cart',
+            constraint=models.UniqueConstraint(fields=('user',), name='cart_unique_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('cart', 'product'), name='cartitem_unique_product'),
+        ),
+    ]
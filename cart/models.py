@@ -1,15 +1,72 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import DecimalField, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings  # ✅ 1. import settings มาแทน
 from stores.models import Product 
 
+# ยอดของแต่ละรายการ (จำนวน x ราคาสินค้าปัจจุบัน) คำนวณในฐานข้อมูล
+LINE_TOTAL = F('quantity') * F('product__price')
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+class CartItemQuerySet(models.QuerySet):
+    def totals(self):
+        """{'subtotal': ยอดรวม, 'item_count': จำนวนชิ้นรวม} ด้วย aggregate เดียว"""
+        return self.aggregate(
+            subtotal=Coalesce(Sum(LINE_TOTAL, output_field=MONEY), Value(Decimal('0')), output_field=MONEY),
+            item_count=Coalesce(Sum('quantity'), 0),
+        )
+
+
+class CartQuerySet(models.QuerySet):
+    def with_totals(self):
+        """แนบ total_price / total_quantity ของแต่ละตะกร้า (คำนวณจากรายการจริงใน SQL)"""
+        return self.annotate(
+            total_price=Coalesce(
+                Sum(F('items__quantity') * F('items__product__price'), output_field=MONEY),
+                Value(Decimal('0')), output_field=MONEY,
+            ),
+            total_quantity=Coalesce(Sum('items__quantity'), 0),
+        )
+
+    def refresh_summary(self):
+        """อัปเดต subtotal/item_count ของทุกตะกร้าใน queryset ด้วย UPDATE เดียว"""
+        items = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+        return self.update(
+            subtotal=Coalesce(
+                Subquery(items.annotate(total=Sum(LINE_TOTAL, output_field=MONEY)).values('total'), output_field=MONEY),
+                Value(Decimal('0')), output_field=MONEY,
+            ),
+            item_count=Coalesce(
+                Subquery(items.annotate(total=Sum('quantity')).values('total'), output_field=IntegerField()),
+                0,
+            ),
+        )
+
+
 class Cart(models.Model):
     # ✅ 2. ใช้ settings.AUTH_USER_MODEL แทน User ตรงๆ
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
     
-    session_key = models.CharField(max_length=40, null=True, blank=True) 
+    session_key = models.CharField(max_length=40, null=True, blank=True, db_index=True)
     date_created = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # ยอดสรุปของตะกร้า (อัปเดตทุกครั้งที่ตะกร้าเปลี่ยน ด้วย Cart.objects.filter(...).refresh_summary())
+    # ให้หน้ารายการและ badge อ่านได้โดยไม่ต้องไล่รายการสินค้า
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    item_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = CartQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # User หนึ่งคนมีตะกร้าใบเดียว (ตะกร้าของ Guest มี user เป็น NULL จึงไม่ชนกัน)
+            models.UniqueConstraint(fields=['user'], name='cart_unique_user'),
+        ]
+
     def __str__(self):
         # ตรงนี้ต้องระวังนิดนึง ถ้า user เป็น None จะ error ถ้าเรียก .username
         # ใช้ logic นี้ปลอดภัยกว่าครับ
@@ -17,12 +74,24 @@ class Cart(models.Model):
         return f"Cart {self.id} ({username})"
 
     def get_total_price(self):
-        return sum(item.total_price() for item in self.items.all())
+        return self.items.totals()['subtotal']
+
+    def refresh_summary(self):
+        Cart.objects.filter(pk=self.pk).refresh_summary()
+        self.refresh_from_db(fields=['subtotal', 'item_count'])
 
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
+
+    objects = CartItemQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # สินค้าเดียวกันในตะกร้าเดียวกันมีได้แถวเดียว (ใช้เป็นเป้าหมายของ upsert ตอนรวมตะกร้า)
+            models.UniqueConstraint(fields=['cart', 'product'], name='cartitem_unique_product'),
+        ]
     
     def total_price(self):
         return self.quantity * self.product.price
\ No newline at end of file
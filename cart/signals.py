@@ -0,0 +1,55 @@
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from stores.models import Product
+
+from . import badge, merge
+from .models import Cart
+
+
+# หลังล็อกอิน รวมตะกร้าที่ใช้ตอนเป็น guest เข้าตะกร้าของ user แล้วให้ badge นับใหม่
+@receiver(user_logged_in)
+def merge_guest_cart(sender, request, user, **kwargs):
+    if request is None:
+        return
+    if merge.merge_guest_cart(request, user) is not None:
+        # อุปกรณ์อื่นที่ล็อกอิน user นี้อยู่ต้องนับใหม่ด้วย
+        badge.bump(user_id=user.pk)
+    badge.invalidate(request)
+
+
+# ราคาสินค้าเปลี่ยน: คำนวณยอดสรุปของตะกร้าที่มีสินค้านี้ใหม่
+# (อ่านราคาเดิมก่อนบันทึก แก้ชื่อ/สต็อก/รูปจึงไม่ต้องคำนวณตะกร้าใหม่)
+@receiver(pre_save, sender=Product)
+def remember_previous_price(sender, instance, update_fields=None, **kwargs):
+    instance._previous_price = None
+    if instance.pk is None or (update_fields is not None and 'price' not in update_fields):
+        return
+    instance._previous_price = sender.objects.filter(pk=instance.pk).values_list('price', flat=True).first()
+
+
+@receiver(post_save, sender=Product)
+def refresh_carts_on_price_change(sender, instance, created=False, **kwargs):
+    previous = getattr(instance, '_previous_price', None)
+    if created or previous is None or previous == instance.price:
+        return
+    transaction.on_commit(lambda: Cart.objects.filter(items__product=instance.pk).refresh_summary())
+
+
+# สินค้าถูกลบ (รายการในตะกร้าถูกลบตาม CASCADE) จำตะกร้าที่เกี่ยวข้องไว้ก่อน แล้วคำนวณใหม่หลัง commit
+# และ bump เวอร์ชัน badge ของเจ้าของตะกร้าเหล่านั้น (จำนวนที่ค้างใน session ของแต่ละคนจะถูกนับใหม่)
+@receiver(pre_delete, sender=Product)
+def refresh_carts_on_product_delete(sender, instance, **kwargs):
+    carts = list(
+        Cart.objects.filter(items__product=instance.pk).values_list('pk', 'user_id', 'session_key').distinct()
+    )
+    if carts:
+        transaction.on_commit(lambda: _carts_lost_items(carts))
+
+
+def _carts_lost_items(carts):
+    Cart.objects.filter(pk__in=[pk for pk, _user_id, _session_key in carts]).refresh_summary()
+    for _pk, user_id, session_key in carts:
+        badge.bump(user_id=user_id, session_key=session_key)
@@ -16,4 +16,9 @@ urlpatterns = [
     
     # D (Delete) - ลบรายการสินค้าออกจากตะกร้า
     path('remove/<int:item_id>/', views.remove_from_cart, name='remove_from_cart'),
-]
\ No newline at end of file
+
+    # JSON API สำหรับแก้ตะกร้าด้วย fetch (ตอบกลับรายการที่เปลี่ยน + ยอดรวม + badge)
+    path('api/add/<int:product_id>/', views.api_add_to_cart, name='api_add_to_cart'),
+    path('api/update/<int:item_id>/', views.api_update_cart, name='api_update_cart'),
+    path('api/remove/<int:item_id>/', views.api_remove_from_cart, name='api_remove_from_cart'),
+]
@@ -1,3 +1,6 @@
+from functools import wraps
+
+from django.http import Http404, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.decorators.http import require_POST
 from django.contrib import messages
@@ -5,6 +8,7 @@ from django.contrib.auth.decorators import login_required
 
 from stores.models import Product 
 from .models import Cart, CartItem 
+from . import badge, merge
 
 # --- ฟังก์ชันช่วยเหลือ (Helper Function) ---
 def _get_or_create_cart(request):
@@ -15,14 +19,8 @@ def _get_or_create_cart(request):
     """
     # 1. กรณีลูกค้า Login อยู่
     if request.user.is_authenticated:
-        # ค้นหาตะกร้าของ User นี้
-        # (ใช้ .filter().first() เพื่อป้องกัน error กรณีมีหลายใบ และเอาใบแรกสุดมาใช้)
-        cart = Cart.objects.filter(user=request.user).first()
-        
-        # ถ้ายังไม่มีตะกร้าของ User ให้สร้างใหม่
-        if not cart:
-            cart = Cart.objects.create(user=request.user)
-            
+        # User หนึ่งคนมีตะกร้าได้ใบเดียว (unique constraint) ค้นหาด้วย index ของ user ได้เลย
+        cart, _ = Cart.objects.get_or_create(user=request.user)
         return cart
 
     # 2. กรณีลูกค้าทั่วไป (Guest) ยังไม่ Login
@@ -32,15 +30,13 @@ def _get_or_create_cart(request):
             request.session.create()
             session_key = request.session.session_key
         
-        # ค้นหาตะกร้าจาก Session
-        try:
-            cart = Cart.objects.get(session_key=session_key)
-            # ถ้าเจอตะกร้า แต่ตะกร้านั้นมีเจ้าของไปแล้ว (User อื่น) ให้สร้างใหม่
-            if cart.user: 
-                cart = Cart.objects.create(session_key=session_key)
-        except Cart.DoesNotExist:
+        # ค้นหาตะกร้าจาก Session (เฉพาะตะกร้าที่ยังไม่มีเจ้าของ)
+        cart = Cart.objects.filter(session_key=session_key, user__isnull=True).first()
+        if not cart:
             cart = Cart.objects.create(session_key=session_key)
-            
+
+        # จำ id ไว้ใน session เพื่อรวมเข้าตะกร้าของ User ตอนล็อกอิน (ดู cart/merge.py)
+        merge.remember_guest_cart(request, cart)
         return cart
 
 # ----------------------------------------------
@@ -54,8 +50,8 @@ def cart_detail(request):
     # ดึงรายการสินค้าทั้งหมดในตะกร้า
     cart_items = CartItem.objects.filter(cart=cart).select_related('product')
     
-    # ✅ คำนวณราคารวมที่นี่ (แก้ปัญหาราคาไม่ขึ้น)
-    total_price = sum(item.product.price * item.quantity for item in cart_items)
+    # ✅ คำนวณราคารวมในฐานข้อมูล (ราคาสินค้าปัจจุบัน x จำนวน)
+    total_price = cart_items.totals()['subtotal']
 
     context = {
         'cart': cart,
@@ -64,25 +60,17 @@ def cart_detail(request):
     }
     return render(request, 'cart/cart_detail.html', context)
 
-# ----------------------------------------------
-# --- C (Create): เพิ่มสินค้าลงในตะกร้า ---
-# ----------------------------------------------
-@login_required(login_url='login')
-@require_POST
-def add_to_cart(request, product_id):
-    cart = _get_or_create_cart(request)
-    product = get_object_or_404(Product, id=product_id)
-    
-    # ✅ เพิ่มท่อนนี้ครับ: ถ้า Login อยู่ และตะกร้านี้ยังไม่มีเจ้าของ ให้ยึดเป็นของ User นี้เลย
-    if request.user.is_authenticated and not cart.user:
-        cart.user = request.user
-        cart.save()
-    
-    # ... (ส่วนดึง quantity และ create CartItem ด้านล่าง เหมือนเดิมไม่ต้องแก้) ...
+# --- ฟังก์ชันแก้ตะกร้า (ใช้ร่วมกันระหว่างหน้าเว็บปกติและ JSON API) ---
+def _parse_quantity(value, default):
     try:
-        quantity = int(request.POST.get('quantity', 1))
-        if quantity <= 0: quantity = 1
-    except ValueError:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _add_item(cart, product, quantity):
+    """เพิ่มสินค้าลงตะกร้า (ถ้ามีอยู่แล้วให้บวกจำนวน) คืนค่า (รายการ, ระดับข้อความ, ข้อความ)"""
+    if quantity <= 0:
         quantity = 1
 
     cart_item, created = CartItem.objects.get_or_create(
@@ -94,10 +82,53 @@ def add_to_cart(request, product_id):
     if not created:
         cart_item.quantity += quantity
         cart_item.save()
-        messages.success(request, f"อัปเดตจำนวน {product.name} แล้ว")
-    else:
-        messages.success(request, f"เพิ่ม {product.name} ลงตะกร้าเรียบร้อย")
+        return cart_item, 'success', f"อัปเดตจำนวน {product.name} แล้ว"
+    return cart_item, 'success', f"เพิ่ม {product.name} ลงตะกร้าเรียบร้อย"
+
 
+def _set_quantity(cart_item, new_quantity):
+    """ตั้งจำนวนใหม่ (จำนวน <= 0 คือลบรายการ) คืนค่า (ระดับข้อความ, ข้อความ)"""
+    if new_quantity > 0:
+        # ✅ เช็คสต็อกก่อนบันทึก
+        level, text = 'success', "อัปเดตจำนวนสินค้าแล้ว"
+        if new_quantity > cart_item.product.stock:
+            new_quantity = cart_item.product.stock
+            level, text = 'warning', f"สินค้ามีจำกัดเพียง {cart_item.product.stock} ชิ้น"
+
+        cart_item.quantity = new_quantity
+        cart_item.save()
+        return level, text
+
+    cart_item.delete()
+    return 'warning', "ลบสินค้าออกจากตะกร้าแล้ว"
+
+
+def _cart_changed(request, cart):
+    """อัปเดตยอดสรุปของตะกร้าและตัวเลขบน badge (ตะกร้ามีใบเดียว จึงใช้ item_count ได้เลย)"""
+    cart.refresh_summary()
+    badge.changed(request, cart.item_count)
+
+
+def _find_item(cart, item_id):
+    # ✅ Security: แก้ได้เฉพาะรายการในตะกร้าตัวเองเท่านั้น
+    return CartItem.objects.select_related('product').filter(id=item_id, cart=cart).first()
+
+
+# ----------------------------------------------
+# --- C (Create): เพิ่มสินค้าลงในตะกร้า ---
+# ----------------------------------------------
+@login_required(login_url='login')
+@require_POST
+def add_to_cart(request, product_id):
+    cart = _get_or_create_cart(request)
+    product = get_object_or_404(Product, id=product_id)
+    
+    # ตะกร้าของ Guest ไม่ถูกยึดเป็นของ User ตรงนี้แล้ว จะถูกรวมเข้าตะกร้าของ User ตอนล็อกอินแทน
+    quantity = _parse_quantity(request.POST.get('quantity', 1), 1)
+    _, level, text = _add_item(cart, product, quantity)
+    messages.add_message(request, getattr(messages, level.upper()), text)
+
+    _cart_changed(request, cart)
     return redirect('cart:cart_detail')
 
 # ----------------------------------------------
@@ -108,26 +139,15 @@ def add_to_cart(request, product_id):
 def update_cart(request, item_id):
     cart = _get_or_create_cart(request)
     # ต้องเช็คว่าเป็น item ในตะกร้าเราจริงไหม
-    cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
+    cart_item = _find_item(cart, item_id)
+    if cart_item is None:
+        raise Http404
     
-    try:
-        new_quantity = int(request.POST.get('quantity', 0))
-    except ValueError:
-        new_quantity = 0
-
-    if new_quantity > 0:
-        # ✅ เช็คสต็อกก่อนบันทึก
-        if new_quantity > cart_item.product.stock:
-            new_quantity = cart_item.product.stock
-            messages.warning(request, f"สินค้ามีจำกัดเพียง {cart_item.product.stock} ชิ้น")
-        
-        cart_item.quantity = new_quantity
-        cart_item.save()
-        messages.success(request, "อัปเดตจำนวนสินค้าแล้ว")
-    else:
-        cart_item.delete() 
-        messages.warning(request, "ลบสินค้าออกจากตะกร้าแล้ว")
+    new_quantity = _parse_quantity(request.POST.get('quantity', 0), 0)
+    level, text = _set_quantity(cart_item, new_quantity)
+    messages.add_message(request, getattr(messages, level.upper()), text)
         
+    _cart_changed(request, cart)
     return redirect('cart:cart_detail')
 
 # ----------------------------------------------
@@ -138,11 +158,96 @@ def update_cart(request, item_id):
 def remove_from_cart(request, item_id):
     """ลบรายการสินค้า (CartItem) ออกจากตะกร้า"""
     cart = _get_or_create_cart(request)
-    
-    # ✅ Security: ต้องลบเฉพาะของในตะกร้าตัวเองเท่านั้น
-    cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
+    cart_item = _find_item(cart, item_id)
+    if cart_item is None:
+        raise Http404
     
     cart_item.delete()
     messages.success(request, "ลบสินค้าเรียบร้อยแล้ว")
     
-    return redirect('cart:cart_detail')
\ No newline at end of file
+    _cart_changed(request, cart)
+    return redirect('cart:cart_detail')
+
+
+# ----------------------------------------------
+# --- JSON API: แก้ตะกร้าโดยไม่ต้องโหลดหน้าใหม่ ---
+# ตอบกลับเป็นรายการที่เปลี่ยน + ยอดรวมตะกร้า + ตัวเลข badge ใน response เดียว
+# (cart_detail.html เรียกด้วย fetch ถ้า JS ใช้ไม่ได้ฟอร์มจะ submit ไปที่ view ด้านบนตามปกติ)
+# ----------------------------------------------
+def _cart_json(request, cart, cart_item=None, level='success', message='', status=200):
+    line = None
+    if cart_item is not None and cart_item.pk is not None:
+        line = {
+            'id': cart_item.pk,
+            'product_id': cart_item.product_id,
+            'quantity': cart_item.quantity,
+            'price': cart_item.product.price,
+            'line_total': cart_item.total_price(),
+            'stock': cart_item.product.stock,
+        }
+    return JsonResponse({
+        'line': line,
+        'subtotal': cart.subtotal,
+        'item_count': cart.item_count,
+        'badge_count': badge.get_count(request),
+        'level': level,
+        'message': message,
+    }, status=status)
+
+
+def _json_error(message, status):
+    return JsonResponse({'level': 'error', 'message': message}, status=status)
+
+
+def _api_login_required(view):
+    """เหมือน login_required แต่ตอบ 401 เป็น JSON แทนการ redirect ไปหน้าล็อกอิน (fetch ตามไปหน้า HTML ไม่ได้)"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _json_error("กรุณาเข้าสู่ระบบ", 401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+@_api_login_required
+@require_POST
+def api_add_to_cart(request, product_id):
+    cart = _get_or_create_cart(request)
+    product = Product.objects.filter(id=product_id).first()
+    if product is None:
+        return _json_error("ไม่พบสินค้า", 404)
+
+    quantity = _parse_quantity(request.POST.get('quantity', 1), 1)
+    cart_item, level, text = _add_item(cart, product, quantity)
+    _cart_changed(request, cart)
+    return _cart_json(request, cart, cart_item, level, text)
+
+
+@_api_login_required
+@require_POST
+def api_update_cart(request, item_id):
+    cart = _get_or_create_cart(request)
+    cart_item = _find_item(cart, item_id)
+    if cart_item is None:
+        return _json_error("ไม่พบรายการนี้ในตะกร้า", 404)
+
+    new_quantity = _parse_quantity(request.POST.get('quantity'), None)
+    if new_quantity is None:
+        return _json_error("จำนวนไม่ถูกต้อง", 400)
+
+    level, text = _set_quantity(cart_item, new_quantity)
+    _cart_changed(request, cart)
+    return _cart_json(request, cart, cart_item, level, text)
+
+
+@_api_login_required
+@require_POST
+def api_remove_from_cart(request, item_id):
+    cart = _get_or_create_cart(request)
+    cart_item = _find_item(cart, item_id)
+    if cart_item is None:
+        return _json_error("ไม่พบรายการนี้ในตะกร้า", 404)
+
+    cart_item.delete()
+    _cart_changed(request, cart)
+    return _cart_json(request, cart, None, 'success', "ลบสินค้าเรียบร้อยแล้ว")
@@ -1,3 +1,30 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import OrderStatusEvent, PriceEntry
+
+
+# ตารางราคา: แก้แล้วมีผลทันทีทุกหน้า (signal ล้าง cache ของ core/pricing.py)
+@admin.register(PriceEntry)
+class PriceEntryAdmin(admin.ModelAdmin):
+    list_display = ('category', 'code', 'amount', 'updated_at')
+    list_filter = ('category',)
+    list_editable = ('amount',)
+    ordering = ('category', 'code')
+
+
+# ประวัติสถานะออเดอร์: ดูได้อย่างเดียว (เพิ่มแถวจากการเปลี่ยนสถานะเท่านั้น)
+@admin.register(OrderStatusEvent)
+class OrderStatusEventAdmin(admin.ModelAdmin):
+    list_display = ('order_type', 'order_id', 'from_status', 'to_status', 'changed_at')
+    list_filter = ('order_type', 'to_status')
+    search_fields = ('=order_id',)
+    date_hierarchy = 'changed_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
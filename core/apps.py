@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from .signals import (
+            connect_media_signals, connect_order_signals, connect_pricing_signals, connect_schedule_signals,
+        )
+        connect_order_signals()
+        connect_media_signals()
+        connect_schedule_signals()
+        connect_pricing_signals()
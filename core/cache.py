@@ -0,0 +1,88 @@
+"""
+Cache แบบมีเลขเวอร์ชัน (Versioned cache)
+
+ทุก key จะผูกกับเลขเวอร์ชันของ namespace เช่น catalog:v17:categories
+เมื่อข้อมูลเปลี่ยนก็แค่เพิ่มเลขเวอร์ชัน (bump) key เก่าทั้งหมดจะไม่ถูกอ่านอีก
+จึงล้าง cache ได้ตรงจุดโดยไม่ต้องเดาค่า TTL และใช้ได้กับ LocMemCache / FileBasedCache
+"""
+import time
+
+from django.core.cache import caches
+
+_MISSING = object()
+
+
+class VersionedCache:
+    def __init__(self, namespace, alias='default', timeout=None):
+        self.namespace = namespace
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _key(self, name):
+        return f'{self.namespace}:{name}'
+
+    # --- เวอร์ชัน ---
+    def version(self):
+        key = self._key('version')
+        version = self.cache.get(key)
+        if version is None:
+            # ถ้า key เวอร์ชันหายไป (เช่น ถูก cull) ให้เริ่มจากเวลาปัจจุบัน
+            # เลขใหม่จะมากกว่าเวอร์ชันเดิมเสมอ จึงไม่มีทางไปอ่านข้อมูลเก่าที่ยังค้างอยู่
+            self.cache.add(key, int(time.time() * 1000), timeout=None)
+            version = self.cache.get(key)
+        return version
+
+    def bump(self):
+        key = self._key('version')
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            version = int(time.time() * 1000)
+            self.cache.set(key, version, timeout=None)
+            return version
+
+    # --- อ่าน/เขียน ---
+    def get_or_set(self, name, builder, timeout=None):
+        """อ่านจาก cache ถ้าไม่มีให้เรียก builder() แล้วเก็บผลไว้ (read-through)"""
+        key = self._key(f'v{self.version()}:{name}')
+        value = self.cache.get(key, _MISSING)
+        if value is not _MISSING:
+            self._count('hits')
+            return value
+
+        self._count('misses')
+        value = builder()
+        self.cache.set(key, value, timeout=timeout or self.timeout)
+        return value
+
+    def delete_many(self, names):
+        """ลบเฉพาะบาง key ในเวอร์ชันปัจจุบัน (ใช้เมื่อข้อมูลเปลี่ยนแค่บางรายการ ไม่ต้อง bump ทั้ง namespace)"""
+        version = self.version()
+        self.cache.delete_many([self._key(f'v{version}:{name}') for name in names])
+
+    # --- สถิติ hit/miss ---
+    def _count(self, name):
+        key = self._key(f'stats:{name}')
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.add(key, 0, timeout=None)
+            self.cache.incr(key)
+
+    def stats(self):
+        hits = self.cache.get(self._key('stats:hits'), 0)
+        misses = self.cache.get(self._key('stats:misses'), 0)
+        total = hits + misses
+        return {
+            'version': self.version(),
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else 0.0,
+        }
+
+    def reset_stats(self):
+        self.cache.delete_many([self._key('stats:hits'), self._key('stats:misses')])
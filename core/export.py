@@ -0,0 +1,279 @@
+"""
+ส่งออกออเดอร์ทั้ง 3 ประเภทเป็น CSV / XLSX สำหรับฝ่ายบัญชี
+
+1 แถวต่อรายการสินค้า (สินค้าทั่วไปแตกตาม OrderItem) หรือต่อ 1 ออเดอร์สั่งทำ (กรอบรูป/ป้าย)
+อ่านทีละชุดด้วย keyset (created_at, id) และเขียนออกทีละชุดผ่าน generator
+หน่วยความจำจึงคงที่ไม่ว่าช่วงวันที่จะยาวแค่ไหน และไบต์แรกส่งออกได้ทันทีโดยไม่ต้องรอโหลดทั้งตาราง
+(MySQL ไม่มี server-side cursor: QuerySet.iterator(chunk_size=...) ยังดึงผลทั้งหมดมาไว้ที่ client
+จึงแบ่งเป็นหลาย query สั้นๆ แทน ซึ่งไม่ถือ connection/lock ค้างไว้ระหว่างส่งไฟล์ด้วย)
+"""
+import csv
+import re
+import zipfile
+from datetime import datetime, time, timedelta
+from xml.sax.saxutils import escape
+
+from django.db.models import Q
+from django.utils import timezone
+
+from framings.models import CustomFrameOrder
+from plaques.models import CustomPlaqueOrder
+from stores.models import OrderItem
+from .order_types import ORDER_STATUS_CHOICES, ORDER_TYPES
+
+CHUNK_SIZE = 1000
+
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+
+HEADER = [
+    "ประเภท", "เลขที่ออเดอร์", "วันที่สั่ง", "สถานะ",
+    "ลูกค้า", "เบอร์โทร", "ที่อยู่",
+    "รายการ", "จำนวน", "ราคาต่อหน่วย", "การจัดส่ง", "ยอดสุทธิของออเดอร์",
+]
+
+STATUS_LABELS = dict(ORDER_STATUS_CHOICES)
+
+# ข้อความที่ขึ้นต้นด้วยอักขระเหล่านี้ Excel/LibreOffice อาจตีความเป็นสูตร (formula injection)
+# ชื่อ/ที่อยู่มาจากลูกค้าโดยตรง จึงเติม ' นำหน้าให้เป็นข้อความธรรมดาเสมอ
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _text(value):
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def date_range(start, end):
+    """วันที่เริ่ม-สิ้นสุด (รวมวันสุดท้าย) -> ช่วงเวลา [เริ่ม, สิ้นสุด) ตามเวลาท้องถิ่น"""
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(start, time.min), tz),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz),
+    )
+
+
+def _chunks(queryset, keys, fields, chunk_size):
+    """
+    อ่าน queryset เรียงตาม keys (จากน้อยไปมาก ตัวสุดท้ายต้อง unique) ทีละ chunk_size แถว
+    คืนค่าเฉพาะ fields ของแต่ละแถว
+    """
+    queryset = queryset.order_by(*keys)
+    last = None
+    while True:
+        page = queryset
+        if last is not None:
+            condition = Q()
+            for i, key in enumerate(keys):
+                prefix = {keys[j]: last[j] for j in range(i)}
+                condition |= Q(**prefix, **{f'{key}__gt': last[i]})
+            page = page.filter(condition)
+        rows = list(page.values_list(*keys, *fields)[:chunk_size])
+        if not rows:
+            return
+        for row in rows:
+            yield row[len(keys):]
+        last = rows[-1][:len(keys)]
+
+
+def _local(value):
+    return timezone.localtime(value).strftime('%Y-%m-%d %H:%M')
+
+
+def _product_rows(start, end, chunk_size):
+    items = OrderItem.objects.filter(order__created_at__gte=start, order__created_at__lt=end)
+    fields = (
+        'order_id', 'order__created_at', 'order__status',
+        'order__customer_name', 'order__customer_phone', 'order__customer_address',
+        'product__name', 'quantity', 'price', 'order__shipping_method', 'order__total_price',
+    )
+    label = ORDER_TYPES['product'].label
+    for (order_id, created_at, status, name, phone, address,
+         product, quantity, price, shipping, total) in _chunks(items, ('order__created_at', 'order_id', 'pk'), fields, chunk_size):
+        yield [label, order_id, _local(created_at), STATUS_LABELS.get(status, status),
+               name, phone, address, product, quantity, price, shipping, total]
+
+
+def _framing_rows(start, end, chunk_size):
+    orders = CustomFrameOrder.objects.filter(created_at__gte=start, created_at__lt=end)
+    fields = (
+        'pk', 'created_at', 'status', 'customer_name', 'customer_phone', 'customer_address',
+        'size_option', 'style_option', 'mounting_option', 'quantity', 'shipping_method', 'total_price',
+    )
+    styles = dict(CustomFrameOrder.STYLE_CHOICES)
+    mountings = dict(CustomFrameOrder.MOUNTING_CHOICES)
+    label = ORDER_TYPES['framing'].label
+    for (pk, created_at, status, name, phone, address,
+         size, style, mounting, quantity, shipping, total) in _chunks(orders, ('created_at', 'pk'), fields, chunk_size):
+        item = f"กรอบ {size} {styles.get(style, style)} ({mountings.get(mounting, mounting)})"
+        yield [label, pk, _local(created_at), STATUS_LABELS.get(status, status),
+               name, phone, address, item, quantity, None, shipping, total]
+
+
+def _plaque_rows(start, end, chunk_size):
+    orders = CustomPlaqueOrder.objects.filter(created_at__gte=start, created_at__lt=end)
+    fields = (
+        'pk', 'created_at', 'status', 'customer_name', 'customer_phone', 'customer_address',
+        'deceased_name', 'size', 'stone_style', 'price', 'shipping_method', 'final_price',
+    )
+    stones = dict(CustomPlaqueOrder.STONE_STYLE_CHOICES)
+    label = ORDER_TYPES['plaque'].label
+    for (pk, created_at, status, name, phone, address,
+         deceased, size, stone, price, shipping, total) in _chunks(orders, ('created_at', 'pk'), fields, chunk_size):
+        item = f"ป้าย {deceased} {size} {stones.get(stone, stone)}"
+        yield [label, pk, _local(created_at), STATUS_LABELS.get(status, status),
+               name, phone, address, item, 1, price, shipping, total]
+
+
+ROW_SOURCES = {
+    'product': _product_rows,
+    'framing': _framing_rows,
+    'plaque': _plaque_rows,
+}
+
+
+def export_rows(start, end, order_types=None, chunk_size=CHUNK_SIZE):
+    """แถวข้อมูล (ไม่รวมหัวตาราง) ของออเดอร์ที่สั่งในช่วงวันที่ start-end (รวมวันสุดท้าย)"""
+    start_at, end_at = date_range(start, end)
+    for key in order_types or ORDER_TYPES:
+        yield from ROW_SOURCES[key](start_at, end_at, chunk_size)
+
+
+# --- CSV ---
+
+class _Echo:
+    """file-like ที่คืนค่าที่ถูกเขียนกลับมาเลย ให้ csv.writer ใช้กับ generator ได้"""
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    yield '\ufeff'.encode()  # BOM ให้ Excel อ่านภาษาไทยเป็น UTF-8
+    yield writer.writerow(HEADER).encode()
+    for row in rows:
+        yield writer.writerow(['' if value is None else _text(value) for value in row]).encode()
+
+
+# --- XLSX (zip ของไฟล์ XML) เขียนทีละส่วนด้วย zipfile แล้วส่งไบต์ที่ได้ออกไปทันที ---
+
+_XLSX_STATIC = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="orders" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/styles.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+        '<borders count="1"><border/></borders>'
+        '<cellStyleXfs count="1"><xf/></cellStyleXfs>'
+        '<cellXfs count="2"><xf/><xf fontId="1" applyFont="1"/></cellXfs>'
+        '</styleSheet>'
+    ),
+}
+
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_END = '</sheetData></worksheet>'
+
+# อักขระควบคุมที่ XML ไม่ยอมรับ (เช่นที่ติดมากับข้อความที่ copy มาวาง)
+_XML_INVALID = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+class _ZipBuffer:
+    """ปลายทางที่ zipfile เขียนลง (เขียนต่อท้ายอย่างเดียว ไม่ seek) แล้วให้ generator ดึงไบต์ออกไปส่ง"""
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _xlsx_cell(value, style=''):
+    if value is None or value == '':
+        return '<c/>'
+    if isinstance(value, (int, float)) or hasattr(value, 'as_tuple'):  # ตัวเลข / Decimal
+        return f'<c t="n"{style}><v>{value}</v></c>'
+    text = escape(_XML_INVALID.sub('', _text(str(value))))
+    return f'<c t="inlineStr"{style}><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(values, style=''):
+    return '<row>' + ''.join(_xlsx_cell(value, style) for value in values) + '</row>'
+
+
+def stream_xlsx(rows, flush_every=200):
+    buffer = _ZipBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_STATIC.items():
+            archive.writestr(name, content)
+        yield buffer.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write((_SHEET_START + _xlsx_row(HEADER, ' s="1"')).encode())
+            for count, row in enumerate(rows, 1):
+                sheet.write(_xlsx_row(row).encode())
+                if count % flush_every == 0:
+                    data = buffer.drain()
+                    if data:
+                        yield data
+            sheet.write(_SHEET_END.encode())
+    yield buffer.drain()
+
+
+def stream_export(fmt, start, end, order_types=None):
+    rows = export_rows(start, end, order_types)
+    if fmt == 'xlsx':
+        return stream_xlsx(rows)
+    return stream_csv(rows)
+
+
+def filename(fmt, start, end):
+    return f"orders_{start:%Y%m%d}_{end:%Y%m%d}.{FORMATS[fmt][1]}"
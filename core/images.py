@@ -0,0 +1,51 @@
+"""
+ฟังก์ชันกลางสำหรับประมวลผลรูปภาพด้วย Pillow
+
+- หมุนรูปตาม EXIF Orientation (รูปจากมือถือ) ก่อนย่อ
+- เข้ารหัสใหม่โดยไม่ส่ง EXIF/ICC/metadata อื่นต่อ (ลบพิกัด GPS ฯลฯ และลดขนาดไฟล์)
+"""
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+# ค่าเริ่มต้นในการเข้ารหัสแต่ละรูปแบบ
+ENCODE_OPTIONS = {
+    'JPEG': {'quality': 82, 'optimize': True, 'progressive': True},
+    'WEBP': {'quality': 80, 'method': 4},
+}
+
+
+def open_image(fileobj):
+    """เปิดรูปและหมุนตาม EXIF ให้เรียบร้อย (โหลดพิกเซลแล้ว ปิดไฟล์ต้นฉบับได้)"""
+    image = Image.open(fileobj)
+    image = ImageOps.exif_transpose(image)
+    image.load()
+    return image
+
+
+def flatten(image):
+    """แปลงเป็น RGB (JPEG ไม่รองรับ alpha) โดยถมพื้นหลังสีขาวแทนส่วนโปร่งใส"""
+    if image.mode == 'RGB':
+        return image
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def resize_to_width(image, width):
+    """ย่อให้กว้างไม่เกิน width (คงสัดส่วน ไม่ขยายรูปเล็ก)"""
+    if image.width <= width:
+        return image
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def encode(image, format, **options):
+    """เข้ารหัสรูปเป็น bytes (ไม่แนบ metadata ของต้นฉบับ)"""
+    buffer = BytesIO()
+    params = dict(ENCODE_OPTIONS.get(format, {}), **options)
+    flatten(image).save(buffer, format=format, **params)
+    return buffer.getvalue()
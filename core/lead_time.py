@@ -0,0 +1,139 @@
+"""
+เวลาที่ออเดอร์อยู่ในแต่ละสถานะ และ lead time การผลิต (processing -> shipped)
+คำนวณจากประวัติสถานะ (OrderStatusEvent)
+
+อ่านประวัติทีละชุดตามลำดับ (ประเภท, ออเดอร์, เวลา) ด้วย keyset แล้วป้อนระยะเวลาเข้า histogram
+ที่ใช้หน่วยความจำคงที่ ไม่ต้องโหลดประวัติทั้งหมดเข้า memory
+(MySQL ไม่มี server-side cursor QuerySet.iterator() จึงยังดึงผลทั้งหมดมาไว้ที่ client อยู่ดี)
+"""
+import math
+from collections import defaultdict
+
+from django.db.models import Q
+
+from .models import OrderStatusEvent
+from .order_types import ORDER_TYPES
+
+CHUNK_SIZE = 2000
+
+
+class DurationHistogram:
+    """
+    histogram ของระยะเวลา (วินาที) แบบช่องกว้างเป็นสัดส่วน (ช่องถัดไปกว้างกว่าเดิม GROWTH เท่า)
+    percentile ที่ได้คลาดไม่เกินราวครึ่งหนึ่งของความกว้างช่อง (~2.5%) ใช้หน่วยความจำตามจำนวนช่องที่มีข้อมูลเท่านั้น
+    """
+    GROWTH = 1.05
+
+    def __init__(self):
+        self.buckets = defaultdict(int)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def _bucket(self, seconds):
+        if seconds < 1:
+            return -1
+        return int(math.log(seconds, self.GROWTH))
+
+    def _value(self, bucket):
+        if bucket < 0:
+            return 0.0
+        # จุดกึ่งกลาง (เชิงเรขาคณิต) ของช่อง
+        return self.GROWTH ** (bucket + 0.5)
+
+    def add(self, seconds):
+        seconds = max(seconds, 0.0)
+        self.buckets[self._bucket(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def percentile(self, p):
+        """ค่าที่ p% ของข้อมูลไม่เกิน (p อยู่ระหว่าง 0-100) คืนค่า None ถ้ายังไม่มีข้อมูล"""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(p / 100 * self.count))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(max(self._value(bucket), self.min), self.max)
+        return self.max
+
+
+def stream_events(order_type_key, since=None, chunk_size=CHUNK_SIZE):
+    """ประวัติของออเดอร์ประเภทหนึ่ง เรียงตาม (ออเดอร์, เวลา) ทีละ chunk_size แถว"""
+    queryset = OrderStatusEvent.objects.filter(order_type=order_type_key)
+    if since is not None:
+        queryset = queryset.filter(changed_at__gte=since)
+    queryset = queryset.order_by('order_id', 'changed_at', 'pk')
+
+    last = None
+    while True:
+        page = queryset
+        if last is not None:
+            order_id, changed_at, pk = last
+            page = page.filter(
+                Q(order_id__gt=order_id)
+                | Q(order_id=order_id, changed_at__gt=changed_at)
+                | Q(order_id=order_id, changed_at=changed_at, pk__gt=pk)
+            )
+        rows = list(page.values_list('order_id', 'changed_at', 'pk', 'to_status')[:chunk_size])
+        if not rows:
+            return
+        yield from rows
+        last = rows[-1][:3]
+
+
+def analyze(order_types=None, since=None, chunk_size=CHUNK_SIZE):
+    """
+    คืนค่า (lead_times, time_in_status)
+    - lead_times: {ประเภท: DurationHistogram} เวลาตั้งแต่เข้า processing ครั้งแรกจนถึง shipped
+    - time_in_status: {(ประเภท, สถานะ): DurationHistogram} เวลาที่อยู่ในสถานะนั้นก่อนเปลี่ยนต่อ
+      (สถานะล่าสุดที่ยังไม่เปลี่ยนไม่นับ เพราะยังไม่รู้ว่าจะอยู่อีกนานเท่าไร)
+    """
+    lead_times = defaultdict(DurationHistogram)
+    time_in_status = defaultdict(DurationHistogram)
+
+    for key in order_types or ORDER_TYPES:
+        current_order = None
+        status = entered_at = production_started = None
+        for order_id, changed_at, _, to_status in stream_events(key, since, chunk_size):
+            if order_id != current_order:
+                current_order = order_id
+                status, entered_at, production_started = None, None, None
+
+            if status is not None:
+                time_in_status[(key, status)].add((changed_at - entered_at).total_seconds())
+
+            if to_status == 'processing' and production_started is None:
+                production_started = changed_at
+            elif to_status == 'shipped' and production_started is not None:
+                lead_times[key].add((changed_at - production_started).total_seconds())
+                production_started = None
+            elif to_status in ('pending', 'cancelled'):
+                production_started = None
+
+            status, entered_at = to_status, changed_at
+
+    return dict(lead_times), dict(time_in_status)
+
+
+def format_duration(seconds):
+    """แสดงระยะเวลาแบบอ่านง่าย เช่น '2 วัน 3 ชม.', '45 นาที'"""
+    if seconds is None:
+        return "-"
+    minutes = int(seconds // 60)
+    days, minutes = divmod(minutes, 60 * 24)
+    hours, minutes = divmod(minutes, 60)
+    if days:
+        return f"{days} วัน {hours} ชม."
+    if hours:
+        return f"{hours} ชม. {minutes} นาที"
+    return f"{minutes} นาที"
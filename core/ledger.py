@@ -0,0 +1,96 @@
+"""
+สมุดรวมออเดอร์ (OrderLedgerEntry)
+
+รวมออเดอร์ทั้ง 3 ตารางไว้ในตารางเดียวที่ใช้ชื่อ field เหมือนกัน
+หน้าที่ต้องแสดงทุกประเภทรวมกัน (เรียงตามเวลา, แบ่งหน้า, กรองสถานะ) จึงใช้ query เดียว
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count
+
+from .models import OrderLedgerEntry
+from .order_types import ORDER_TYPES
+
+
+def ledger_values(order_type, order):
+    return {
+        'user_id': order_type.user_id(order),
+        'status': order.status,
+        'amount': order_type.amount(order),
+        'created_at': order.created_at,
+    }
+
+
+def sync_order(order_type, order, created=False):
+    """บันทึก/อัปเดตแถวของออเดอร์นี้ในสมุดรวม (เรียกจาก post_save)"""
+    values = ledger_values(order_type, order)
+    entries = OrderLedgerEntry.objects.filter(order_type=order_type.key, order_id=order.pk)
+    if not created and entries.update(**values):
+        return
+    OrderLedgerEntry.objects.create(order_type=order_type.key, order_id=order.pk, **values)
+
+
+def remove_order(order_type, order_id):
+    OrderLedgerEntry.objects.filter(order_type=order_type.key, order_id=order_id).delete()
+
+
+def attach_orders(entries):
+    """ดึงออเดอร์ตัวจริงของหลายแถวพร้อมกัน (ไม่เกิน 1 query ต่อประเภท) แล้วผูกไว้กับ entry.order"""
+    ids_by_type = defaultdict(set)
+    for entry in entries:
+        ids_by_type[entry.order_type].add(entry.order_id)
+
+    orders = {
+        key: ORDER_TYPES[key].model.objects.in_bulk(list(ids))
+        for key, ids in ids_by_type.items()
+    }
+    for entry in entries:
+        entry._order = orders[entry.order_type].get(entry.order_id)
+    return entries
+
+
+def rebuild_ledger(batch_size=1000):
+    """สร้างสมุดรวมใหม่ทั้งหมดจากตารางออเดอร์ คืนค่าจำนวนแถวต่อประเภท"""
+    with transaction.atomic():
+        OrderLedgerEntry.objects.all().delete()
+        return _fill_ledger(batch_size)
+
+
+def _fill_ledger(batch_size):
+    counts = {}
+    for key, order_type in ORDER_TYPES.items():
+        counts[key] = 0
+        last_pk = 0
+        while True:
+            batch = list(order_type.model.objects.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+            if not batch:
+                break
+            OrderLedgerEntry.objects.bulk_create([
+                OrderLedgerEntry(order_type=key, order_id=order.pk, **ledger_values(order_type, order))
+                for order in batch
+            ], ignore_conflicts=True)  # ออเดอร์ที่ signal เพิ่งบันทึกระหว่างนี้ ถือว่าใหม่กว่า
+            counts[key] += len(batch)
+            last_pk = batch[-1].pk
+    return counts
+
+
+def status_counts(user):
+    """
+    จำนวนออเดอร์ของ user แยกตามประเภทและสถานะ ด้วย GROUP BY เดียว (ใช้ index user+status)
+    คืนค่า {ประเภท: {'all': รวม, สถานะ: จำนวน, ...}}
+    """
+    counts = {key: {'all': 0} for key in ORDER_TYPES}
+    rows = (
+        OrderLedgerEntry.objects.filter(user=user)
+        .values('order_type', 'status')
+        .annotate(orders=Count('pk'))
+        .order_by()
+    )
+    for row in rows:
+        bucket = counts.get(row['order_type'])
+        if bucket is None:
+            continue
+        bucket[row['status']] = row['orders']
+        bucket['all'] += row['orders']
+    return counts
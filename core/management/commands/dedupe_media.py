@@ -0,0 +1,159 @@
+import os
+import shutil
+from collections import Counter
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Case, CharField, Count, F, Value, When
+
+from core.models import MediaBlob
+from core.storage import BLOB_ROOT, DedupFileSystemStorage, blob_name, dedup_file_fields, hash_file
+
+# โฟลเดอร์ใน MEDIA_ROOT ที่ไม่ใช่ไฟล์อัปโหลด (ไฟล์ที่ระบบสร้างเอง)
+DEFAULT_EXCLUDE = ('products/variants',)
+
+
+def _link_or_copy(source, target):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+class Command(BaseCommand):
+    help = (
+        "ย้ายไฟล์ใน MEDIA_ROOT เข้าระบบเก็บตามเนื้อหา (SHA-256) ไฟล์ที่ซ้ำกันจะเหลือชุดเดียว "
+        "ทำทีละชุด อ่านไฟล์ทีละ chunk จึงใช้หน่วยความจำคงที่ไม่ว่าไฟล์จะมีมากแค่ไหน"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="จำนวนไฟล์ต่อรอบ")
+        parser.add_argument('--dry-run', action='store_true', help="คำนวณอย่างเดียว ไม่ย้าย/ลบไฟล์ ไม่แก้ฐานข้อมูล")
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, DedupFileSystemStorage):
+            raise CommandError("STORAGES['default'] ต้องเป็น core.storage.DedupFileSystemStorage")
+
+        self.fields = dedup_file_fields()
+        self.dry_run = options['dry_run']
+        self.stats = Counter()
+        self.known = {}  # sha256 -> ชื่อ blob ที่เจอในรอบนี้ (กันสร้างซ้ำตอน dry-run)
+
+        batch = []
+        for name in self._walk_media():
+            batch.append(name)
+            if len(batch) >= options['batch_size']:
+                self._process(batch)
+                batch = []
+        if batch:
+            self._process(batch)
+
+        s = self.stats
+        self.stdout.write(
+            f"ตรวจ {s['scanned']} ไฟล์: ย้ายเข้า blob {s['moved']} ไฟล์, "
+            f"ซ้ำกับที่มีอยู่ {s['duplicates']} ไฟล์ (คืนพื้นที่ {s['bytes_saved']:,} bytes), "
+            f"ไม่มีแถวไหนอ้างถึง {s['unreferenced']} ไฟล์ ({s['unreferenced_bytes']:,} bytes, ไม่ได้แตะ)"
+        )
+        if s['errors']:
+            self.stdout.write(self.style.WARNING(f"อ่านไฟล์ไม่ได้ {s['errors']} ไฟล์"))
+        if self.dry_run:
+            self.stdout.write(self.style.WARNING("dry-run: ยังไม่ได้เปลี่ยนแปลงอะไร"))
+        else:
+            self.stdout.write(self.style.SUCCESS("เรียบร้อย (ถ้ามีรูปสินค้าถูกย้าย ให้รัน build_product_image_variants ต่อ)"))
+
+    def _walk_media(self):
+        """ชื่อไฟล์ (แบบ storage) ทุกไฟล์ใน MEDIA_ROOT ยกเว้น blobs และโฟลเดอร์ที่ระบบสร้าง"""
+        root = settings.MEDIA_ROOT
+        skip = {BLOB_ROOT, *getattr(settings, 'MEDIA_DEDUP_EXCLUDE', DEFAULT_EXCLUDE)}
+        for dirpath, dirnames, filenames in os.walk(root):
+            relative_dir = os.path.relpath(dirpath, root).replace(os.sep, '/')
+            relative_dir = '' if relative_dir == '.' else relative_dir
+            dirnames[:] = sorted(
+                d for d in dirnames
+                if (f'{relative_dir}/{d}' if relative_dir else d) not in skip
+            )
+            for filename in sorted(filenames):
+                yield f'{relative_dir}/{filename}' if relative_dir else filename
+
+    def _references(self, names):
+        """จำนวนแถวในฐานข้อมูลที่อ้างถึงแต่ละไฟล์"""
+        refs = Counter()
+        for model, field in self.fields:
+            rows = (
+                model._base_manager.filter(**{f'{field}__in': names})
+                .values(field).annotate(n=Count('pk')).order_by()
+            )
+            for row in rows:
+                refs[row[field]] += row['n']
+        return refs
+
+    def _blob_for(self, sha256, name):
+        if sha256 in self.known:
+            return self.known[sha256], True
+        existing = MediaBlob.objects.filter(sha256=sha256).values_list('name', flat=True).first()
+        if existing:
+            return existing, True
+        return blob_name(sha256, name), False
+
+    def _process(self, names):
+        refs = self._references(names)
+        renames = {}
+        new_blobs = {}
+        added_refs = Counter()
+        to_remove = []
+
+        for name in names:
+            self.stats['scanned'] += 1
+            path = default_storage.path(name)
+            if not refs[name]:
+                self.stats['unreferenced'] += 1
+                self.stats['unreferenced_bytes'] += os.path.getsize(path)
+                continue
+            try:
+                with open(path, 'rb') as fileobj:
+                    sha256, size = hash_file(fileobj)
+            except OSError as exc:
+                self.stats['errors'] += 1
+                self.stderr.write(f"{name}: {exc}")
+                continue
+
+            target, exists = self._blob_for(sha256, name)
+            if exists:
+                to_remove.append(path)
+                self.stats['duplicates'] += 1
+                self.stats['bytes_saved'] += size
+            else:
+                if not self.dry_run:
+                    _link_or_copy(path, default_storage.path(target))
+                new_blobs[sha256] = MediaBlob(sha256=sha256, name=target, size=size, ref_count=0)
+                self.stats['moved'] += 1
+                to_remove.append(path)  # ไฟล์เดิมลบได้หลังย้ายชื่อในฐานข้อมูลแล้ว
+            self.known[sha256] = target
+            renames[name] = target
+            added_refs[sha256] += refs[name]
+
+        if self.dry_run or not renames:
+            return
+
+        with transaction.atomic():
+            MediaBlob.objects.bulk_create(new_blobs.values())
+            for model, field in self.fields:
+                model._base_manager.filter(**{f'{field}__in': list(renames)}).update(**{
+                    field: Case(
+                        *[When(**{field: old}, then=Value(new)) for old, new in renames.items()],
+                        default=F(field),
+                        output_field=CharField(),
+                    )
+                })
+            for sha256, count in added_refs.items():
+                MediaBlob.objects.filter(sha256=sha256).update(ref_count=F('ref_count') + count)
+
+        # ฐานข้อมูลชี้ไปที่ blob แล้ว จึงลบไฟล์เดิมได้
+        for path in to_remove:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
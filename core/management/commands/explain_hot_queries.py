@@ -0,0 +1,105 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Sum
+from django.utils import timezone
+
+from cart.models import Cart
+from core.models import WorkSchedule
+from framings.models import CustomFrameOrder
+from plaques.models import CustomPlaqueOrder
+from stores.models import Order
+
+
+def column_indexes(model, column):
+    """ชื่อ index ที่ Django สร้างให้คอลัมน์ที่ตั้ง db_index=True"""
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+    return tuple(
+        name for name, info in constraints.items()
+        if info['index'] and not info['primary_key'] and info['columns'] == [column]
+    )
+
+
+class Command(BaseCommand):
+    help = "รัน EXPLAIN กับ query ที่ถูกเรียกบ่อย เพื่อตรวจว่าฐานข้อมูลใช้ index ที่สร้างไว้"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=int, help="ผู้ใช้ที่ใช้ทดสอบ query ประวัติการสั่งซื้อ (ค่าเริ่มต้น: ผู้ใช้คนแรก)")
+        parser.add_argument('--verbose-plan', action='store_true', help="แสดงแผนการทำงาน (EXPLAIN) แบบเต็ม")
+
+    def hot_queries(self, user_id):
+        paid_status = ['processing', 'shipped']
+        today = timezone.localdate()
+        queries = []
+
+        # (ชื่อ, queryset, index ที่ควรถูกใช้)
+        for label, model, user_field, amount_field, prefix, user_prefix in (
+            ('สินค้า', Order, 'customer', 'total_price', 'order', 'order_cust'),
+            ('กรอบรูป', CustomFrameOrder, 'user', 'total_price', 'frame', 'frame_user'),
+            ('ป้ายหินอ่อน', CustomPlaqueOrder, 'user', 'final_price', 'plaque', 'plaque_user'),
+        ):
+            objects = model.objects
+            user_indexes = (
+                f'{prefix}_{user_field}_created_idx',
+                f'{user_prefix}_status_created_idx',
+            )
+            queries += [
+                (f"[{label}] Dashboard ยอดขาย",
+                 objects.filter(status__in=paid_status).values('status').annotate(total=Sum(amount_field)),
+                 (f'{prefix}_status_created_idx',)),
+                (f"[{label}] ออเดอร์รอตรวจสอบ",
+                 objects.filter(status='pending').order_by('-created_at'),
+                 (f'{prefix}_status_created_idx',)),
+                (f"[{label}] หน้าจัดการออเดอร์",
+                 objects.order_by('-created_at', '-id')[:50],
+                 (f'{prefix}_created_idx',)),
+                (f"[{label}] ประวัติของลูกค้า",
+                 objects.filter(**{user_field: user_id}).order_by('-created_at'),
+                 user_indexes),
+                (f"[{label}] ประวัติของลูกค้า (กรองสถานะ)",
+                 objects.filter(**{user_field: user_id, 'status': 'pending'}).order_by('-created_at'),
+                 (f'{user_prefix}_status_created_idx',)),
+            ]
+
+        queries += [
+            ("[ปฏิทิน] งานในช่วงเดือน",
+             WorkSchedule.objects.filter(start_date__gte=today, start_date__lt=today + timedelta(days=42)),
+             column_indexes(WorkSchedule, 'start_date')),
+            ("[ตะกร้า] ค้นหาตะกร้าจาก session",
+             Cart.objects.filter(session_key='x' * 32),
+             column_indexes(Cart, 'session_key')),
+        ]
+        return queries
+
+    def explain(self, queryset):
+        # MySQL 8 แบบ TREE บอกชื่อ index ที่ใช้จริง (แบบปกติจะมีคอลัมน์ possible_keys ปนมาด้วย)
+        if connection.vendor == 'mysql':
+            return queryset.explain(format='TREE')
+        return queryset.explain()
+
+    def handle(self, *args, **options):
+        user_id = options['user_id']
+        if user_id is None:
+            user_id = get_user_model().objects.order_by('pk').values_list('pk', flat=True).first() or 0
+
+        missing = 0
+        for label, queryset, expected_indexes in self.hot_queries(user_id):
+            plan = self.explain(queryset)
+            used = [name for name in expected_indexes if name in plan]
+            missing += not used
+
+            if used:
+                self.stdout.write(f"{label}: {self.style.SUCCESS('ใช้ index')} {', '.join(used)}")
+            else:
+                self.stdout.write(f"{label}: {self.style.WARNING('ไม่พบ index ที่คาดไว้')} ({', '.join(expected_indexes)})")
+            if options['verbose_plan'] or not used:
+                self.stdout.write(f"    {plan}")
+
+        if missing:
+            self.stdout.write(self.style.WARNING(
+                f"มี {missing} query ที่ไม่ได้ใช้ index ที่คาดไว้ "
+                "(ถ้าตารางยังมีข้อมูลน้อย ฐานข้อมูลอาจเลือกสแกนทั้งตารางเพราะเร็วกว่า)"
+            ))
@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.lead_time import analyze, format_duration
+from core.order_types import ORDER_STATUS_CHOICES, ORDER_TYPES
+
+
+class Command(BaseCommand):
+    help = "สรุป lead time การผลิต (processing -> shipped) และเวลาที่ออเดอร์อยู่ในแต่ละสถานะ จากประวัติสถานะ"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', choices=sorted(ORDER_TYPES), action='append', dest='types',
+                            help="ประเภทออเดอร์ (ใส่ได้หลายครั้ง ค่าเริ่มต้น: ทุกประเภท)")
+        parser.add_argument('--days', type=int, help="ใช้เฉพาะประวัติ N วันล่าสุด")
+        parser.add_argument('--percentiles', default='50,90,95,99', help="percentile ที่ต้องการ คั่นด้วยจุลภาค")
+
+    def handle(self, *args, **options):
+        try:
+            percentiles = [float(value) for value in options['percentiles'].split(',')]
+        except ValueError:
+            raise CommandError("--percentiles ต้องเป็นตัวเลขคั่นด้วยจุลภาค เช่น 50,90,99")
+
+        since = timezone.now() - timedelta(days=options['days']) if options['days'] else None
+        types = options['types'] or list(ORDER_TYPES)
+        lead_times, time_in_status = analyze(types, since)
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Lead time การผลิต (เริ่มผลิต -> จัดส่ง)"))
+        for key in types:
+            self.stdout.write(self._line(ORDER_TYPES[key].label, lead_times.get(key), percentiles))
+
+        self.stdout.write(self.style.MIGRATE_HEADING("เวลาที่อยู่ในแต่ละสถานะก่อนเปลี่ยน"))
+        for key in types:
+            for status, label in ORDER_STATUS_CHOICES:
+                histogram = time_in_status.get((key, status))
+                if histogram:
+                    self.stdout.write(self._line(f"{ORDER_TYPES[key].label} / {label}", histogram, percentiles))
+
+    def _line(self, label, histogram, percentiles):
+        if histogram is None or not histogram.count:
+            return f"  {label}: ยังไม่มีข้อมูล"
+        values = "  ".join(f"p{p:g}={format_duration(histogram.percentile(p))}" for p in percentiles)
+        return f"  {label} ({histogram.count} ครั้ง): {values}  เฉลี่ย={format_duration(histogram.mean)}"
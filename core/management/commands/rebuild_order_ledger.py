@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from core.ledger import rebuild_ledger
+from core.order_types import ORDER_TYPES
+
+
+class Command(BaseCommand):
+    help = "สร้างสมุดรวมออเดอร์ (OrderLedgerEntry) ใหม่ทั้งหมดจากตารางออเดอร์ทั้ง 3 ประเภท"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="จำนวนออเดอร์ที่อ่าน/เขียนต่อรอบ")
+
+    def handle(self, *args, **options):
+        counts = rebuild_ledger(batch_size=options['batch_size'])
+
+        for key, count in counts.items():
+            self.stdout.write(f"{ORDER_TYPES[key].label}: {count} ออเดอร์")
+        self.stdout.write(self.style.SUCCESS(f"สร้างสมุดรวมออเดอร์ใหม่เรียบร้อย ({sum(counts.values())} แถว)"))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from core.rollup import reconcile
+
+
+class Command(BaseCommand):
+    help = "คำนวณตารางสรุปยอดขาย (SalesRollup) ใหม่จากออเดอร์จริง และรายงานแถวที่คลาดเคลื่อน"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="รายงานอย่างเดียว ไม่เขียนทับตารางสรุป")
+
+    def handle(self, *args, **options):
+        drift = reconcile(dry_run=options['dry_run'])
+
+        for (order_type, status, day), have, want in drift:
+            self.stdout.write(
+                f"{day} {order_type}/{status}: "
+                f"ในตารางสรุป {have[0]} ออเดอร์ {have[1]} บาท -> ที่ถูกต้อง {want[0]} ออเดอร์ {want[1]} บาท"
+            )
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("ตารางสรุปยอดขายตรงกับข้อมูลจริงแล้ว"))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"พบ {len(drift)} แถวที่ไม่ตรง (dry-run: ยังไม่ได้แก้ไข)"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"แก้ไข {len(drift)} แถวที่ไม่ตรงเรียบร้อยแล้ว"))
@@ -0,0 +1,193 @@
+"""
+เสิร์ฟไฟล์ใน MEDIA_ROOT พร้อมตรวจสิทธิ์
+
+สลิปโอนเงินและรูปที่ลูกค้าส่งมาเป็นข้อมูลส่วนตัว: ดูได้เฉพาะเจ้าของออเดอร์/เจ้าของบัญชี และ staff
+รูปสินค้า (และรูปย่อของสินค้า) ใครก็ดูได้
+
+วิธีส่งไฟล์ (MEDIA_SERVE_BACKEND ใน settings)
+- 'django'  : Django อ่านไฟล์ส่งเองทีละ chunk รองรับ ETag / Last-Modified / Range / 304
+- 'nginx'   : ตอบแค่ header X-Accel-Redirect ให้ nginx ส่งไฟล์เอง (worker ว่างทันที)
+              ต้องตั้ง location ภายใน เช่น
+                  location /protected-media/ { internal; alias /path/to/media/; }
+              แล้วตั้ง MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+- 'sendfile': ตอบ header X-Sendfile (Apache mod_xsendfile / lighttpd) พร้อม path เต็มของไฟล์
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+
+# (model, field ไฟล์, field เจ้าของ) ไฟล์ที่ดูได้เฉพาะเจ้าของและ staff
+PRIVATE_MEDIA = (
+    ('stores.Order', 'payment_slip', 'customer'),
+    ('framings.CustomFrameOrder', 'uploaded_image', 'user'),
+    ('framings.CustomFrameOrder', 'payment_slip', 'user'),
+    ('plaques.CustomPlaqueOrder', 'deceased_photo', 'user'),
+    ('plaques.CustomPlaqueOrder', 'PAYMENT_SLIP', 'user'),
+    ('accounts.CustomUser', 'image', 'pk'),
+)
+
+# (model, field ไฟล์) ไฟล์สาธารณะ
+PUBLIC_MEDIA = (
+    ('stores.Product', 'image'),
+)
+
+# ไฟล์ที่ไม่ได้อ้างอิงจากฐานข้อมูลแต่เปิดให้ทุกคน (รูปย่อสินค้า, รูปโปรไฟล์เริ่มต้น)
+PUBLIC_PREFIXES = ('products/', 'profile_pics/default')
+
+CHUNK_SIZE = 64 * 1024
+PRIVATE_MAX_AGE = 60 * 60
+PUBLIC_MAX_AGE = 60 * 60 * 24
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def is_public(name):
+    if name.startswith(PUBLIC_PREFIXES):
+        return True
+    return any(
+        apps.get_model(label)._base_manager.filter(**{field: name}).exists()
+        for label, field in PUBLIC_MEDIA
+    )
+
+
+def can_access(user, name):
+    """ผู้ใช้นี้ดูไฟล์ส่วนตัวนี้ได้หรือไม่ (staff ดูได้ทุกไฟล์; ไฟล์สาธารณะให้เช็ค is_public ก่อน)"""
+    if not user.is_authenticated:
+        return False
+    if user.is_staff and user.is_active:
+        return True
+    return any(
+        apps.get_model(label)._base_manager.filter(**{field: name, owner_field: user.pk}).exists()
+        for label, field, owner_field in PRIVATE_MEDIA
+    )
+
+
+def media_path(name):
+    try:
+        path = safe_join(settings.MEDIA_ROOT, name)
+    except SuspiciousFileOperation:
+        raise Http404("ไม่พบไฟล์")
+    if not os.path.isfile(path):
+        raise Http404("ไม่พบไฟล์")
+    return path
+
+
+def _etag(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        return if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return since is not None and int(mtime) <= since
+
+
+def _byte_range(request, size, etag, mtime):
+    """
+    (start, end) ของ Range ที่ขอ (รองรับช่วงเดียว) หรือ None ถ้าต้องส่งทั้งไฟล์
+    raise ValueError ถ้าช่วงที่ขออยู่นอกไฟล์
+    """
+    header = request.headers.get('Range')
+    if not header or request.method != 'GET':
+        return None
+    if_range = request.headers.get('If-Range')
+    if if_range:
+        date = parse_http_date_safe(if_range)
+        if if_range != etag and (date is None or int(mtime) > date):
+            return None  # ไฟล์เปลี่ยนไปแล้ว ส่งใหม่ทั้งไฟล์
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None  # รูปแบบที่ไม่รองรับ (เช่นหลายช่วง) ส่งทั้งไฟล์ตามมาตรฐาน
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    elif last:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        return None
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def _read_chunks(path, start, length):
+    with open(path, 'rb') as fileobj:
+        fileobj.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = fileobj.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _stream_response(request, path, stat, content_type):
+    etag = _etag(stat)
+    headers = {'ETag': etag, 'Last-Modified': http_date(stat.st_mtime), 'Accept-Ranges': 'bytes'}
+
+    if _not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+    else:
+        size = stat.st_size
+        try:
+            byte_range = _byte_range(request, size, etag, stat.st_mtime)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        start, end = byte_range or (0, size - 1)
+        length = max(end - start + 1, 0)
+        if request.method == 'HEAD':
+            response = HttpResponse(content_type=content_type, status=206 if byte_range else 200)
+        else:
+            response = StreamingHttpResponse(
+                _read_chunks(path, start, length), content_type=content_type,
+                status=206 if byte_range else 200,
+            )
+        response['Content-Length'] = str(length)
+        if byte_range:
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    for key, value in headers.items():
+        response[key] = value
+    return response
+
+
+def serve_file(request, name, public):
+    """สร้าง response ของไฟล์ (ตรวจสิทธิ์มาก่อนแล้ว)"""
+    path = media_path(name)
+    content_type, encoding = mimetypes.guess_type(path)
+    content_type = content_type or 'application/octet-stream'
+    backend = getattr(settings, 'MEDIA_SERVE_BACKEND', 'django')
+
+    if backend == 'nginx':
+        response = HttpResponse(content_type=content_type)
+        prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(name)
+    elif backend == 'sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+    else:
+        response = _stream_response(request, path, os.stat(path), content_type)
+
+    if encoding:
+        response['Content-Encoding'] = encoding
+    if public:
+        patch_cache_control(response, public=True, max_age=PUBLIC_MAX_AGE)
+    else:
+        patch_cache_control(response, private=True, max_age=PRIVATE_MAX_AGE)
+    return response
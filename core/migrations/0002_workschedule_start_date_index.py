@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='workschedule',
+            name='start_date',
+            field=models.DateField(db_index=True, verbose_name='วันที่'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:59
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# (app, model, field ยอดเงิน) ของออเดอร์ทั้ง 3 ประเภท
+ORDER_MODELS = {
+    'product': ('stores', 'Order', 'total_price'),
+    'framing': ('framings', 'CustomFrameOrder', 'total_price'),
+    'plaque': ('plaques', 'CustomPlaqueOrder', 'final_price'),
+}
+
+
+def backfill_rollup(apps, schema_editor):
+    SalesRollup = apps.get_model('core', 'SalesRollup')
+    buckets = {}
+    for order_type, (app_label, model_name, amount_field) in ORDER_MODELS.items():
+        model = apps.get_model(app_label, model_name)
+        # แปลงเป็นวันที่ใน Python (TruncDate ใน MySQL ที่ไม่มีตาราง time zone ได้ NULL)
+        rows = model.objects.values_list('status', 'created_at', amount_field).order_by().iterator(chunk_size=2000)
+        for status, created_at, amount in rows:
+            key = (order_type, status, timezone.localdate(created_at))
+            count, revenue = buckets.get(key, (0, Decimal('0')))
+            buckets[key] = (count + 1, revenue + (amount or 0))
+    SalesRollup.objects.bulk_create(
+        [
+            SalesRollup(order_type=order_type, status=status, day=day, order_count=count, revenue=revenue)
+            for (order_type, status, day), (count, revenue) in buckets.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_workschedule_start_date_index'),
+        ('stores', '0009_order_indexes'),
+        ('framings', '0007_customframeorder_indexes'),
+        ('plaques', '0009_customplaqueorder_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_type', models.CharField(choices=[('product', 'สินค้า'), ('framing', 'กรอบรูป'), ('plaque', 'ป้ายหินอ่อน')], max_length=20, verbose_name='ประเภทออเดอร์')),
+                ('status', models.CharField(max_length=20, verbose_name='สถานะ')),
+                ('day', models.DateField(verbose_name='วันที่สั่ง')),
+                ('order_count', models.IntegerField(default=0, verbose_name='จำนวนออเดอร์')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='ยอดเงินรวม')),
+            ],
+            options={
+                'verbose_name': 'สรุปยอดขายรายวัน',
+                'verbose_name_plural': 'สรุปยอดขายรายวัน',
+                'constraints': [models.UniqueConstraint(fields=('order_type', 'status', 'day'), name='sales_rollup_unique_bucket')],
+            },
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
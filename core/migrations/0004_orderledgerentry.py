@@ -0,0 +1,60 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+# (app, model, field ลูกค้า, field ยอดเงิน) ของออเดอร์ทั้ง 3 ประเภท
+ORDER_MODELS = {
+    'product': ('stores', 'Order', 'customer', 'total_price'),
+    'framing': ('framings', 'CustomFrameOrder', 'user', 'total_price'),
+    'plaque': ('plaques', 'CustomPlaqueOrder', 'user', 'final_price'),
+}
+
+
+def backfill_ledger(apps, schema_editor):
+    OrderLedgerEntry = apps.get_model('core', 'OrderLedgerEntry')
+    for order_type, (app_label, model_name, user_field, amount_field) in ORDER_MODELS.items():
+        model = apps.get_model(app_label, model_name)
+        rows = model.objects.values_list('pk', f'{user_field}_id', 'status', amount_field, 'created_at')
+        OrderLedgerEntry.objects.bulk_create(
+            [
+                OrderLedgerEntry(
+                    order_type=order_type, order_id=pk, user_id=user_id,
+                    status=status, amount=amount or 0, created_at=created_at,
+                )
+                for pk, user_id, status, amount, created_at in rows.iterator()
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_salesrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_type', models.CharField(choices=[('product', 'สินค้า'), ('framing', 'กรอบรูป'), ('plaque', 'ป้ายหินอ่อน')], max_length=20, verbose_name='ประเภทออเดอร์')),
+                ('order_id', models.PositiveBigIntegerField(verbose_name='เลขที่ออเดอร์')),
+                ('status', models.CharField(choices=[('pending', 'รอชำระเงิน'), ('processing', 'กำลังผลิต/เตรียมพัสดุ'), ('shipped', 'จัดส่งแล้ว'), ('cancelled', 'ยกเลิก')], max_length=20, verbose_name='สถานะ')),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='ยอดสุทธิ')),
+                ('created_at', models.DateTimeField(verbose_name='วันที่สั่ง')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to=settings.AUTH_USER_MODEL, verbose_name='ลูกค้า')),
+            ],
+            options={
+                'verbose_name': 'สมุดรวมออเดอร์',
+                'verbose_name_plural': 'สมุดรวมออเดอร์',
+                'indexes': [models.Index(fields=['created_at'], name='ledger_created_idx'), models.Index(fields=['status', 'created_at'], name='ledger_status_created_idx'), models.Index(fields=['user', 'created_at'], name='ledger_user_created_idx'), models.Index(fields=['user', 'status', 'created_at'], name='ledger_user_status_created_idx')],
+                'constraints': [models.UniqueConstraint(fields=('order_type', 'order_id'), name='ledger_unique_order')],
+            },
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_orderledgerentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='ชื่อไฟล์ใน storage')),
+                ('size', models.PositiveBigIntegerField(verbose_name='ขนาด (bytes)')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='จำนวนที่ถูกอ้างอิง')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='เวลาสร้าง')),
+            ],
+            options={
+                'verbose_name': 'ไฟล์ media',
+                'verbose_name_plural': 'ไฟล์ media',
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:19
+
+from django.db import migrations, models
+
+# ราคาที่เคยเขียนไว้ในโค้ด (framings/views.py, plaques/models.py, ค่าส่งในหน้า checkout)
+INITIAL_PRICES = [
+    ('frame_size', '8x10', '150.00'),
+    ('frame_size', '10x12', '200.00'),
+    ('frame_size', '16x20', '600.00'),
+    ('plaque_size', '15x20', '1000.00'),
+    ('plaque_size', '14x29', '1700.00'),
+    ('shipping', 'pickup', '0.00'),
+    ('shipping', 'standard', '50.00'),
+    ('shipping', 'express', '100.00'),
+]
+
+
+def seed_prices(apps, schema_editor):
+    PriceEntry = apps.get_model('core', 'PriceEntry')
+    PriceEntry.objects.bulk_create([
+        PriceEntry(category=category, code=code, amount=amount)
+        for category, code, amount in INITIAL_PRICES
+    ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_mediablob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('frame_size', 'ขนาดกรอบรูป (ราคาต่อชิ้น)'), ('plaque_size', 'ขนาดป้ายหินอ่อน'), ('shipping', 'ค่าจัดส่ง')], max_length=20, verbose_name='หมวด')),
+                ('code', models.CharField(max_length=20, verbose_name='รหัส (เช่น 8x10, standard)')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='ราคา (บาท)')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='แก้ไขล่าสุด')),
+            ],
+            options={
+                'verbose_name': 'ราคา',
+                'verbose_name_plural': 'ตารางราคา',
+                'constraints': [models.UniqueConstraint(fields=('category', 'code'), name='price_unique_code')],
+            },
+        ),
+        migrations.RunPython(seed_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:27
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_priceentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_type', models.CharField(choices=[('product', 'สินค้า'), ('framing', 'กรอบรูป'), ('plaque', 'ป้ายหินอ่อน')], max_length=20, verbose_name='ประเภทออเดอร์')),
+                ('order_id', models.PositiveBigIntegerField(verbose_name='เลขที่ออเดอร์')),
+                ('from_status', models.CharField(blank=True, max_length=20, verbose_name='สถานะเดิม')),
+                ('to_status', models.CharField(max_length=20, verbose_name='สถานะใหม่')),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='เวลาที่เปลี่ยน')),
+            ],
+            options={
+                'verbose_name': 'ประวัติสถานะออเดอร์',
+                'verbose_name_plural': 'ประวัติสถานะออเดอร์',
+                'indexes': [models.Index(fields=['order_type', 'order_id', 'changed_at'], name='status_event_order_idx'), models.Index(fields=['changed_at'], name='status_event_changed_idx')],
+            },
+        ),
+    ]
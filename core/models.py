@@ -1,9 +1,189 @@
+from django.conf import settings
 from django.db import models
+from django.urls import reverse
+from django.utils import timezone
+
+from .order_types import ORDER_STATUS_CHOICES, ORDER_TYPE_CHOICES, ORDER_TYPES
 
 class WorkSchedule(models.Model):
     title = models.CharField(max_length=200, verbose_name="รายละเอียดงาน")
-    start_date = models.DateField(verbose_name="วันที่")
+    start_date = models.DateField(verbose_name="วันที่", db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.title} ({self.start_date})"
\ No newline at end of file
+        return f"{self.title} ({self.start_date})"
+
+# ข้อมูลลูกค้า ณ ตอนสั่ง (ชื่อ/เบอร์/ที่อยู่) เก็บไว้ในแถวออเดอร์เลย ใช้กับออเดอร์ทั้ง 3 ประเภท
+# - ที่อยู่จัดส่งไม่เปลี่ยนตามเมื่อลูกค้าแก้โปรไฟล์ภายหลัง
+# - หน้าคิวออเดอร์ของแอดมินไม่ต้องไปอ่านตาราง user ทีละแถว
+# ค่าถูกกรอกตอนสร้างออเดอร์ใน signal (core/signals.py)
+class CustomerSnapshot(models.Model):
+    customer_name = models.CharField(max_length=255, blank=True, default='', verbose_name="ชื่อลูกค้า (ตอนสั่ง)")
+    customer_phone = models.CharField(max_length=20, blank=True, default='', verbose_name="เบอร์โทร (ตอนสั่ง)")
+    customer_address = models.TextField(blank=True, default='', verbose_name="ที่อยู่ (ตอนสั่ง)")
+
+    class Meta:
+        abstract = True
+
+    @staticmethod
+    def snapshot_of(user):
+        """ค่าของ field snapshot จาก user (ไม่มีชื่อจริงใช้ username แทน)"""
+        if user is None:
+            return {'customer_name': '', 'customer_phone': '', 'customer_address': ''}
+        name = f"{user.first_name} {user.last_name}".strip() or user.username
+        return {
+            'customer_name': name[:255],
+            'customer_phone': (getattr(user, 'phone_number', None) or '')[:20],
+            'customer_address': getattr(user, 'address', None) or '',
+        }
+
+    def fill_customer_snapshot(self, user):
+        for field, value in self.snapshot_of(user).items():
+            setattr(self, field, value)
+
+
+# ตารางสรุปยอดขายรายวัน (ประเภทออเดอร์ x สถานะ x วัน) อัปเดตอัตโนมัติจาก signal ใน core/signals.py
+class SalesRollup(models.Model):
+    order_type = models.CharField(max_length=20, choices=ORDER_TYPE_CHOICES, verbose_name="ประเภทออเดอร์")
+    status = models.CharField(max_length=20, verbose_name="สถานะ")
+    day = models.DateField(verbose_name="วันที่สั่ง")
+    order_count = models.IntegerField(default=0, verbose_name="จำนวนออเดอร์")
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="ยอดเงินรวม")
+
+    class Meta:
+        verbose_name = "สรุปยอดขายรายวัน"
+        verbose_name_plural = "สรุปยอดขายรายวัน"
+        constraints = [
+            models.UniqueConstraint(fields=['order_type', 'status', 'day'], name='sales_rollup_unique_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.order_type}/{self.status}: {self.order_count} ({self.revenue})"
+
+
+# สมุดรวมออเดอร์ทุกประเภท (1 แถวต่อ 1 ออเดอร์) ใช้ทำหน้าที่ต้องดูข้ามประเภทด้วย query เดียว
+# ข้อมูลถูกซิงก์จาก signal ใน core/signals.py รายละเอียดเฉพาะของแต่ละประเภทค่อยดึงเมื่อต้องใช้ (ดู core/ledger.py)
+class OrderLedgerEntry(models.Model):
+    order_type = models.CharField(max_length=20, choices=ORDER_TYPE_CHOICES, verbose_name="ประเภทออเดอร์")
+    order_id = models.PositiveBigIntegerField(verbose_name="เลขที่ออเดอร์")
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE, null=True, blank=True,
+        related_name='ledger_entries',
+        verbose_name="ลูกค้า",
+    )
+    status = models.CharField(max_length=20, choices=ORDER_STATUS_CHOICES, verbose_name="สถานะ")
+    amount = models.DecimalField(max_digits=10, decimal_places=2, default=0, verbose_name="ยอดสุทธิ")
+    created_at = models.DateTimeField(verbose_name="วันที่สั่ง")
+
+    class Meta:
+        verbose_name = "สมุดรวมออเดอร์"
+        verbose_name_plural = "สมุดรวมออเดอร์"
+        constraints = [
+            models.UniqueConstraint(fields=['order_type', 'order_id'], name='ledger_unique_order'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at'], name='ledger_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='ledger_status_created_idx'),
+            models.Index(fields=['user', 'created_at'], name='ledger_user_created_idx'),
+            models.Index(fields=['user', 'status', 'created_at'], name='ledger_user_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.order_type} #{self.order_id} ({self.status})"
+
+    @property
+    def type_label(self):
+        return ORDER_TYPES[self.order_type].label
+
+    def get_absolute_url(self):
+        # หน้ารายละเอียดออเดอร์ฝั่งลูกค้า (accounts/urls.py)
+        return reverse(f'{self.order_type}_order_detail', args=[self.order_id])
+
+    def get_manage_url(self):
+        return reverse(ORDER_TYPES[self.order_type].manager_url)
+
+    @property
+    def order(self):
+        """ออเดอร์ตัวจริง (ดึงเมื่อเรียกใช้ครั้งแรก หรือใช้ attach_orders ดึงทีละหลายรายการ)"""
+        if not hasattr(self, '_order'):
+            self._order = ORDER_TYPES[self.order_type].model.objects.filter(pk=self.order_id).first()
+        return self._order
+
+    @property
+    def payment_slip(self):
+        order = self.order
+        return getattr(order, ORDER_TYPES[self.order_type].slip_field) if order else None
+
+
+# ประวัติการเปลี่ยนสถานะของออเดอร์ทุกประเภท (เพิ่มอย่างเดียว ไม่แก้/ไม่ลบ)
+# 1 แถวต่อการเปลี่ยน 1 ครั้ง (รวมตอนสร้างออเดอร์ from_status = '') เขียนใน transaction เดียวกับการเปลี่ยนสถานะ
+# ใช้คำนวณเวลาที่ออเดอร์อยู่ในแต่ละสถานะ (ดู core/lead_time.py)
+class OrderStatusEvent(models.Model):
+    order_type = models.CharField(max_length=20, choices=ORDER_TYPE_CHOICES, verbose_name="ประเภทออเดอร์")
+    order_id = models.PositiveBigIntegerField(verbose_name="เลขที่ออเดอร์")
+    from_status = models.CharField(max_length=20, blank=True, verbose_name="สถานะเดิม")
+    to_status = models.CharField(max_length=20, verbose_name="สถานะใหม่")
+    changed_at = models.DateTimeField(default=timezone.now, verbose_name="เวลาที่เปลี่ยน")
+
+    class Meta:
+        verbose_name = "ประวัติสถานะออเดอร์"
+        verbose_name_plural = "ประวัติสถานะออเดอร์"
+        indexes = [
+            # ไล่ประวัติทีละออเดอร์ตามเวลา (การคำนวณ lead time อ่านตามลำดับนี้)
+            models.Index(fields=['order_type', 'order_id', 'changed_at'], name='status_event_order_idx'),
+            models.Index(fields=['changed_at'], name='status_event_changed_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.order_type} #{self.order_id}: {self.from_status or '-'} -> {self.to_status}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("ประวัติสถานะแก้ไขไม่ได้ (เพิ่มแถวใหม่เท่านั้น)")
+        super().save(*args, **kwargs)
+
+
+# ไฟล์ media ที่เก็บตามเนื้อหา (SHA-256) ไฟล์เนื้อหาเดียวกันจะมีแค่ชุดเดียว
+# ref_count = จำนวน field ในฐานข้อมูลที่ชี้มาที่ไฟล์นี้ (ดู core/storage.py)
+class MediaBlob(models.Model):
+    sha256 = models.CharField(max_length=64, unique=True, verbose_name="SHA-256")
+    name = models.CharField(max_length=255, unique=True, verbose_name="ชื่อไฟล์ใน storage")
+    size = models.PositiveBigIntegerField(verbose_name="ขนาด (bytes)")
+    ref_count = models.PositiveIntegerField(default=0, verbose_name="จำนวนที่ถูกอ้างอิง")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="เวลาสร้าง")
+
+    class Meta:
+        verbose_name = "ไฟล์ media"
+        verbose_name_plural = "ไฟล์ media"
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
+
+
+# ตารางราคา (ขนาดกรอบรูป / ขนาดป้าย / ค่าจัดส่ง) แก้ได้จากหน้า Django admin
+# โค้ดอ่านผ่าน core/pricing.py ซึ่ง cache ตารางทั้งชุดไว้ และล้าง cache เมื่อแถวถูกแก้ (core/signals.py)
+class PriceEntry(models.Model):
+    FRAME_SIZE = 'frame_size'
+    PLAQUE_SIZE = 'plaque_size'
+    SHIPPING = 'shipping'
+    CATEGORY_CHOICES = [
+        (FRAME_SIZE, 'ขนาดกรอบรูป (ราคาต่อชิ้น)'),
+        (PLAQUE_SIZE, 'ขนาดป้ายหินอ่อน'),
+        (SHIPPING, 'ค่าจัดส่ง'),
+    ]
+
+    category = models.CharField(max_length=20, choices=CATEGORY_CHOICES, verbose_name="หมวด")
+    code = models.CharField(max_length=20, verbose_name="รหัส (เช่น 8x10, standard)")
+    amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="ราคา (บาท)")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="แก้ไขล่าสุด")
+
+    class Meta:
+        verbose_name = "ราคา"
+        verbose_name_plural = "ตารางราคา"
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'code'], name='price_unique_code'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_category_display()} {self.code}: {self.amount}"
@@ -0,0 +1,67 @@
+"""
+ข้อมูลกลางของออเดอร์ทั้ง 3 ประเภท
+
+แต่ละตารางตั้งชื่อ field ไม่เหมือนกัน (customer/user, total_price/final_price,
+payment_slip/PAYMENT_SLIP) โค้ดที่ต้องทำงานข้ามประเภทให้อ่านชื่อ field จากที่นี่
+"""
+from decimal import Decimal
+
+from django.apps import apps
+
+
+class OrderType:
+    def __init__(self, key, label, model_label, user_field, amount_field, slip_field, manager_url):
+        self.key = key
+        self.label = label
+        self.model_label = model_label
+        self.user_field = user_field
+        self.amount_field = amount_field
+        self.slip_field = slip_field
+        self.manager_url = manager_url  # ชื่อ url หน้าจัดการออเดอร์ประเภทนี้ (Admin)
+
+    def __repr__(self):
+        return f"<OrderType {self.key}>"
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    @staticmethod
+    def to_amount(value):
+        # ค่าที่เพิ่งตั้งใน view อาจยังเป็น int อยู่ แปลงเป็น Decimal 2 ตำแหน่งให้ตรงกับในฐานข้อมูล
+        return Decimal(str(value or 0)).quantize(Decimal('0.01'))
+
+    def amount(self, order):
+        return self.to_amount(getattr(order, self.amount_field))
+
+    def user_id(self, order):
+        return getattr(order, f'{self.user_field}_id')
+
+
+ORDER_TYPES = {
+    'product': OrderType('product', 'สินค้า', 'stores.Order', 'customer', 'total_price', 'payment_slip', 'admin-order-list'),
+    'framing': OrderType('framing', 'กรอบรูป', 'framings.CustomFrameOrder', 'user', 'total_price', 'payment_slip', 'orderframings_manager'),
+    'plaque': OrderType('plaque', 'ป้ายหินอ่อน', 'plaques.CustomPlaqueOrder', 'user', 'final_price', 'PAYMENT_SLIP', 'orderplaques_manager'),
+}
+
+ORDER_TYPE_CHOICES = [(order_type.key, order_type.label) for order_type in ORDER_TYPES.values()]
+
+# ทั้ง 3 ตารางใช้ชุดสถานะเดียวกัน
+ORDER_STATUS_CHOICES = [
+    ('pending', 'รอชำระเงิน'),
+    ('processing', 'กำลังผลิต/เตรียมพัสดุ'),
+    ('shipped', 'จัดส่งแล้ว'),
+    ('cancelled', 'ยกเลิก'),
+]
+
+# สถานะที่นับเป็นยอดขาย (เงินเข้าแล้ว)
+PAID_STATUSES = ('processing', 'shipped')
+
+
+def for_model(model):
+    """หา OrderType จาก model class (คืนค่า None ถ้าไม่ใช่ตารางออเดอร์)"""
+    label = model._meta.label
+    for order_type in ORDER_TYPES.values():
+        if order_type.model_label == label:
+            return order_type
+    return None
@@ -0,0 +1,196 @@
+"""
+Keyset (cursor) pagination ใช้ร่วมกันทุกหน้ารายการ
+
+แทนที่จะใช้ OFFSET (ยิ่งหน้าลึกยิ่งช้า) จะจำค่าคีย์ของแถวสุดท้าย/แรกไว้ใน cursor
+แล้วดึงหน้าถัดไปด้วย WHERE (created_at, id) < (ค่าที่จำไว้) ทำให้ทุกหน้าใช้เวลาเท่ากัน
+"""
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core import signing
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.db.models.fields.files import FieldFile
+from django.http import JsonResponse
+
+CURSOR_PARAM = 'cursor'
+CURSOR_SALT = 'core.pagination.keyset'
+
+DEFAULT_ORDERING = ('-created_at', '-id')
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class KeysetPage:
+    """หน้าผลลัพธ์ 1 หน้า (หน้าตาคล้าย Page ของ Django เพื่อใช้กับ template เดิมได้)"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.next_query = None
+        self.previous_query = None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    def __init__(self, queryset, per_page, ordering=DEFAULT_ORDERING):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.keys = [(key.lstrip('-'), key.startswith('-')) for key in self.ordering]
+
+    # --- cursor ---
+    def _make_cursor(self, obj, direction):
+        values = [_encode_value(getattr(obj, name)) for name, _ in self.keys]
+        return signing.dumps({'d': direction, 'v': values}, salt=CURSOR_SALT, compress=True)
+
+    def _to_python(self, name, value):
+        try:
+            field = self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return value  # ค่าจาก annotate เช่น search_rank
+        return field.to_python(value)
+
+    def _read_cursor(self, cursor):
+        try:
+            data = signing.loads(cursor, salt=CURSOR_SALT)
+            values = [self._to_python(name, value) for (name, _), value in zip(self.keys, data['v'])]
+        except (signing.BadSignature, ValidationError, KeyError, TypeError, ValueError):
+            return None, None
+        if len(values) != len(self.keys) or data.get('d') not in ('n', 'p'):
+            return None, None
+        return data['d'], values
+
+    # --- query ---
+    def _seek(self, values, backwards):
+        """สร้างเงื่อนไข (k1, k2, ...) อยู่ถัดจาก values ตามทิศการเรียง"""
+        condition = Q()
+        for i, (name, descending) in enumerate(self.keys):
+            if descending != backwards:
+                lookup = f'{name}__lt'
+            else:
+                lookup = f'{name}__gt'
+            prefix = {prev_name: values[j] for j, (prev_name, _) in enumerate(self.keys[:i])}
+            condition |= Q(**prefix, **{lookup: values[i]})
+        return condition
+
+    def _ordering(self, backwards):
+        if not backwards:
+            return self.ordering
+        return tuple(name if descending else f'-{name}' for name, descending in self.keys)
+
+    def page(self, cursor=None):
+        direction, values = self._read_cursor(cursor) if cursor else (None, None)
+        backwards = direction == 'p'
+
+        queryset = self.queryset.order_by(*self._ordering(backwards))
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, backwards))
+
+        # ดึงเกินมา 1 แถว เพื่อดูว่ายังมีหน้าต่อไปหรือไม่ (ไม่ต้อง COUNT ทั้งตาราง)
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        if not rows:
+            return KeysetPage(rows)
+        return KeysetPage(
+            rows,
+            next_cursor=self._make_cursor(rows[-1], 'n') if has_next else None,
+            previous_cursor=self._make_cursor(rows[0], 'p') if has_previous else None,
+        )
+
+
+def add_page_links(request, page):
+    """ใส่ query string ของปุ่มถัดไป/ก่อนหน้า ให้ template ใช้"""
+    # เก็บ parameter อื่น (เช่น category, q, status) ไว้ในลิงก์เปลี่ยนหน้าด้วย
+    params = request.GET.copy()
+    params.pop('format', None)
+    if page.has_next():
+        params[CURSOR_PARAM] = page.next_cursor
+        page.next_query = params.urlencode()
+    if page.has_previous():
+        params[CURSOR_PARAM] = page.previous_cursor
+        page.previous_query = params.urlencode()
+    return page
+
+
+def paginate_keyset(request, queryset, per_page, ordering=DEFAULT_ORDERING):
+    """ใช้กับ function view: คืนค่า KeysetPage พร้อม query string ของปุ่มถัดไป/ก่อนหน้า"""
+    page = KeysetPaginator(queryset, per_page, ordering).page(request.GET.get(CURSOR_PARAM))
+    return add_page_links(request, page)
+
+
+def wants_json(request):
+    return request.GET.get('format') == 'json'
+
+
+def _json_value(value):
+    # ImageField/FileField ส่งเป็น URL
+    if isinstance(value, FieldFile):
+        return value.url if value else None
+    return value
+
+
+def keyset_json_response(page, fields):
+    results = [{field: _json_value(getattr(obj, field)) for field in fields} for obj in page.object_list]
+    return JsonResponse(
+        {'results': results, 'next': page.next_cursor, 'previous': page.previous_cursor},
+        encoder=DjangoJSONEncoder,
+        json_dumps_params={'ensure_ascii': False},
+    )
+
+
+class KeysetPaginationMixin:
+    """
+    ใช้กับ ListView แทน paginate_by แบบ OFFSET
+    - keyset_ordering: คีย์ที่ใช้เรียง (ต้อง unique เมื่อรวมกัน จึงปิดท้ายด้วย id เสมอ)
+    - json_fields: field ที่ส่งออกเมื่อเรียกด้วย ?format=json
+    """
+    paginate_by = 20
+    keyset_ordering = DEFAULT_ORDERING
+    json_fields = ('id',)
+
+    def get_keyset_ordering(self):
+        return self.keyset_ordering
+
+    def get_keyset_page(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size, self.get_keyset_ordering())
+        return paginator.page(self.request.GET.get(CURSOR_PARAM))
+
+    def paginate_queryset(self, queryset, page_size):
+        page = add_page_links(self.request, self.get_keyset_page(queryset, page_size))
+        return None, page, page.object_list, page.has_other_pages()
+
+    def render_to_response(self, context, **response_kwargs):
+        if wants_json(self.request):
+            return keyset_json_response(context['page_obj'], self.json_fields)
+        return super().render_to_response(context, **response_kwargs)
@@ -0,0 +1,119 @@
+"""
+คำนวณราคาออเดอร์ทุกประเภท (กรอบรูป / ป้ายหินอ่อน / สินค้า) และค่าจัดส่ง จากที่เดียว
+
+ราคาอ่านจากตาราง PriceEntry (ถ้าไม่มีแถวไหนใช้ค่าใน DEFAULT_PRICES)
+ตารางทั้งชุดถูกโหลดครั้งเดียวเป็น snapshot เก็บใน cache และจำไว้ใน process
+จนกว่าเวอร์ชันจะเปลี่ยน (มีการแก้ราคา ดู core/signals.py)
+เงินทุกจำนวนเป็น Decimal 2 ตำแหน่ง
+"""
+from decimal import Decimal
+
+from .cache import VersionedCache
+from .models import PriceEntry
+
+# ราคาตั้งต้น (ตรงกับข้อมูลที่ migration ใส่ไว้ในตาราง)
+DEFAULT_PRICES = {
+    PriceEntry.FRAME_SIZE: {
+        '8x10': Decimal('150.00'),
+        '10x12': Decimal('200.00'),
+        '16x20': Decimal('600.00'),
+    },
+    PriceEntry.PLAQUE_SIZE: {
+        '15x20': Decimal('1000.00'),
+        '14x29': Decimal('1700.00'),
+    },
+    PriceEntry.SHIPPING: {
+        'pickup': Decimal('0.00'),
+        'standard': Decimal('50.00'),
+        'express': Decimal('100.00'),
+    },
+}
+
+CENT = Decimal('0.01')
+ZERO = Decimal('0.00')
+
+price_cache = VersionedCache('pricing', timeout=None)
+
+_memo = {'version': None, 'prices': None}
+
+
+def _load():
+    prices = {category: dict(table) for category, table in DEFAULT_PRICES.items()}
+    for category, code, amount in PriceEntry.objects.values_list('category', 'code', 'amount'):
+        prices.setdefault(category, {})[code] = amount
+    return prices
+
+
+def snapshot():
+    """ตารางราคาทั้งชุด {หมวด: {รหัส: ราคา}} (อย่าแก้ dict ที่ได้คืนไป)"""
+    version = price_cache.version()
+    if _memo['version'] != version:
+        _memo['prices'] = price_cache.get_or_set('snapshot', _load)
+        _memo['version'] = version
+    return _memo['prices']
+
+
+def invalidate_prices():
+    return price_cache.bump()
+
+
+def price_of(category, code):
+    """ราคาของรหัสนั้น หรือ None ถ้าไม่รู้จัก"""
+    return snapshot().get(category, {}).get(code)
+
+
+def frame_unit_price(size):
+    return price_of(PriceEntry.FRAME_SIZE, size) or ZERO
+
+
+def plaque_price(size):
+    return price_of(PriceEntry.PLAQUE_SIZE, size) or ZERO
+
+
+def shipping_cost(method):
+    """ค่าจัดส่ง (วิธีที่ไม่รู้จักคิดเป็น 0 เหมือนรับเองที่ร้าน)"""
+    return price_of(PriceEntry.SHIPPING, method) or ZERO
+
+
+def to_money(value):
+    return Decimal(str(value or 0)).quantize(CENT)
+
+
+def quote(lines, shipping_method):
+    """
+    ใบเสนอราคาทั้งออเดอร์: lines = [(ชื่อรายการ, ราคาต่อหน่วย, จำนวน), ...]
+    คืนค่า dict ที่มี lines, subtotal, shipping, total (Decimal ทั้งหมด)
+    """
+    quoted = []
+    subtotal = ZERO
+    for label, unit_price, quantity in lines:
+        unit_price = to_money(unit_price)
+        amount = unit_price * quantity
+        subtotal += amount
+        quoted.append({'label': label, 'unit_price': unit_price, 'quantity': quantity, 'amount': amount})
+
+    shipping = shipping_cost(shipping_method)
+    return {
+        'lines': quoted,
+        'subtotal': subtotal,
+        'shipping_method': shipping_method,
+        'shipping': shipping,
+        'total': subtotal + shipping,
+    }
+
+
+def quote_frame(size, quantity, shipping_method):
+    return quote([(f"กรอบรูป {size}", frame_unit_price(size), quantity)], shipping_method)
+
+
+def quote_plaque(size, shipping_method):
+    return quote([(f"ป้ายหินอ่อน {size}", plaque_price(size), 1)], shipping_method)
+
+
+def quote_product(product, quantity, shipping_method):
+    return quote([(product.name, product.price, quantity)], shipping_method)
+
+
+def quote_subtotal(label, subtotal, shipping_method):
+    """ยอดที่รวมมาแล้ว (เช่น ยอดตะกร้าที่คำนวณในฐานข้อมูล) + ค่าจัดส่ง"""
+    return quote([(label, subtotal, 1)], shipping_method)
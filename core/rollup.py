@@ -0,0 +1,126 @@
+"""
+ตารางสรุปยอดขาย (SalesRollup) แบบอัปเดตทีละส่วน
+
+ทุกครั้งที่ออเดอร์ถูกสร้าง เปลี่ยนสถานะ/ยอดเงิน หรือถูกลบ จะนำผลต่าง (delta)
+ไปบวก/ลบกับแถวสรุปของ (ประเภท, สถานะ, วัน) ที่เกี่ยวข้อง
+Dashboard จึงอ่านแค่ไม่กี่แถว ไม่ต้อง SUM/COUNT ทั้งสามตารางทุกครั้ง
+ถ้าข้อมูลคลาดเคลื่อน (เช่น มีการแก้ไขตรงในฐานข้อมูล) ใช้คำสั่ง reconcile_sales_rollup
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import SalesRollup
+from .order_types import ORDER_TYPES, PAID_STATUSES
+
+
+def bucket_of(order_type, order):
+    """คืนค่า (สถานะ, วัน, ยอดเงิน) ของออเดอร์ ตามที่ใช้ในตารางสรุป"""
+    return order.status, timezone.localdate(order.created_at), order_type.amount(order)
+
+
+def apply_delta(order_type_key, status, day, count, revenue):
+    """บวกผลต่างเข้าแถวสรุป (สร้างแถวใหม่ถ้ายังไม่มี)"""
+    if not count and not revenue:
+        return
+    lookup = {'order_type': order_type_key, 'status': status, 'day': day}
+    changes = {'order_count': F('order_count') + count, 'revenue': F('revenue') + revenue}
+
+    if SalesRollup.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            SalesRollup.objects.create(**lookup, order_count=count, revenue=revenue)
+    except IntegrityError:
+        # มีอีก request สร้างแถวนี้ไปก่อนแล้ว
+        SalesRollup.objects.filter(**lookup).update(**changes)
+
+
+def record_change(order_type_key, old, new):
+    """
+    old/new คือ (สถานะ, วัน, ยอดเงิน) ก่อนและหลังเปลี่ยน
+    ใช้ None แทนกรณีสร้างใหม่ (old) หรือถูกลบ (new)
+    """
+    if old == new:
+        return
+    if old is not None:
+        status, day, amount = old
+        apply_delta(order_type_key, status, day, -1, -amount)
+    if new is not None:
+        status, day, amount = new
+        apply_delta(order_type_key, status, day, 1, amount)
+
+
+def dashboard_totals():
+    """ยอดรวมสำหรับหน้า Dashboard (อ่านจากตารางสรุปด้วย query เดียว)"""
+    totals = {
+        key: {'sales': Decimal('0'), 'orders': 0, 'pending': 0}
+        for key in ORDER_TYPES
+    }
+    rows = (
+        SalesRollup.objects
+        .values('order_type', 'status')
+        .annotate(orders=Sum('order_count'), revenue=Sum('revenue'))
+    )
+    for row in rows:
+        bucket = totals.get(row['order_type'])
+        if bucket is None:
+            continue
+        bucket['orders'] += row['orders'] or 0
+        if row['status'] in PAID_STATUSES:
+            bucket['sales'] += row['revenue'] or Decimal('0')
+        elif row['status'] == 'pending':
+            bucket['pending'] += row['orders'] or 0
+    return totals
+
+
+def compute_rollup():
+    """คำนวณตารางสรุปใหม่จากข้อมูลจริง: {(ประเภท, สถานะ, วัน): (จำนวน, ยอดเงิน)}"""
+    # แปลงเวลาเป็นวันที่ตามเขตเวลาของร้านใน Python (เหมือน bucket_of)
+    # TruncDate ใน MySQL ต้องมีตาราง time zone ในเซิร์ฟเวอร์ ไม่งั้นได้ NULL ทุกแถว
+    expected = {}
+    for key, order_type in ORDER_TYPES.items():
+        rows = (
+            order_type.model.objects
+            .values_list('status', 'created_at', order_type.amount_field)
+            .order_by()
+            .iterator(chunk_size=2000)
+        )
+        for status, created_at, amount in rows:
+            bucket = (key, status, timezone.localdate(created_at))
+            count, revenue = expected.get(bucket, (0, Decimal('0')))
+            expected[bucket] = (count + 1, revenue + order_type.to_amount(amount))
+    return expected
+
+
+def reconcile(dry_run=False):
+    """
+    เทียบตารางสรุปกับข้อมูลจริง แล้วเขียนใหม่ (ถ้าไม่ใช่ dry_run)
+    คืนค่า list ของแถวที่ไม่ตรง: (key, ค่าในตารางสรุป, ค่าที่ถูกต้อง)
+    """
+    with transaction.atomic():
+        expected = compute_rollup()
+        current = {
+            (row.order_type, row.status, row.day): (row.order_count, row.revenue)
+            for row in SalesRollup.objects.select_for_update()
+        }
+
+        drift = []
+        for key in sorted(set(expected) | set(current), key=str):
+            have = current.get(key, (0, Decimal('0')))
+            want = expected.get(key, (0, Decimal('0')))
+            if have[0] != want[0] or have[1] != want[1]:
+                drift.append((key, have, want))
+
+        if drift and not dry_run:
+            SalesRollup.objects.all().delete()
+            SalesRollup.objects.bulk_create(
+                [
+                    SalesRollup(order_type=key[0], status=key[1], day=key[2], order_count=count, revenue=revenue)
+                    for key, (count, revenue) in expected.items()
+                ],
+                batch_size=1000,
+            )
+    return drift
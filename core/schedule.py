@@ -0,0 +1,82 @@
+"""
+ข้อมูลตารางงาน (WorkSchedule) สำหรับปฏิทิน FullCalendar
+
+FullCalendar ส่ง start/end ของช่วงที่กำลังแสดงมาทุกครั้ง (เช่น หน้าเดือนจะคลุม 6 สัปดาห์)
+เราเก็บ cache ทีละเดือนปฏิทิน แล้วประกอบเฉพาะเดือนที่ช่วงนั้นคาบเกี่ยว
+cache ทั้งหมดถูกล้างด้วยการเพิ่มเวอร์ชันเมื่อมีการเพิ่ม/แก้ไข/ลบงาน (ดู core/signals.py)
+"""
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+
+from .cache import VersionedCache
+from .models import WorkSchedule
+
+calendar_cache = VersionedCache(
+    'calendar',
+    timeout=getattr(settings, 'CALENDAR_CACHE_TIMEOUT', 60 * 60 * 24),
+)
+
+# ช่วงกว้างสุดที่ขอได้ในครั้งเดียว (มุมมองรายปี + ส่วนเกินหัวท้าย)
+MAX_RANGE_DAYS = 400
+
+
+def parse_day(value):
+    """รับทั้ง '2026-10-01' และ '2026-09-28T00:00:00+07:00' (รูปแบบที่ FullCalendar ส่งมา)"""
+    value = value.strip().replace(' ', '+')  # '+' ใน query string ที่ไม่ได้ encode จะกลายเป็นช่องว่าง
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return datetime.fromisoformat(value).date()
+
+
+def requested_range(params, today):
+    """
+    อ่าน start/end (end ไม่รวมวันนั้น) จาก query string
+    ถ้าไม่ส่งมาจะใช้ช่วงรอบๆ เดือนปัจจุบัน และจำกัดความกว้างไม่เกิน MAX_RANGE_DAYS
+    raise ValueError ถ้ารูปแบบวันที่ไม่ถูกต้อง
+    """
+    start = parse_day(params['start']) if params.get('start') else today.replace(day=1) - timedelta(days=7)
+    end = parse_day(params['end']) if params.get('end') else start + timedelta(days=42)
+    if end <= start:
+        raise ValueError("end ต้องมาหลัง start")
+    return start, min(end, start + timedelta(days=MAX_RANGE_DAYS))
+
+
+def _months(start, end):
+    month = start.replace(day=1)
+    while month < end:
+        yield month
+        month = (month + timedelta(days=32)).replace(day=1)
+
+
+def month_events(month):
+    """งานทั้งหมดในเดือนนั้น (เรียงตามวัน) อ่านผ่าน cache"""
+    def fetch():
+        next_month = (month + timedelta(days=32)).replace(day=1)
+        rows = (
+            WorkSchedule.objects
+            .filter(start_date__gte=month, start_date__lt=next_month)
+            .order_by('start_date', 'pk')
+            .values_list('pk', 'title', 'start_date')
+        )
+        return [
+            {'id': pk, 'title': title, 'start': start_date.isoformat(), 'allDay': True}
+            for pk, title, start_date in rows
+        ]
+    return calendar_cache.get_or_set(f'month:{month:%Y-%m}', fetch)
+
+
+def events_between(start, end):
+    """งานที่ start <= วันที่ < end"""
+    first, last = start.isoformat(), end.isoformat()
+    return [
+        event
+        for month in _months(start, end)
+        for event in month_events(month)
+        if first <= event['start'] < last
+    ]
+
+
+def invalidate_calendar():
+    return calendar_cache.bump()
@@ -0,0 +1,155 @@
+"""
+Signal ของออเดอร์ทั้ง 3 ประเภท การคืน reference ไฟล์ media และการล้าง cache ปฏิทินงาน/ตารางราคา
+(ลงทะเบียนใน CoreConfig.ready)
+"""
+from django.db import transaction
+from django.db.models import FileField
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+from . import ledger, pricing, rollup, schedule, status_events
+from .models import PriceEntry, WorkSchedule
+from .order_types import ORDER_TYPES, for_model
+from .storage import DedupFileSystemStorage
+
+
+def remember_previous_state(sender, instance, **kwargs):
+    """อ่านค่าเดิมจากฐานข้อมูลก่อนบันทึก เพื่อคำนวณผลต่างของตารางสรุป"""
+    instance._rollup_previous = None
+    if instance.pk is None:
+        return
+
+    order_type = for_model(sender)
+    queryset = sender.objects.filter(pk=instance.pk)
+    if transaction.get_connection().in_atomic_block:
+        # ล็อกแถวไว้จน commit: ถ้ามี 2 request บันทึกออเดอร์เดียวกันพร้อมกัน
+        # อีกฝั่งต้องรอแล้วอ่านค่าที่บันทึกแล้ว ผลต่างจึงไม่ถูกนับซ้ำ
+        # (หน้าเปลี่ยนสถานะ/แอดมินบันทึกใน transaction.atomic อยู่แล้ว)
+        queryset = queryset.select_for_update()
+    row = queryset.values('status', 'created_at', order_type.amount_field).first()
+    if row:
+        instance._rollup_previous = (
+            row['status'],
+            timezone.localdate(row['created_at']),
+            order_type.to_amount(row[order_type.amount_field]),
+        )
+
+
+def capture_customer_snapshot(sender, instance, **kwargs):
+    """ออเดอร์ใหม่: เก็บชื่อ/เบอร์/ที่อยู่ของลูกค้า ณ ตอนสั่งไว้ในแถวออเดอร์ (ถ้า view ยังไม่ได้กรอกเอง)"""
+    if not instance._state.adding or instance.customer_name:
+        return
+    order_type = for_model(sender)
+    if order_type.user_id(instance) is None:
+        return
+    instance.fill_customer_snapshot(getattr(instance, order_type.user_field))
+
+
+def order_saved(sender, instance, created=False, **kwargs):
+    order_type = for_model(sender)
+    ledger.sync_order(order_type, instance, created=created)
+
+    previous = getattr(instance, '_rollup_previous', None)
+    previous_status = previous[0] if previous else ''
+    if created or previous_status != instance.status:
+        status_events.record(order_type.key, instance.pk, previous_status, instance.status)
+
+    current = rollup.bucket_of(order_type, instance)
+    transaction.on_commit(lambda: rollup.record_change(order_type.key, previous, current))
+
+
+def order_deleted(sender, instance, **kwargs):
+    order_type = for_model(sender)
+    ledger.remove_order(order_type, instance.pk)
+
+    previous = rollup.bucket_of(order_type, instance)
+    transaction.on_commit(lambda: rollup.record_change(order_type.key, previous, None))
+
+
+def connect_order_signals():
+    for key, order_type in ORDER_TYPES.items():
+        model = order_type.model
+        pre_save.connect(remember_previous_state, sender=model, dispatch_uid=f'core-previous-{key}')
+        pre_save.connect(capture_customer_snapshot, sender=model, dispatch_uid=f'core-snapshot-{key}')
+        post_save.connect(order_saved, sender=model, dispatch_uid=f'core-saved-{key}')
+        post_delete.connect(order_deleted, sender=model, dispatch_uid=f'core-deleted-{key}')
+
+
+# --- ไฟล์ media แบบ dedup: เมื่อแถวถูกลบหรือเปลี่ยนไฟล์ คืน reference ของไฟล์เดิม ---
+
+_dedup_fields = {}
+
+
+def _dedup_fields_of(model):
+    if model not in _dedup_fields:
+        _dedup_fields[model] = [
+            field for field in model._meta.concrete_fields
+            if isinstance(field, FileField) and isinstance(field.storage, DedupFileSystemStorage)
+        ]
+    return _dedup_fields[model]
+
+
+def _release_after_commit(field, name):
+    # ลบไฟล์หลัง commit เท่านั้น (ถ้า rollback แถวยังอ้างถึงไฟล์เดิมอยู่ ไฟล์ต้องยังอยู่)
+    transaction.on_commit(lambda storage=field.storage, name=name: storage.release(name))
+
+
+def remember_media(sender, instance, **kwargs):
+    """อ่านชื่อไฟล์เดิมก่อนบันทึก เพื่อคืน reference ถ้าถูกแทนที่ด้วยไฟล์ใหม่"""
+    instance._media_previous = {}
+    if instance.pk is None:
+        return
+    fields = _dedup_fields_of(sender)
+    row = sender.objects.filter(pk=instance.pk).values(*(field.attname for field in fields)).first()
+    if row:
+        instance._media_previous = row
+
+
+def release_replaced_media(sender, instance, created=False, **kwargs):
+    previous = getattr(instance, '_media_previous', {})
+    for field in _dedup_fields_of(sender):
+        old = previous.get(field.attname)
+        if old and old != getattr(instance, field.attname).name:
+            _release_after_commit(field, old)
+
+
+def release_media(sender, instance, **kwargs):
+    for field in _dedup_fields_of(sender):
+        name = getattr(instance, field.attname).name
+        if name:
+            _release_after_commit(field, name)
+
+
+def connect_media_signals():
+    # ผูกเฉพาะ model ที่มี field ใช้ DedupFileSystemStorage
+    # (post_delete ที่ไม่ระบุ sender ทำให้ queryset.delete() ทุกตารางต้องโหลดแถวมาส่ง signal ทีละแถว)
+    from .storage import dedup_file_fields
+
+    for model in {model for model, _ in dedup_file_fields()}:
+        label = model._meta.label_lower
+        pre_save.connect(remember_media, sender=model, dispatch_uid=f'core.remember_media.{label}')
+        post_save.connect(release_replaced_media, sender=model, dispatch_uid=f'core.release_replaced_media.{label}')
+        post_delete.connect(release_media, sender=model, dispatch_uid=f'core.release_media.{label}')
+
+
+# --- ปฏิทินงาน: เพิ่ม/แก้ไข/ลบงานแล้วล้าง cache รายเดือนของ /api/calendar-events/ ---
+
+def invalidate_calendar(sender, **kwargs):
+    # หลัง commit เพื่อไม่ให้ request อื่น cache ข้อมูลที่ยังไม่ commit
+    transaction.on_commit(schedule.invalidate_calendar)
+
+
+def connect_schedule_signals():
+    post_save.connect(invalidate_calendar, sender=WorkSchedule, dispatch_uid='core.calendar_saved')
+    post_delete.connect(invalidate_calendar, sender=WorkSchedule, dispatch_uid='core.calendar_deleted')
+
+
+# --- ตารางราคา: แก้ราคาแล้วล้าง snapshot ที่ cache ไว้ (core/pricing.py) ---
+
+def invalidate_prices(sender, **kwargs):
+    transaction.on_commit(pricing.invalidate_prices)
+
+
+def connect_pricing_signals():
+    post_save.connect(invalidate_prices, sender=PriceEntry, dispatch_uid='core.price_saved')
+    post_delete.connect(invalidate_prices, sender=PriceEntry, dispatch_uid='core.price_deleted')
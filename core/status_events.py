@@ -0,0 +1,36 @@
+"""
+บันทึกประวัติการเปลี่ยนสถานะออเดอร์ (OrderStatusEvent)
+
+ต้องเรียกภายใน transaction เดียวกับที่เปลี่ยนสถานะ ถ้า transaction ถูก rollback
+ประวัติก็หายไปด้วย ไม่มีแถวที่บอกว่าเปลี่ยนทั้งที่จริงไม่ได้เปลี่ยน
+"""
+from django.utils import timezone
+
+from .models import OrderStatusEvent
+
+BATCH_SIZE = 500
+
+
+def record(order_type_key, order_id, from_status, to_status, changed_at=None):
+    return OrderStatusEvent.objects.create(
+        order_type=order_type_key,
+        order_id=order_id,
+        from_status=from_status or '',
+        to_status=to_status,
+        changed_at=changed_at or timezone.now(),
+    )
+
+
+def record_many(order_type_key, order_ids, from_status, to_status, changed_at=None):
+    """ออเดอร์หลายรายการเปลี่ยนจาก/เป็นสถานะเดียวกัน (bulk action) ใช้ INSERT ทีละชุด"""
+    changed_at = changed_at or timezone.now()
+    OrderStatusEvent.objects.bulk_create(
+        [
+            OrderStatusEvent(
+                order_type=order_type_key, order_id=order_id,
+                from_status=from_status or '', to_status=to_status, changed_at=changed_at,
+            )
+            for order_id in order_ids
+        ],
+        batch_size=BATCH_SIZE,
+    )
@@ -0,0 +1,126 @@
+"""
+Storage สำหรับไฟล์ที่ผู้ใช้อัปโหลด แบบเก็บตามเนื้อหา (content-addressed)
+
+ไฟล์ถูกเก็บที่ blobs/<2 ตัวแรกของ hash>/<2 ตัวถัดไป>/<sha256>.<นามสกุล>
+ถ้าอัปโหลดไฟล์ที่เนื้อหาซ้ำกับที่มีอยู่ จะไม่เขียนไฟล์ใหม่ แต่คืนชื่อไฟล์เดิมและเพิ่ม ref_count
+ลบ (delete) คือการคืน reference: ไฟล์จะถูกลบจริงเมื่อไม่มีใครอ้างอิงแล้ว
+
+ไฟล์ที่สร้างจากไฟล์อื่น (รูปย่อสินค้า) ต้องใช้ storages['derived'] ที่เป็น FileSystemStorage ธรรมดา
+เพราะต้องกำหนดชื่อไฟล์เองได้
+"""
+import hashlib
+import posixpath
+import re
+
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+BLOB_ROOT = 'blobs'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(fileobj, chunk_size=HASH_CHUNK_SIZE):
+    """SHA-256 และขนาดของไฟล์ อ่านทีละ chunk (ไม่โหลดทั้งไฟล์เข้าหน่วยความจำ)"""
+    digest = hashlib.sha256()
+    size = 0
+    if hasattr(fileobj, 'chunks'):
+        chunks = fileobj.chunks(chunk_size)
+    else:
+        chunks = iter(lambda: fileobj.read(chunk_size), b'')
+    for chunk in chunks:
+        digest.update(chunk)
+        size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def blob_name(sha256, original_name):
+    extension = posixpath.splitext(original_name or '')[1].lower()
+    if not re.fullmatch(r'\.[a-z0-9]{1,8}', extension):
+        extension = ''
+    return posixpath.join(BLOB_ROOT, sha256[:2], sha256[2:4], f'{sha256}{extension}')
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(BLOB_ROOT + '/')
+
+
+class DedupFileSystemStorage(FileSystemStorage):
+
+    def _save(self, name, content):
+        from .models import MediaBlob
+
+        sha256, size = hash_file(content)
+        content.seek(0)
+
+        # reference ถูกนับทันทีใน transaction เดียวกับแถวที่อ้างถึงไฟล์ (UPDATE ล็อกแถว blob ไว้จน commit)
+        # release() ของ request อื่นจึงลบไฟล์ระหว่างนี้ไม่ได้ และถ้า rollback ref_count ก็ย้อนกลับไปด้วย
+        existing = self._add_reference(sha256)
+        if existing is not None and self.exists(existing):
+            return existing
+
+        target = existing or blob_name(sha256, name)
+        saved = target if self.exists(target) else super()._save(target, content)
+        if existing is not None:
+            # มีแถวอยู่แล้วแต่ไฟล์หายไป (เช่นถูกลบด้วยมือ) เขียนกลับเข้าไปใหม่
+            MediaBlob.objects.filter(sha256=sha256).update(name=saved)
+            return saved
+
+        try:
+            with transaction.atomic():
+                MediaBlob.objects.create(sha256=sha256, name=saved, size=size, ref_count=1)
+        except IntegrityError:
+            # อีก request อัปโหลดไฟล์เดียวกันไปพร้อมกัน ใช้ของที่บันทึกไว้ก่อน
+            winner = self._add_reference(sha256)
+            if winner is None:
+                raise
+            if winner != saved:
+                super().delete(saved)
+            return winner
+        return saved
+
+    def _add_reference(self, sha256):
+        """เพิ่ม ref_count ของ blob นี้ คืนชื่อไฟล์ หรือ None ถ้ายังไม่มี"""
+        from .models import MediaBlob
+
+        with transaction.atomic():
+            if not MediaBlob.objects.filter(sha256=sha256).update(ref_count=F('ref_count') + 1):
+                return None
+            return MediaBlob.objects.filter(sha256=sha256).values_list('name', flat=True).first()
+
+    def release(self, name):
+        """
+        คืน reference 1 ครั้ง ลบไฟล์จริงเมื่อไม่มีใครใช้แล้ว
+        คืนค่า False ถ้าไฟล์นี้ไม่ได้อยู่ในระบบ blob (ไฟล์เก่าก่อนรัน dedupe_media)
+        """
+        from .models import MediaBlob
+
+        with transaction.atomic():
+            blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                return False
+            if blob.ref_count > 1:
+                MediaBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+                return True
+            blob.delete()
+            # ลบไฟล์ขณะยังถือล็อกแถวอยู่: การอัปโหลดเนื้อหาเดียวกันที่รออยู่จะเห็นว่าไม่มี blob แล้วเขียนไฟล์ใหม่
+            # (ถ้าลบหลัง commit อาจลบไฟล์ที่อีก request เพิ่งนำกลับมาใช้)
+            super().delete(name)
+        return True
+
+    def delete(self, name):
+        if not self.release(name):
+            super().delete(name)
+
+
+def dedup_file_fields():
+    """(model, ชื่อ field) ของ FileField/ImageField ทุกตัวที่ใช้ DedupFileSystemStorage"""
+    from django.apps import apps
+    from django.db.models import FileField
+
+    fields = []
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if isinstance(field, FileField) and isinstance(field.storage, DedupFileSystemStorage):
+                fields.append((model, field.name))
+    return fields
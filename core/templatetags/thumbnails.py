@@ -0,0 +1,19 @@
+from django import template
+from django.urls import reverse
+
+from ..thumbnails import THUMBNAIL_SIZES
+
+register = template.Library()
+
+
+@register.simple_tag
+def thumbnail_url(fieldfile, width=128):
+    """
+    URL ของรูปย่อ เช่น <img src="{% thumbnail_url order.uploaded_image 128 %}">
+    (ขนาดต้องอยู่ใน THUMBNAIL_SIZES; รูปแสดง 64px ใช้ 128 ให้คมบนจอ 2x)
+    """
+    if not fieldfile:
+        return ''
+    if width not in THUMBNAIL_SIZES:
+        raise template.TemplateSyntaxError(f"thumbnail_url: ขนาด {width} ไม่อยู่ใน THUMBNAIL_SIZES {THUMBNAIL_SIZES}")
+    return reverse('thumbnail', args=[width, fieldfile.name])
@@ -1,3 +1,774 @@
-from django.test import TestCase
+import csv
+import io
+import os
+import tempfile
+import time
+import zipfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+from xml.etree import ElementTree
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image, ImageFile
+
+from framings.models import CustomFrameOrder
+from plaques.models import CustomPlaqueOrder
+from stores.models import Order, OrderItem, Product
+from . import export, lead_time, ledger, pricing, rollup, schedule, thumbnails, uploads
+from .models import MediaBlob, OrderLedgerEntry, OrderStatusEvent, PriceEntry, SalesRollup, WorkSchedule
+from .order_types import ORDER_TYPES
+
+
+class BulkOrderStatusTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.staff = User.objects.create_user(username='staff', password='secret', is_staff=True)
+        self.customer = User.objects.create_user(username='customer', password='secret')
+        self.client.force_login(self.staff)
+        # ตารางสรุปอัปเดตหลัง commit จึงต้องรัน callback ของการสร้างออเดอร์ด้วย
+        with self.captureOnCommitCallbacks(execute=True):
+            self.orders = [Order.objects.create(customer=self.customer, total_price=Decimal('100.00')) for _ in range(3)]
+            self.frame = CustomFrameOrder.objects.create(
+                user=self.customer, uploaded_image='x.jpg', size_option='8x10',
+                mounting_option='none', total_price=Decimal('50.00'),
+            )
+
+    def _post(self, values, status):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('bulk_order_status') + '?format=json', {'orders': values, 'status': status},
+            )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_moves_orders_of_every_type_and_reports_stale_ones(self):
+        stale = self.orders[2]
+        stale.status = 'cancelled'
+        with self.captureOnCommitCallbacks(execute=True):
+            stale.save()
+
+        values = [f'product:{order.pk}:pending' for order in self.orders] + [f'framing:{self.frame.pk}:pending']
+        result = self._post(values, 'processing')
+
+        self.assertEqual(
+            sorted(result['updated']),
+            sorted([f'product:{self.orders[0].pk}', f'product:{self.orders[1].pk}', f'framing:{self.frame.pk}']),
+        )
+        self.assertEqual(result['skipped'], [
+            {'order': f'product:{stale.pk}', 'expected': 'pending', 'current': 'cancelled'},
+        ])
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, 'cancelled')
+
+        # update() ไม่ยิง signal: สมุดรวมและตารางสรุปต้องถูกปรับตามด้วย
+        self.assertEqual(
+            OrderLedgerEntry.objects.filter(order_type='product', status='processing').count(), 2,
+        )
+        rollup = {
+            (row.order_type, row.status): (row.order_count, row.revenue)
+            for row in SalesRollup.objects.all()
+        }
+        self.assertEqual(rollup[('product', 'processing')], (2, Decimal('200.00')))
+        self.assertEqual(rollup[('product', 'pending')], (0, Decimal('0.00')))
+        self.assertEqual(rollup[('framing', 'processing')], (1, Decimal('50.00')))
+
+        # ประวัติสถานะ: สร้าง 4 + ยกเลิก 1 (save) + เปลี่ยนแบบกลุ่ม 3
+        self.assertEqual(OrderStatusEvent.objects.count(), 8)
+        self.assertEqual(
+            set(OrderStatusEvent.objects.filter(to_status='processing').values_list('order_type', 'order_id')),
+            {('product', self.orders[0].pk), ('product', self.orders[1].pk), ('framing', self.frame.pk)},
+        )
+
+    def test_rejects_transitions_outside_the_state_machine(self):
+        result = self._post([f'product:{self.orders[0].pk}:pending'], 'shipped')
+        self.assertEqual(result['updated'], [])
+        self.assertEqual(len(result['invalid']), 1)
+        self.orders[0].refresh_from_db()
+        self.assertEqual(self.orders[0].status, 'pending')
+
+
+class LeadTimeTests(TestCase):
+    def _history(self, order_id, *steps):
+        start = timezone.now() - timedelta(days=30)
+        previous = ''
+        for hours, status in steps:
+            OrderStatusEvent.objects.create(
+                order_type='plaque', order_id=order_id, from_status=previous,
+                to_status=status, changed_at=start + timedelta(hours=hours),
+            )
+            previous = status
+
+    def test_lead_time_percentiles_from_streamed_history(self):
+        # เริ่มผลิตชั่วโมงที่ 2 แล้วจัดส่งหลังจากนั้น 10, 20, ..., 100 ชั่วโมง
+        for i in range(1, 11):
+            self._history(i, (0, 'pending'), (2, 'processing'), (2 + 10 * i, 'shipped'))
+        # ยกเลิกระหว่างผลิต: ไม่นับเป็น lead time
+        self._history(11, (0, 'pending'), (1, 'processing'), (5, 'cancelled'))
+
+        # chunk เล็กเพื่อให้ประวัติของออเดอร์เดียวกันถูกตัดข้าม chunk
+        events = list(lead_time.stream_events('plaque', chunk_size=4))
+        self.assertEqual(len(events), OrderStatusEvent.objects.count())
+
+        lead_times, time_in_status = lead_time.analyze(['plaque'], chunk_size=4)
+        histogram = lead_times['plaque']
+        self.assertEqual(histogram.count, 10)
+        self.assertAlmostEqual(histogram.percentile(50) / 3600, 50, delta=50 * 0.05)
+        self.assertAlmostEqual(histogram.percentile(90) / 3600, 90, delta=90 * 0.05)
+        self.assertEqual(histogram.percentile(100), histogram.max)
+        self.assertEqual(time_in_status[('plaque', 'pending')].count, 11)
+
+
+class OrderExportTests(TestCase):
+    def setUp(self):
+        customer = get_user_model().objects.create_user(username='customer', password='secret', first_name='สมชาย')
+        product = Product.objects.create(name="กรอบทอง", description="-", price=Decimal('10.00'), stock=100)
+        for _ in range(3):
+            order = Order.objects.create(customer=customer, total_price=Decimal('30.00'))
+            for quantity in (1, 2):
+                OrderItem.objects.create(order=order, product=product, quantity=quantity, price=Decimal('10.00'))
+        CustomFrameOrder.objects.create(
+            user=customer, uploaded_image='x.jpg', size_option='8x10',
+            mounting_option='stand', total_price=Decimal('50.00'), note='a & <b>',
+        )
+        self.today = timezone.localdate()
+
+    def test_rows_cross_chunk_boundaries_in_order(self):
+        rows = list(export.export_rows(self.today, self.today, chunk_size=4))
+        self.assertEqual([row[0] for row in rows], ["สินค้า"] * 6 + ["กรอบรูป"])
+        self.assertEqual(rows[0][4], "สมชาย")
+
+    def test_csv_and_xlsx_contain_every_row(self):
+        data = b''.join(export.stream_export('csv', self.today, self.today))
+        lines = list(csv.reader(io.StringIO(data.decode('utf-8-sig'))))
+        self.assertEqual(lines[0], export.HEADER)
+        self.assertEqual(len(lines), 8)
+
+        data = b''.join(export.stream_export('xlsx', self.today, self.today))
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            self.assertIsNone(archive.testzip())
+            sheet = ElementTree.fromstring(archive.read('xl/worksheets/sheet1.xml'))
+        self.assertEqual(len(sheet[0]), 8)
+
+    def test_formula_like_text_is_exported_as_text(self):
+        CustomFrameOrder.objects.create(
+            user=get_user_model().objects.get(username='customer'), customer_name='=HYPERLINK("http://x")',
+            customer_address='@SUM(1)', uploaded_image='x.jpg', size_option='8x10',
+            mounting_option='none', total_price=Decimal('-5.00'),
+        )
+        rows = list(csv.reader(io.StringIO(
+            b''.join(export.stream_export('csv', self.today, self.today)).decode('utf-8-sig'),
+        )))
+        self.assertEqual(rows[-1][4:7], ["'=HYPERLINK(\"http://x\")", '', "'@SUM(1)"])
+        # ตัวเลขติดลบยังเป็นตัวเลข
+        self.assertEqual(rows[-1][-1], '-5.00')
+
+        data = b''.join(export.stream_export('xlsx', self.today, self.today))
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+        self.assertIn('<t xml:space="preserve">\'=HYPERLINK', sheet)
+        self.assertNotIn('<t xml:space="preserve">=', sheet)
+
+
+class MediaReferenceTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+        self.customer = get_user_model().objects.create_user(username='customer', password='secret')
+
+    def _upload(self, content):
+        order = CustomFrameOrder(
+            user=self.customer, size_option='8x10', mounting_option='none', total_price=Decimal('50.00'),
+        )
+        order.uploaded_image.save('photo.jpg', ContentFile(content), save=False)
+        return order
+
+    def _order(self, content):
+        order = self._upload(content)
+        order.save()
+        return order
+
+    def test_reference_is_undone_on_rollback(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self._order(b'same')
+        with self.assertRaises(ZeroDivisionError), transaction.atomic():
+            self._order(b'same')
+            self._order(b'rolled back')
+            1 / 0
+        blob = MediaBlob.objects.get()
+        self.assertEqual((blob.name, blob.ref_count), (first.uploaded_image.name, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._order(b'same')
+        self.assertEqual(MediaBlob.objects.get().ref_count, 2)
+
+    def test_release_between_duplicate_upload_and_commit_keeps_the_file(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self._order(b'same')
+        name, storage = first.uploaded_image.name, first.uploaded_image.storage
+
+        # อัปโหลดซ้ำได้ชื่อ blob เดิม แล้วอีก request คืน reference สุดท้ายของแถวแรกก่อนแถวใหม่จะบันทึก
+        second = self._upload(b'same')
+        self.assertEqual(second.uploaded_image.name, name)
+        storage.release(name)
+        with self.captureOnCommitCallbacks(execute=True):
+            second.save()
+
+        self.assertTrue(storage.exists(name))
+        self.assertEqual(MediaBlob.objects.get(name=name).ref_count, 1)
+
+    def test_upload_after_last_release_writes_the_file_again(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self._order(b'same')
+        name, storage = first.uploaded_image.name, first.uploaded_image.storage
+        storage.release(name)
+        self.assertFalse(storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second = self._order(b'same')
+        self.assertEqual(second.uploaded_image.name, name)
+        self.assertTrue(storage.exists(name))
+        self.assertEqual(MediaBlob.objects.get(name=name).ref_count, 1)
+
+    def test_replacing_and_deleting_release_the_old_file(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = self._order(b'old')
+        old_name = order.uploaded_image.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.uploaded_image.save('photo.jpg', ContentFile(b'new'))
+        self.assertFalse(MediaBlob.objects.filter(name=old_name).exists())
+        self.assertFalse(order.uploaded_image.storage.exists(old_name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.delete()
+        self.assertFalse(MediaBlob.objects.exists())
+
+
+class CalendarEventsTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            WorkSchedule.objects.create(title="ติดตั้งป้าย", start_date=date(2026, 3, 10))
+        schedule.invalidate_calendar()
+        self.params = {'start': '2026-03-01', 'end': '2026-04-01'}
+
+    def test_matching_etag_returns_304_until_the_range_changes(self):
+        response = self.client.get(reverse('calendar_events'), self.params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([event['title'] for event in response.json()], ["ติดตั้งป้าย"])
+        etag = response['ETag']
+
+        response = self.client.get(reverse('calendar_events'), self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        # งานนอกช่วงที่ขอไม่ทำให้ ETag เปลี่ยน
+        with self.captureOnCommitCallbacks(execute=True):
+            WorkSchedule.objects.create(title="งานเดือนหน้า", start_date=date(2026, 4, 2))
+        response = self.client.get(reverse('calendar_events'), self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            WorkSchedule.objects.create(title="ส่งกรอบรูป", start_date=date(2026, 3, 20))
+        response = self.client.get(reverse('calendar_events'), self.params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()), 2)
+
+
+class PricingSnapshotTests(TestCase):
+    def setUp(self):
+        self.entry, _ = PriceEntry.objects.get_or_create(
+            category=PriceEntry.FRAME_SIZE, code='8x10', defaults={'amount': Decimal('150.00')},
+        )
+        pricing.invalidate_prices()
+
+    def test_price_entry_edit_replaces_the_cached_snapshot(self):
+        before = pricing.frame_unit_price('8x10')
+        with self.assertNumQueries(0):
+            self.assertEqual(pricing.frame_unit_price('8x10'), before)
+
+        self.entry.amount = before + 25
+        with self.captureOnCommitCallbacks(execute=True):
+            self.entry.save()
+
+        self.assertEqual(pricing.frame_unit_price('8x10'), before + 25)
+        response = self.client.get(
+            reverse('price_quote'), {'kind': 'frame', 'size': '8x10', 'quantity': 2, 'shipping_method': 'pickup'},
+        )
+        self.assertEqual(Decimal(response.json()['total']), (before + 25) * 2)
+
+
+class AdminOrderQueueTests(TestCase):
+    QUEUES = ('admin-order-list', 'orderframings_manager', 'orderplaques_manager')
+
+    def setUp(self):
+        User = get_user_model()
+        self.staff = User.objects.create_user(username='staff', password='secret', is_staff=True)
+        self.product = Product.objects.create(name="กรอบทอง", description="-", price=Decimal('10.00'), stock=100)
+        self.customers = 0
+
+    def _add_orders(self, count):
+        # ลูกค้าคนละคนทุกออเดอร์ ถ้าอ่านข้อมูลลูกค้าทีละแถวจำนวน query จะโตตาม
+        for _ in range(count):
+            self.customers += 1
+            customer = get_user_model().objects.create_user(username=f'customer{self.customers}', password='secret')
+            order = Order.objects.create(customer=customer, total_price=Decimal('20.00'))
+            OrderItem.objects.create(order=order, product=self.product, quantity=2, price=Decimal('10.00'))
+            CustomFrameOrder.objects.create(
+                user=customer, uploaded_image='x.jpg', size_option='8x10',
+                mounting_option='none', total_price=Decimal('50.00'),
+            )
+            CustomPlaqueOrder.objects.create(
+                user=customer, deceased_name="ทดสอบ", deceased_photo='p.jpg', stone_style='black_granite', final_price=1000,
+            )
+
+    def _queries(self, name):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse(name))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx)
+
+    def test_queues_use_constant_queries(self):
+        self.client.force_login(self.staff)
+        self._add_orders(1)
+        for name in self.QUEUES:
+            self._queries(name)  # request แรกนับ badge ตะกร้าแล้วเขียนลง session
+        single = {name: self._queries(name) for name in self.QUEUES}
+
+        self._add_orders(5)
+        for name in self.QUEUES:
+            with self.subTest(queue=name), self.assertNumQueries(single[name]):
+                self.client.get(reverse(name))
+
+    def test_customer_snapshot_is_staff_only(self):
+        self._add_orders(1)
+        self.client.force_login(get_user_model().objects.get(username='customer1'))
+        for name in self.QUEUES:
+            with self.subTest(queue=name):
+                response = self.client.get(reverse(name) + '?format=json')
+                self.assertNotEqual(response.status_code, 200)
+                self.assertNotIn(b'customer_name', response.content)
+
+
+class MediaServeTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.media_root = f'{tmp.name}/media'
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root, MEDIA_SERVE_BACKEND='django'))
+        self._write('slips/owner.jpg', b'0123456789')
+        self._write('slips/orphan.jpg', b'orphan')
+        self._write('products/frame.jpg', b'product')
+        with open(f'{tmp.name}/secret.txt', 'wb') as handle:
+            handle.write(b'secret')
+
+        User = get_user_model()
+        self.owner = User.objects.create_user(username='owner', password='secret')
+        self.other = User.objects.create_user(username='other', password='secret')
+        self.staff = User.objects.create_user(username='staff', password='secret', is_staff=True)
+        Order.objects.create(customer=self.owner, total_price=Decimal('10.00'), payment_slip='slips/owner.jpg')
+
+    def _write(self, name, content):
+        path = f'{self.media_root}/{name}'
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as handle:
+            handle.write(content)
+
+    def _get(self, name, user=None, headers=None):
+        if user is not None:
+            self.client.force_login(user)
+        return self.client.get('/media/' + name, headers=headers)
+
+    def test_private_files_are_served_to_owner_and_staff_only(self):
+        response = self._get('slips/owner.jpg', self.owner)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertIn('private', response['Cache-Control'])
+
+        self.assertEqual(self._get('slips/owner.jpg', self.staff).status_code, 200)
+        self.assertEqual(self._get('slips/owner.jpg', self.other).status_code, 404)
+        self.client.logout()
+        self.assertEqual(self._get('slips/owner.jpg').status_code, 404)
+
+    def test_public_product_images_need_no_login(self):
+        response = self._get('products/frame.jpg')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public', response['Cache-Control'])
+
+    def test_traversal_and_unreferenced_names_are_denied(self):
+        # ขึ้นต้นด้วย products/ แต่ชี้ออกไปที่ไฟล์ส่วนตัว
+        self.assertEqual(self._get('products/../slips/owner.jpg').status_code, 404)
+        # staff ดูได้ทุกไฟล์ใน MEDIA_ROOT แต่ต้องออกนอก MEDIA_ROOT ไม่ได้
+        self.assertEqual(self._get('../secret.txt', self.staff).status_code, 404)
+        self.assertEqual(self._get('products/../../secret.txt', self.staff).status_code, 404)
+        # ไฟล์ที่ไม่มีแถวไหนอ้างถึง เจ้าของออเดอร์อื่นก็ดูไม่ได้
+        self.assertEqual(self._get('slips/orphan.jpg', self.owner).status_code, 404)
+
+    def test_django_backend_supports_range_and_conditional_get(self):
+        response = self._get('slips/owner.jpg', self.owner, {'Range': 'bytes=2-5'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+
+        self.assertEqual(self._get('slips/owner.jpg', self.owner, {'Range': 'bytes=20-'}).status_code, 416)
+
+        etag = self._get('slips/owner.jpg', self.owner)['ETag']
+        response = self._get('slips/owner.jpg', self.owner, {'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_offload_backends_send_headers_without_body(self):
+        with self.settings(MEDIA_SERVE_BACKEND='nginx', MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/'):
+            response = self._get('slips/owner.jpg', self.owner)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/slips/owner.jpg')
+        self.assertEqual(response.content, b'')
+
+        with self.settings(MEDIA_SERVE_BACKEND='sendfile'):
+            response = self._get('slips/owner.jpg', self.owner)
+        self.assertEqual(response['X-Sendfile'], f'{self.media_root}/slips/owner.jpg')
+        self.assertEqual(response.content, b'')
+
+        with self.settings(MEDIA_SERVE_BACKEND='nginx'):
+            self.assertEqual(self._get('slips/owner.jpg', self.other).status_code, 404)
+
+
+class SingleOrderStatusUpdateTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        customer = User.objects.create_user(username='customer', password='secret')
+        self.client.force_login(User.objects.create_user(username='staff', password='secret', is_staff=True))
+        self.orders = {
+            'update_framing_status': CustomFrameOrder.objects.create(
+                user=customer, uploaded_image='x.jpg', size_option='8x10',
+                mounting_option='none', total_price=Decimal('50.00'),
+            ),
+            'update_order_status': CustomPlaqueOrder.objects.create(
+                user=customer, deceased_name="ทดสอบ", deceased_photo='p.jpg', stone_style='black_granite', final_price=1000,
+            ),
+        }
+
+    def test_unknown_or_missing_status_is_rejected(self):
+        for url_name, order in self.orders.items():
+            for data in ({'status': 'bogus'}, {}):
+                with self.subTest(view=url_name, data=data):
+                    self.client.post(reverse(url_name, args=[order.pk]), data)
+                    order.refresh_from_db()
+                    self.assertEqual(order.status, 'pending')
+        # มีแค่ประวัติตอนสร้าง
+        self.assertEqual(OrderStatusEvent.objects.count(), 2)
+
+    def test_known_status_is_saved_and_logged(self):
+        for url_name, order in self.orders.items():
+            with self.subTest(view=url_name):
+                self.client.post(reverse(url_name, args=[order.pk]), {'status': 'processing'})
+                order.refresh_from_db()
+                self.assertEqual(order.status, 'processing')
+        self.assertEqual(OrderStatusEvent.objects.filter(to_status='processing').count(), 2)
+
+
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        self.customer = get_user_model().objects.create_user(username='customer', password='secret')
+
+    def _rollup(self):
+        return {
+            (row.order_type, row.status, row.day): (row.order_count, row.revenue)
+            for row in SalesRollup.objects.all()
+            if row.order_count or row.revenue
+        }
+
+    def _save(self, order, **changes):
+        for name, value in changes.items():
+            setattr(order, name, value)
+        with self.captureOnCommitCallbacks(execute=True):
+            order.save()
+
+    def test_create_status_amount_and_delete_deltas(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.create(customer=self.customer, total_price=Decimal('100.00'))
+        day = timezone.localdate(order.created_at)
+        self.assertEqual(self._rollup(), {('product', 'pending', day): (1, Decimal('100.00'))})
+
+        self._save(order, status='processing')
+        self.assertEqual(self._rollup(), {('product', 'processing', day): (1, Decimal('100.00'))})
+
+        self._save(order, total_price=Decimal('150.00'))
+        self.assertEqual(self._rollup(), {('product', 'processing', day): (1, Decimal('150.00'))})
+        self.assertEqual(rollup.dashboard_totals()['product']['sales'], Decimal('150.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.delete()
+        self.assertEqual(self._rollup(), {})
+
+    def test_buckets_use_the_local_day(self):
+        # 18:30 UTC ของวันที่ 10 คือ 01:30 ของวันที่ 11 ตามเวลาไทย
+        late = datetime(2026, 3, 10, 18, 30, tzinfo=dt_timezone.utc)
+        with self.captureOnCommitCallbacks(execute=True):
+            order = CustomFrameOrder.objects.create(
+                user=self.customer, uploaded_image='x.jpg', size_option='8x10',
+                mounting_option='none', total_price=Decimal('50.00'),
+            )
+        first_day = timezone.localdate(order.created_at)
+
+        # ย้ายวันที่สั่งพร้อมเปลี่ยนสถานะ: ถอนออกจากแถวของวันเดิม ไปเพิ่มที่แถวของวันใหม่
+        self._save(order, created_at=late, status='processing')
+        self.assertEqual(self._rollup(), {('framing', 'processing', date(2026, 3, 11)): (1, Decimal('50.00'))})
+        self.assertFalse(SalesRollup.objects.filter(day=first_day, order_count__gt=0).exists())
+
+        # คำนวณใหม่จากข้อมูลจริงต้องได้วันเดียวกัน
+        self.assertEqual(rollup.reconcile(dry_run=True), [])
+
+    def test_reconcile_command_reports_and_fixes_drift(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for amount in ('100.00', '20.00'):
+                Order.objects.create(customer=self.customer, total_price=Decimal(amount))
+        expected = self._rollup()
+        day = timezone.localdate()
+        SalesRollup.objects.filter(order_type='product', status='pending').update(order_count=5, revenue=0)
+        SalesRollup.objects.create(order_type='plaque', status='shipped', day=day, order_count=1, revenue=1)
+
+        out = io.StringIO()
+        call_command('reconcile_sales_rollup', '--dry-run', stdout=out)
+        self.assertIn(f"{day} product/pending: ในตารางสรุป 5 ออเดอร์", out.getvalue())
+        self.assertIn(f"{day} plaque/shipped", out.getvalue())
+        self.assertNotEqual(self._rollup(), expected)
+
+        call_command('reconcile_sales_rollup', stdout=io.StringIO())
+        self.assertEqual(self._rollup(), expected)
+        self.assertEqual(rollup.reconcile(dry_run=True), [])
+
+
+class OrderLedgerTests(TestCase):
+    def setUp(self):
+        self.customer = get_user_model().objects.create_user(username='customer', password='secret')
+
+    def _create(self, key):
+        if key == 'product':
+            return Order.objects.create(customer=self.customer, total_price=Decimal('100.00'))
+        if key == 'framing':
+            return CustomFrameOrder.objects.create(
+                user=self.customer, uploaded_image='x.jpg', size_option='8x10',
+                mounting_option='none', total_price=Decimal('50.00'),
+            )
+        return CustomPlaqueOrder.objects.create(
+            user=self.customer, deceased_name="ทดสอบ", deceased_photo='p.jpg', stone_style='black_granite', final_price=1000,
+        )
+
+    def _ledger(self):
+        return {
+            (entry.order_type, entry.order_id): (entry.user_id, entry.status, entry.amount, entry.created_at)
+            for entry in OrderLedgerEntry.objects.all()
+        }
+
+    def test_create_update_and_delete_of_each_type(self):
+        for key, order_type in ORDER_TYPES.items():
+            amount_field = order_type.amount_field
+            with self.subTest(order_type=key):
+                order = self._create(key)
+                entry = OrderLedgerEntry.objects.get(order_type=key, order_id=order.pk)
+                self.assertEqual(
+                    (entry.user_id, entry.status, entry.created_at),
+                    (self.customer.pk, 'pending', order.created_at),
+                )
+
+                order.status = 'processing'
+                setattr(order, amount_field, 1234)  # ป้ายหินอ่อนคำนวณราคาใหม่ใน save() เอง
+                order.save()
+                order.refresh_from_db()
+                entry.refresh_from_db()
+                self.assertEqual((entry.status, entry.amount), ('processing', getattr(order, amount_field)))
+                self.assertEqual(OrderLedgerEntry.objects.filter(order_type=key, order_id=order.pk).count(), 1)
+
+                order_id = order.pk
+                order.delete()
+                self.assertFalse(OrderLedgerEntry.objects.filter(order_type=key, order_id=order_id).exists())
+
+    def test_rebuild_command_recovers_a_truncated_table(self):
+        for key in ('product', 'product', 'product', 'framing', 'plaque'):
+            self._create(key)
+        expected = self._ledger()
+
+        # แถวหายบางส่วน และมีแถวค้างของออเดอร์ที่ไม่มีอยู่แล้ว
+        OrderLedgerEntry.objects.filter(order_type='product').delete()
+        OrderLedgerEntry.objects.filter(order_type='plaque').update(status='shipped')
+        OrderLedgerEntry.objects.create(
+            order_type='framing', order_id=999, user=self.customer, status='pending',
+            amount=Decimal('1.00'), created_at=timezone.now(),
+        )
+
+        out = io.StringIO()
+        call_command('rebuild_order_ledger', '--batch-size', '2', stdout=out)
+        self.assertEqual(self._ledger(), expected)
+        self.assertIn("สินค้า: 3 ออเดอร์", out.getvalue())
+        self.assertEqual(ledger.rebuild_ledger(), {'product': 3, 'framing': 1, 'plaque': 1})
+
+    def test_attach_orders_uses_one_query_per_type(self):
+        for key in ('product', 'product', 'framing', 'framing', 'plaque', 'plaque'):
+            self._create(key)
+        entries = list(OrderLedgerEntry.objects.all())
+
+        with self.assertNumQueries(3):
+            ledger.attach_orders(entries)
+        with self.assertNumQueries(0):
+            orders = [entry.order for entry in entries]
+        self.assertEqual(
+            {(entry.order_type, entry.order_id) for entry in entries},
+            {(entry.order_type, order.pk) for entry, order in zip(entries, orders)},
+        )
+
+        # หน้าที่มีแต่ประเภทเดียวไม่ต้องดึงตารางอื่น
+        products = list(OrderLedgerEntry.objects.filter(order_type='product'))
+        with self.assertNumQueries(1):
+            ledger.attach_orders(products)
+
+
+class ImageUploadNormalizeTests(TestCase):
+    def _upload(self, image, format, name='slip', **params):
+        buffer = io.BytesIO()
+        image.save(buffer, format=format, **params)
+        return SimpleUploadedFile(f'{name}.{format.lower()}', buffer.getvalue())
+
+    def _open(self, result):
+        image = Image.open(io.BytesIO(result.read()))
+        image.load()
+        return image
+
+    def test_oversized_file_is_rejected(self):
+        upload = self._upload(Image.new('RGB', (64, 64)), 'PNG')
+        with mock.patch.object(uploads, 'UPLOAD_IMAGE_MAX_BYTES', upload.size - 1):
+            with self.assertRaises(ValidationError):
+                uploads.normalize_image_upload(upload)
+
+    def test_non_image_file_is_rejected(self):
+        upload = SimpleUploadedFile('slip.jpg', b'%PDF-1.4 not an image')
+        with self.assertRaises(ValidationError):
+            uploads.normalize_image_upload(upload)
+
+    def test_decompression_bomb_is_rejected_from_the_header(self):
+        # 56 ล้านพิกเซลแต่ไฟล์ไม่ถึง 10 KB
+        upload = self._upload(Image.new('1', (8000, 7000)), 'PNG')
+        self.assertLess(upload.size, 10 * 1024)
+        with mock.patch.object(ImageFile.ImageFile, 'load', side_effect=AssertionError("ไม่ควรถอดรหัสพิกเซล")):
+            with self.assertRaises(ValidationError):
+                uploads.normalize_image_upload(upload)
+
+    def test_exif_rotated_jpeg_comes_out_upright_and_bounded(self):
+        # ภาพแนวนอน ครึ่งซ้ายแดง ครึ่งขวาน้ำเงิน พร้อม Orientation=6 (ต้องหมุนตามเข็ม 90 องศาตอนแสดง)
+        image = Image.new('RGB', (800, 400), (0, 0, 255))
+        image.paste((255, 0, 0), (0, 0, 400, 400))
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        upload = self._upload(image, 'JPEG', exif=exif.tobytes())
+
+        result = uploads.normalize_image_upload(upload, max_side=200)
+        self.assertEqual(result.name, 'slip.jpg')
+        upright = self._open(result)
+        self.assertEqual((upright.format, upright.size), ('JPEG', (100, 200)))
+        self.assertNotIn(0x0112, upright.getexif())
+        # ครึ่งซ้ายเดิม (แดง) ต้องอยู่ด้านบนหลังหมุน
+        red, _, blue = upright.getpixel((50, 20))
+        self.assertGreater(red, 200)
+        self.assertLess(blue, 60)
+
+    def test_png_with_alpha_is_flattened_to_jpeg(self):
+        image = Image.new('RGBA', (300, 100), (255, 0, 0, 255))
+        image.paste((0, 0, 0, 0), (0, 0, 100, 100))
+        upload = self._upload(image, 'PNG', name='logo')
+
+        result = uploads.normalize_image_upload(upload)
+        self.assertEqual(result.name, 'logo.jpg')
+        flattened = self._open(result)
+        self.assertEqual((flattened.format, flattened.mode, flattened.size), ('JPEG', 'RGB', (300, 100)))
+        # ส่วนโปร่งใสถมด้วยสีขาว ไม่ใช่สีดำ
+        self.assertTrue(all(channel > 240 for channel in flattened.getpixel((50, 50))))
+
+
+class ThumbnailTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=f'{tmp.name}/media'))
+        self.cache_dir = f'{tmp.name}/thumbnails'
+        self.enterContext(mock.patch.object(thumbnails, 'THUMBNAIL_CACHE_DIR', self.cache_dir))
+        os.makedirs(f'{tmp.name}/media/slips')
+        Image.new('RGB', (600, 300), (200, 30, 30)).save(f'{tmp.name}/media/slips/slip.jpg', 'JPEG')
+
+        User = get_user_model()
+        self.customer = User.objects.create_user(username='customer', password='secret')
+        self.staff = User.objects.create_user(username='staff', password='secret', is_staff=True)
+
+    def _get(self, width, name='slips/slip.jpg', headers=None):
+        return self.client.get(reverse('thumbnail', args=[width, name]), headers=headers)
+
+    def _cached_files(self):
+        return [os.path.join(root, name) for root, _dirs, files in os.walk(self.cache_dir) for name in files]
+
+    def test_staff_only(self):
+        self.assertEqual(self._get(64).status_code, 302)
+        self.client.force_login(self.customer)
+        self.assertEqual(self._get(64).status_code, 302)
+        self.assertEqual(self._cached_files(), [])
+
+        self.client.force_login(self.staff)
+        response = self._get(64)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_only_whitelisted_sizes(self):
+        self.client.force_login(self.staff)
+        for width in (64, 128, 256):
+            with self.subTest(width=width):
+                response = self._get(width)
+                self.assertEqual(response.status_code, 200)
+                image = Image.open(io.BytesIO(b''.join(response.streaming_content)))
+                self.assertEqual(image.size, (width, width // 2))
+        for width in (100, 512, 1024):
+            with self.subTest(width=width):
+                self.assertEqual(self._get(width).status_code, 404)
+        self.assertEqual(len(self._cached_files()), 3)
+        self.assertEqual(self._get(64, 'slips/../../secret.jpg').status_code, 404)
+
+    def test_cache_hit_skips_rendering_and_honours_etag(self):
+        self.client.force_login(self.staff)
+        with mock.patch.object(thumbnails, 'render', wraps=thumbnails.render) as render:
+            first = self._get(128, headers={'Accept': 'image/webp'})
+            second = self._get(128, headers={'Accept': 'image/webp'})
+            self.assertEqual(render.call_count, 1)
+            # รูปแบบอื่นเป็นคนละ key
+            self.assertEqual(self._get(128)['Content-Type'], 'image/jpeg')
+            self.assertEqual(render.call_count, 2)
+
+            not_modified = self._get(128, headers={'Accept': 'image/webp', 'If-None-Match': first['ETag']})
+            self.assertEqual(render.call_count, 2)
+        self.assertEqual(first['Content-Type'], 'image/webp')
+        self.assertEqual(b''.join(first.streaming_content), b''.join(second.streaming_content))
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_eviction_removes_least_recently_used_first(self):
+        paths = {}
+        for width in thumbnails.THUMBNAIL_SIZES:
+            path, _key = thumbnails.get_thumbnail('slips/slip.jpg', width, 'jpeg')
+            paths[width] = path
+        # สร้างตามลำดับ 64, 128, 256 แล้วเรียกใช้ 64 อีกครั้ง: 128 กลายเป็นไฟล์ที่ไม่ได้ใช้นานที่สุด
+        now = time.time()
+        for age, width in enumerate((256, 128, 64), start=1):
+            os.utime(paths[width], (now - age * 60, now - age * 60))
+        thumbnails.get_thumbnail('slips/slip.jpg', 64, 'jpeg')
+
+        sizes = {width: os.path.getsize(path) for width, path in paths.items()}
+        # ลบจนเหลือไม่เกิน 90% ของเพดาน: ตั้งเพดานให้ 64 + 256 พอดี 90%
+        max_bytes = int((sizes[64] + sizes[256]) / 0.9) + 1
+        self.assertGreater(sum(sizes.values()), max_bytes)
+        self.assertEqual(thumbnails.evict(max_bytes=max_bytes), 1)
+        self.assertEqual(sorted(self._cached_files()), sorted([paths[64], paths[256]]))
+        self.assertEqual(thumbnails.evict(max_bytes=max_bytes), 0)
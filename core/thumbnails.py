@@ -0,0 +1,131 @@
+"""
+รูปย่อแบบสร้างเมื่อมีคนขอ (ใช้กับรูปตัวอย่างในหน้าจัดการออเดอร์ของ Admin)
+
+- ขนาดที่ขอได้จำกัดไว้ใน THUMBNAIL_SIZES (กันการสั่งสร้างรูปทุกขนาดจนดิสก์เต็ม)
+- ชื่อไฟล์ใน cache มาจาก hash ของ (ชื่อไฟล์, เวลาแก้ไข, ขนาดไฟล์, ความกว้าง, รูปแบบ)
+  ถ้าไฟล์ต้นฉบับเปลี่ยน key ก็เปลี่ยนเอง ไม่ต้องสั่งล้าง cache
+- เมื่อ cache ใหญ่เกิน THUMBNAIL_CACHE_MAX_BYTES จะลบไฟล์ที่ถูกใช้ล่าสุดนานที่สุดก่อน (LRU)
+  เวลาใช้งานล่าสุดเก็บใน mtime ของไฟล์ (atime เชื่อไม่ได้บนดิสก์ที่ mount แบบ noatime)
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from .images import encode, open_image
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZES = tuple(getattr(settings, 'THUMBNAIL_SIZES', (64, 128, 256)))
+THUMBNAIL_CACHE_DIR = str(getattr(settings, 'THUMBNAIL_CACHE_DIR', os.path.join(settings.BASE_DIR, 'cache', 'thumbnails')))
+THUMBNAIL_CACHE_MAX_BYTES = getattr(settings, 'THUMBNAIL_CACHE_MAX_BYTES', 256 * 1024 * 1024)
+
+# ตรวจขนาด cache (ต้องไล่ทั้งโฟลเดอร์) ไม่บ่อยกว่านี้ต่อ process
+EVICT_INTERVAL = 60
+_last_evicted = 0.0
+
+# (รูปแบบของ Pillow, นามสกุลไฟล์, MIME type)
+FORMATS = {
+    'webp': ('WEBP', 'webp', 'image/webp'),
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg'),
+}
+
+
+def pick_format(accept_header):
+    return 'webp' if 'image/webp' in (accept_header or '') else 'jpeg'
+
+
+def cache_key(name, width, fmt, storage=default_storage):
+    """key ของรูปย่อ (เปลี่ยนเมื่อไฟล์ต้นฉบับถูกแทนที่/แก้ไข)"""
+    modified = storage.get_modified_time(name).timestamp()
+    size = storage.size(name)
+    raw = f'{name}\0{modified}\0{size}\0{width}\0{fmt}'
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def cache_path(key, fmt):
+    return os.path.join(THUMBNAIL_CACHE_DIR, key[:2], f'{key}.{FORMATS[fmt][1]}')
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def render(name, width, fmt, storage=default_storage):
+    """สร้างรูปย่อกว้าง/สูงไม่เกิน width (คงสัดส่วน) คืนค่าเป็น bytes"""
+    with storage.open(name, 'rb') as fileobj:
+        image = open_image(fileobj)
+    image.thumbnail((width, width))
+    pillow_format = FORMATS[fmt][0]
+    return encode(image, pillow_format)
+
+
+def get_thumbnail(name, width, fmt, storage=default_storage):
+    """
+    คืนค่า (path ของไฟล์ใน cache, key) สร้างใหม่ถ้ายังไม่มี
+    ต้องตรวจ width กับ THUMBNAIL_SIZES และตรวจว่าไฟล์มีอยู่จริงก่อนเรียก
+    """
+    key = cache_key(name, width, fmt, storage)
+    path = cache_path(key, fmt)
+    if os.path.exists(path):
+        # บันทึกเวลาใช้งานล่าสุดสำหรับ LRU
+        os.utime(path)
+        return path, key
+
+    _write_atomic(path, render(name, width, fmt, storage))
+    _maybe_evict()
+    return path, key
+
+
+def _maybe_evict():
+    global _last_evicted
+    now = time.monotonic()
+    if now - _last_evicted >= EVICT_INTERVAL:
+        _last_evicted = now
+        evict()
+
+
+def evict(max_bytes=None):
+    """ลบไฟล์ที่ไม่ได้ใช้นานที่สุดจนขนาด cache เหลือไม่เกิน 90% ของที่กำหนด คืนค่าจำนวนไฟล์ที่ลบ"""
+    max_bytes = THUMBNAIL_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = []
+    total = 0
+    for root, _dirs, files in os.walk(THUMBNAIL_CACHE_DIR):
+        for filename in files:
+            path = os.path.join(root, filename)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+    if total <= max_bytes:
+        return 0
+
+    target = max_bytes * 0.9
+    removed = 0
+    for _used_at, size, path in sorted(entries):
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    logger.info("thumbnail cache: ลบ %s ไฟล์ เหลือ %s bytes", removed, total)
+    return removed
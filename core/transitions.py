@@ -0,0 +1,131 @@
+"""
+เปลี่ยนสถานะออเดอร์ทีละหลายรายการ (ทุกประเภทปนกันได้)
+
+ขั้นตอนสถานะที่อนุญาตอยู่ใน TRANSITIONS แต่ละออเดอร์ส่งสถานะที่ผู้ใช้เห็นบนหน้าจอมาด้วย
+แล้ว UPDATE แบบมีเงื่อนไข (WHERE status = สถานะที่เห็น) ครั้งเดียวต่อ (ประเภท, สถานะเดิม)
+ออเดอร์ที่มีคนเปลี่ยนไปก่อนแล้วจะไม่ถูกแก้ทับ และถูกรายงานกลับว่าข้าม (skipped)
+
+QuerySet.update() ไม่ยิง signal จึงอัปเดตสมุดรวมออเดอร์ ตารางสรุปยอดขาย และประวัติสถานะเองในนี้
+"""
+from collections import defaultdict, namedtuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import rollup, status_events
+from .models import OrderLedgerEntry
+from .order_types import ORDER_STATUS_CHOICES, ORDER_TYPES
+
+# สถานะเดิม -> สถานะที่ไปต่อได้
+TRANSITIONS = {
+    'pending': ('processing', 'cancelled'),
+    'processing': ('shipped', 'cancelled'),
+    'shipped': (),
+    'cancelled': ('pending',),  # เปิดออเดอร์ที่ยกเลิกผิดกลับมา
+}
+
+STATUS_LABELS = dict(ORDER_STATUS_CHOICES)
+
+# ออเดอร์ 1 รายการที่ขอเปลี่ยน: ประเภท, id, สถานะที่ผู้ใช้เห็นตอนเลือก
+Target = namedtuple('Target', 'order_type order_id expected')
+
+
+class TransitionResult:
+    def __init__(self):
+        self.updated = []   # Target ที่เปลี่ยนสำเร็จ
+        self.skipped = []   # (Target, สถานะปัจจุบัน หรือ None ถ้าไม่พบออเดอร์)
+        self.invalid = []   # (Target, เหตุผล)
+
+    def as_dict(self):
+        return {
+            'updated': [f'{t.order_type}:{t.order_id}' for t in self.updated],
+            'skipped': [
+                {'order': f'{t.order_type}:{t.order_id}', 'expected': t.expected, 'current': current}
+                for t, current in self.skipped
+            ],
+            'invalid': [
+                {'order': f'{t.order_type}:{t.order_id}', 'reason': reason}
+                for t, reason in self.invalid
+            ],
+        }
+
+
+def can_transition(current, new):
+    return new in TRANSITIONS.get(current, ())
+
+
+def parse_target(value):
+    """'product:12:pending' -> Target (คืนค่า None ถ้ารูปแบบไม่ถูกต้อง)"""
+    parts = value.split(':')
+    if len(parts) != 3 or parts[0] not in ORDER_TYPES or not parts[1].isdigit():
+        return None
+    return Target(parts[0], int(parts[1]), parts[2])
+
+
+def bulk_transition(targets, new_status):
+    """เปลี่ยนสถานะของ targets ทั้งหมดเป็น new_status คืนค่า TransitionResult"""
+    result = TransitionResult()
+    groups = defaultdict(set)
+    for target in dict.fromkeys(targets):
+        if target.expected not in TRANSITIONS:
+            result.invalid.append((target, "ไม่รู้จักสถานะเดิม"))
+        elif not can_transition(target.expected, new_status):
+            result.invalid.append((
+                target,
+                f"เปลี่ยนจาก {STATUS_LABELS[target.expected]} เป็น {STATUS_LABELS.get(new_status, new_status)} ไม่ได้",
+            ))
+        else:
+            groups[(target.order_type, target.expected)].add(target.order_id)
+
+    for (key, expected), ids in groups.items():
+        changed = _apply(ORDER_TYPES[key], ids, expected, new_status)
+        result.updated.extend(Target(key, pk, expected) for pk in sorted(changed))
+
+        missing = ids - changed
+        if missing:
+            current = dict(
+                ORDER_TYPES[key].model.objects.filter(pk__in=missing).values_list('pk', 'status')
+            )
+            result.skipped.extend(
+                (Target(key, pk, expected), current.get(pk)) for pk in sorted(missing)
+            )
+    return result
+
+
+def _apply(order_type, ids, expected, new_status):
+    """เปลี่ยนออเดอร์ประเภทเดียวที่ยังอยู่ในสถานะ expected คืนค่า set ของ id ที่เปลี่ยนจริง"""
+    model = order_type.model
+    with transaction.atomic():
+        # ล็อกแถวที่ยังเป็นสถานะเดิม พร้อมอ่านวัน/ยอดเงินไว้ปรับตารางสรุป
+        rows = list(
+            model.objects.select_for_update()
+            .filter(pk__in=ids, status=expected)
+            .values_list('pk', 'created_at', order_type.amount_field)
+        )
+        if not rows:
+            return set()
+        changed = {pk for pk, _, _ in rows}
+
+        now = timezone.now()
+        values = {'status': new_status}
+        if any(field.name == 'updated_at' for field in model._meta.concrete_fields):
+            values['updated_at'] = now  # update() ไม่เติม auto_now ให้
+        model.objects.filter(pk__in=changed, status=expected).update(**values)
+
+        OrderLedgerEntry.objects.filter(
+            order_type=order_type.key, order_id__in=changed,
+        ).update(status=new_status)
+        status_events.record_many(order_type.key, sorted(changed), expected, new_status, now)
+
+        per_day = defaultdict(lambda: [0, 0])
+        for _, created_at, amount in rows:
+            bucket = per_day[timezone.localdate(created_at)]
+            bucket[0] += 1
+            bucket[1] += order_type.to_amount(amount)
+
+        def move_rollup():
+            for day, (count, revenue) in per_day.items():
+                rollup.apply_delta(order_type.key, expected, day, -count, -revenue)
+                rollup.apply_delta(order_type.key, new_status, day, count, revenue)
+        transaction.on_commit(move_rollup)
+    return changed
@@ -0,0 +1,73 @@
+"""
+ปรับรูปที่ลูกค้าอัปโหลด (สลิปโอนเงิน, รูปสำหรับสั่งทำ) ก่อนบันทึกลง MEDIA
+
+1. อ่านเฉพาะ header เพื่อตรวจชนิดไฟล์และจำนวนพิกเซล (ยังไม่ถอดรหัสทั้งรูป)
+2. JPEG ใช้ draft() ให้ decoder ย่อระหว่างถอดรหัส หน่วยความจำจึงขึ้นกับขนาดที่ต้องการ ไม่ใช่ขนาดรูปจากกล้อง
+3. หมุนตาม EXIF แล้วย่อให้ด้านยาวไม่เกิน UPLOAD_IMAGE_MAX_SIDE
+4. บีบอัดใหม่เป็น JPEG โดยไม่แนบ EXIF (ตัดพิกัด GPS/ข้อมูลอุปกรณ์ทิ้ง)
+
+ไฟล์ที่ใหญ่กว่า FILE_UPLOAD_MAX_MEMORY_SIZE Django เขียนลงไฟล์ชั่วคราวอยู่แล้ว
+ที่นี่อ่านจากไฟล์นั้นตรงๆ ไม่โหลดทั้งไฟล์เข้าหน่วยความจำ
+"""
+import logging
+import posixpath
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .images import encode
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_IMAGE_MAX_SIDE = getattr(settings, 'UPLOAD_IMAGE_MAX_SIDE', 2048)
+UPLOAD_IMAGE_QUALITY = getattr(settings, 'UPLOAD_IMAGE_QUALITY', 85)
+# รูปที่พิกเซลเกินนี้ไม่รับ (กัน decompression bomb) 50 ล้านพิกเซล ~ กล้อง 50MP
+UPLOAD_IMAGE_MAX_PIXELS = getattr(settings, 'UPLOAD_IMAGE_MAX_PIXELS', 50_000_000)
+UPLOAD_IMAGE_MAX_BYTES = getattr(settings, 'UPLOAD_IMAGE_MAX_BYTES', 25 * 1024 * 1024)
+
+ALLOWED_FORMATS = {'JPEG', 'MPO', 'PNG', 'WEBP', 'GIF', 'BMP', 'TIFF'}
+
+
+def normalize_image_upload(uploaded, max_side=None, quality=None):
+    """
+    คืนค่าไฟล์ JPEG ที่ย่อ/ตัด metadata แล้ว (ContentFile) ใช้แทนไฟล์เดิมได้ทันที
+    ถ้าไม่มีไฟล์คืนค่า None ถ้าไม่ใช่รูปหรือใหญ่เกินไป raise ValidationError
+    """
+    if not uploaded:
+        return None
+    max_side = max_side or UPLOAD_IMAGE_MAX_SIDE
+    quality = quality or UPLOAD_IMAGE_QUALITY
+
+    original_size = uploaded.size
+    if original_size > UPLOAD_IMAGE_MAX_BYTES:
+        raise ValidationError(f"ไฟล์ใหญ่เกินไป (ไม่เกิน {UPLOAD_IMAGE_MAX_BYTES // (1024 * 1024)} MB)")
+
+    uploaded.seek(0)
+    try:
+        # Image.open อ่านแค่ header: ยังไม่ได้ถอดรหัสพิกเซล
+        image = Image.open(uploaded)
+        if image.format not in ALLOWED_FORMATS:
+            raise ValidationError("รองรับเฉพาะไฟล์รูปภาพ JPEG, PNG, WebP, GIF, BMP หรือ TIFF")
+        width, height = image.size
+        if width * height > UPLOAD_IMAGE_MAX_PIXELS:
+            raise ValidationError("รูปมีความละเอียดสูงเกินไป")
+
+        # JPEG: ให้ decoder ย่อ 1/2, 1/4, 1/8 ระหว่างถอดรหัส (ยังใหญ่กว่าหรือเท่ากับ max_side เสมอ)
+        image.draft('RGB', (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+        data = encode(image, 'JPEG', quality=quality)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError):
+        raise ValidationError("ไฟล์ที่แนบไม่ใช่รูปภาพ หรือไฟล์เสีย")
+    finally:
+        uploaded.seek(0)
+
+    stem = posixpath.splitext(posixpath.basename(uploaded.name or 'upload'))[0] or 'upload'
+    logger.info(
+        "upload %s: %s -> %s bytes (ลดลง %s bytes), %sx%s -> %sx%s",
+        uploaded.name, original_size, len(data), original_size - len(data),
+        width, height, image.width, image.height,
+    )
+    return ContentFile(data, name=f'{stem}.jpg')
@@ -1,12 +1,17 @@
 from django.urls import path
 from . import views
-from .views import HomePageView, DashboardView, UserManageView, toggle_user_status, delete_user
+from .views import HomePageView, DashboardView, OrderLedgerView, UserManageView, toggle_user_status, delete_user
 
 urlpatterns = [
     path('', HomePageView.as_view(), name='home'),
 
     path('dashboard/', DashboardView.as_view(), name='dashboard'), # หน้า Dashboard (Admin)
 
+    path('dashboard/orders/', OrderLedgerView.as_view(), name='order_ledger'), # ออเดอร์ทุกประเภทรวมกัน (Admin)
+
+    path('dashboard/orders/export/', views.export_orders, name='export_orders'), # ส่งออกออเดอร์เป็น CSV/XLSX (Admin)
+    path('dashboard/orders/bulk-status/', views.bulk_order_status, name='bulk_order_status'), # เปลี่ยนสถานะหลายออเดอร์พร้อมกัน (Admin)
+
     path('dashboard/users/', UserManageView.as_view(), name='user_manage'), # หน้า User Management (Admin)
     path('dashboard/users/toggle/<int:user_id>/', toggle_user_status, name='toggle_user_status'), # Toggle User Status (Admin)
     path('dashboard/users/delete/<int:user_id>/', delete_user, name='delete_user'), # Delete User (Admin)
@@ -15,5 +20,7 @@ urlpatterns = [
     path('dashboard/calendar/', views.admin_calendar, name='admin_calendar'), # หน้า ปฏิทินกิจกรรม (Admin)
     path('dashboard/calendar/edit/<int:event_id>/', views.edit_event, name='edit_event'), # แก้ไขกิจกรรม (Admin)
     path('dashboard/calendar/delete/<int:event_id>/', views.delete_event, name='delete_event'), # ลบกิจกรรม (Admin)
+    path('dashboard/thumbnails/<int:width>/<path:name>', views.thumbnail, name='thumbnail'), # รูปย่อสำหรับหน้าจัดการออเดอร์ (Admin)
     path('api/calendar-events/', views.calendar_events, name='calendar_events'), # API สำหรับดึงข้อมูลกิจกรรม (Admin)
+    path('api/price-quote/', views.price_quote, name='price_quote'), # API คำนวณราคาสด (หน้าสั่งซื้อ)
 ]
\ No newline at end of file
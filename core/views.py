@@ -3,17 +3,29 @@ from django.views.generic import TemplateView, ListView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib import messages
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
 
-from django.http import JsonResponse
-from .models import WorkSchedule
+import hashlib
+import json
+import posixpath
+
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_GET, require_POST, require_http_methods
+from PIL import UnidentifiedImageError
+from .models import OrderLedgerEntry, PriceEntry, WorkSchedule
+from .pagination import KeysetPaginationMixin, wants_json
 from django.contrib.auth.decorators import login_required, user_passes_test
 
-# --- 1. Import Models ทั้ง 3 ตัว ---
-# (ตรวจสอบชื่อ App ให้ถูกต้องตามโฟลเดอร์ของคุณนะครับ)
-from stores.models import Order 
-from framings.models import CustomFrameOrder  
-from plaques.models import CustomPlaqueOrder
+# ยอดขายของออเดอร์ทั้ง 3 ประเภท อ่านจากตารางสรุป (ดู core/rollup.py)
+from .rollup import dashboard_totals
+from .ledger import attach_orders
+from .order_types import ORDER_TYPE_CHOICES, ORDER_TYPES
+from . import export, media, pricing, schedule, thumbnails, transitions
+from cart.models import Cart
+from stores.catalog import get_product
 
 User = get_user_model()
 
@@ -31,36 +43,23 @@ class DashboardView(AdminRequiredMixin, TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # สถานะที่นับเป็นยอดขาย (เงินเข้าแล้ว)
-        paid_status = ['processing', 'shipped']
-
-        # --- 1. คำนวณยอดขายแยกประเภท ---
-        
-        # 1.1 ร้านค้าทั่วไป (Order)
-        sales_general = Order.objects.filter(status__in=paid_status).aggregate(sum=Sum('total_price'))['sum'] or 0
-
-        # 1.2 สั่งทำกรอบรูป (CustomFrameOrder)
-        sales_framing = CustomFrameOrder.objects.filter(status__in=paid_status).aggregate(sum=Sum('total_price'))['sum'] or 0
+        # อ่านยอดรวมจากตารางสรุป (SalesRollup) แทนการ SUM/COUNT ทั้งสามตาราง
+        # สถานะที่นับเป็นยอดขาย (เงินเข้าแล้ว) ดู PAID_STATUSES ใน core/order_types.py
+        totals = dashboard_totals()
 
-        # 1.3 สั่งทำป้ายหินอ่อน (CustomPlaqueOrder) - ใช้ final_price
-        sales_plaque = CustomPlaqueOrder.objects.filter(status__in=paid_status).aggregate(sum=Sum('final_price'))['sum'] or 0
+        # --- 1. ยอดขายแยกประเภท ---
+        sales_general = totals['product']['sales']   # 1.1 ร้านค้าทั่วไป (Order)
+        sales_framing = totals['framing']['sales']   # 1.2 สั่งทำกรอบรูป (CustomFrameOrder)
+        sales_plaque = totals['plaque']['sales']     # 1.3 สั่งทำป้ายหินอ่อน (CustomPlaqueOrder) - ใช้ final_price
 
         # --- 2. ยอดรวมสุทธิ (Grand Total) ---
         grand_total = sales_general + sales_framing + sales_plaque
 
         # --- 3. ข้อมูลอื่นๆ (จำนวนออเดอร์รวม) ---
-        total_orders_count = (
-            Order.objects.count() + 
-            CustomFrameOrder.objects.count() + 
-            CustomPlaqueOrder.objects.count()
-        )
+        total_orders_count = sum(bucket['orders'] for bucket in totals.values())
         
         # ออเดอร์รอตรวจสอบ (Pending) รวมทุกประเภท
-        pending_count = (
-            Order.objects.filter(status='pending').count() +
-            CustomFrameOrder.objects.filter(status='pending').count() +
-            CustomPlaqueOrder.objects.filter(status='pending').count()
-        )
+        pending_count = sum(bucket['pending'] for bucket in totals.values())
 
         # --- ส่งค่าไปที่ Template ---
         context['sales_general'] = sales_general
@@ -73,13 +72,45 @@ class DashboardView(AdminRequiredMixin, TemplateView):
         
         return context
 
+# --- ออเดอร์ทุกประเภทรวมกัน (อ่านจากสมุดรวม OrderLedgerEntry ด้วย query เดียว) ---
+
+class OrderLedgerView(AdminRequiredMixin, KeysetPaginationMixin, ListView):
+    template_name = 'order_ledger.html'
+    context_object_name = 'entries'
+    paginate_by = 50
+    json_fields = ('id', 'order_type', 'order_id', 'user_id', 'status', 'amount', 'created_at')
+
+    def get_queryset(self):
+        queryset = OrderLedgerEntry.objects.select_related('user')
+
+        order_type = self.request.GET.get('type', 'all')
+        if order_type in ORDER_TYPES:
+            queryset = queryset.filter(order_type=order_type)
+
+        status = self.request.GET.get('status', 'all')
+        if status != 'all':
+            queryset = queryset.filter(status=status)
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if not wants_json(self.request):
+            # รายละเอียดเฉพาะประเภท (สลิป) ดึงเฉพาะแถวในหน้านี้ ไม่เกิน 1 query ต่อประเภท
+            attach_orders(context['entries'])
+        context['order_type_choices'] = ORDER_TYPE_CHOICES
+        context['current_type'] = self.request.GET.get('type', 'all')
+        context['current_status'] = self.request.GET.get('status', 'all')
+        return context
+
 # --- User Management (จัดการผู้ใช้) ---
 
-class UserManageView(AdminRequiredMixin, ListView):
+class UserManageView(AdminRequiredMixin, KeysetPaginationMixin, ListView):
     model = User
     template_name = 'user_manage.html'
     context_object_name = 'users'
-    ordering = ['-date_joined'] 
+    paginate_by = 50
+    keyset_ordering = ('-date_joined', '-id')
+    json_fields = ('id', 'username', 'email', 'is_active', 'is_staff', 'date_joined')
 
 def toggle_user_status(request, user_id):
     if not request.user.is_staff:
@@ -115,6 +146,52 @@ def delete_user(request, user_id):
         
     return redirect('user_manage')
 
+# --- รูปย่อสำหรับหน้าจัดการออเดอร์ (Admin) ดู core/thumbnails.py ---
+
+def is_staff(user):
+    return user.is_authenticated and user.is_active and user.is_staff
+
+@require_GET
+@user_passes_test(is_staff)
+def thumbnail(request, width, name):
+    if width not in thumbnails.THUMBNAIL_SIZES:
+        raise Http404("ไม่รองรับขนาดนี้")
+
+    # รับเฉพาะ path ภายใน MEDIA (ไม่มี .. หรือ path แบบเต็ม)
+    name = posixpath.normpath(name)
+    if name.startswith(('/', '../')) or name == '..' or not default_storage.exists(name):
+        raise Http404("ไม่พบไฟล์")
+
+    fmt = thumbnails.pick_format(request.headers.get('Accept'))
+    etag = None
+    try:
+        etag = '"%s"' % thumbnails.cache_key(name, width, fmt)
+        if request.headers.get('If-None-Match') == etag:
+            response = HttpResponseNotModified()
+        else:
+            path, _key = thumbnails.get_thumbnail(name, width, fmt)
+            response = FileResponse(open(path, 'rb'), content_type=thumbnails.FORMATS[fmt][2])
+    except (UnidentifiedImageError, OSError):
+        raise Http404("เปิดรูปไม่ได้")
+
+    # URL ของรูปย่อผูกกับชื่อไฟล์ (ไฟล์ใหม่ได้ชื่อใหม่เสมอ) จึง cache ฝั่งเบราว์เซอร์ได้นาน
+    # ใช้ private เพราะบางรูปเป็นสลิป/รูปของลูกค้า ไม่ควรค้างใน proxy กลาง
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=60 * 60 * 24 * 365, immutable=True)
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+# --- ไฟล์ media (สลิป/รูปลูกค้า ดูได้เฉพาะเจ้าของและ staff) ดู core/media.py ---
+
+@require_http_methods(['GET', 'HEAD'])
+def serve_media(request, name):
+    name = posixpath.normpath(name)
+    public = media.is_public(name)
+    if not public and not media.can_access(request.user, name):
+        # ตอบ 404 แทน 403 เพื่อไม่บอกว่ามีไฟล์นี้อยู่
+        raise Http404("ไม่พบไฟล์")
+    return media.serve_file(request, name, public=public)
+
 def is_admin(user):
     return user.is_authenticated and user.is_superuser
 
@@ -134,33 +211,72 @@ def admin_calendar(request):
             
     return render(request, 'admin_calendar.html', {'events': events})
 
-# 2. API ส่งข้อมูล JSON ให้ปฏิทิน (แก้ไขใหม่: เปิดเผยรายละเอียดให้ทุกคนเห็น)
+# 2. API ส่งข้อมูล JSON ให้ปฏิทิน (เปิดเผยรายละเอียดให้ทุกคนเห็น หน้าแรกของลูกค้าก็ใช้)
+# - อ่านเฉพาะช่วง start/end ที่ FullCalendar ส่งมา (ใช้ index ของ start_date) ผ่าน cache รายเดือน
+# - ตอบ ETag ตามเนื้อหา เปลี่ยนเดือนกลับไปมาแล้วข้อมูลไม่เปลี่ยนจะได้ 304 ไม่ต้องโหลดซ้ำ
+# - สีของงานกำหนดในหน้าเว็บแต่ละหน้า (eventColor) ข้อมูลจึงเหมือนกันทุกคนและ cache ร่วมกันได้
+@require_GET
 def calendar_events(request):
-    events = WorkSchedule.objects.all()
-    data = []
-    
-    for event in events:
-        # --- 1. ชื่องาน: ให้ทุกคนเห็นรายละเอียดจริง (ไม่ต้องเช็ค is_staff แล้ว) ---
-        display_title = event.title  # ✅ โชว์ชื่อเต็มให้ทุกคนเห็น
-
-        # --- 2. สี: (อันนี้แล้วแต่คุณ ถ้าอยากให้สีต่างกันระหว่างแอดมินกับลูกค้าก็เก็บไว้ได้) ---
-        if request.user.is_staff:
-            bg_color = '#3b82f6' # สีฟ้า (มุมมองแอดมิน)
-            text_color = '#ffffff'
-        else:
-            bg_color = '#EAB308' # สีเหลือง (มุมมองลูกค้า)
-            text_color = '#000000'
-
-        data.append({
-            'id': event.id,
-            'title': display_title,
-            'start': event.start_date.isoformat(),
-            'color': bg_color,
-            'textColor': text_color,
-            'allDay': True 
-        })
-        
-    return JsonResponse(data, safe=False)
+    try:
+        start, end = schedule.requested_range(request.GET, timezone.localdate())
+    except ValueError:
+        return JsonResponse({'error': "รูปแบบวันที่ไม่ถูกต้อง (start/end)"}, status=400)
+
+    body = json.dumps(schedule.events_between(start, end), ensure_ascii=False).encode()
+    etag = '"%s"' % hashlib.md5(body, usedforsecurity=False).hexdigest()
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    # ให้ browser ถามกลับทุกครั้ง (แอดมินเพิ่งแก้งานต้องเห็นทันที) ถ้าไม่เปลี่ยนจะได้แค่ 304
+    patch_cache_control(response, no_cache=True)
+    return response
+
+# API ใบเสนอราคา: หน้าสั่งซื้อเรียกเพื่อแสดงราคาสดเมื่อเปลี่ยนจำนวน/ขนาด/วิธีส่ง
+# (ราคาทั้งหมดคำนวณจาก core/pricing.py ชุดเดียวกับตอนบันทึกออเดอร์จริง)
+QUOTE_MAX_QUANTITY = 1000
+
+
+def _quote_quantity(value):
+    try:
+        quantity = int(value)
+    except (TypeError, ValueError):
+        return 1
+    return max(1, min(quantity, QUOTE_MAX_QUANTITY))
+
+
+@require_GET
+def price_quote(request):
+    kind = request.GET.get('kind')
+    size = request.GET.get('size')
+    shipping_method = request.GET.get('shipping_method') or 'pickup'
+    quantity = _quote_quantity(request.GET.get('quantity'))
+
+    if kind == 'frame':
+        if pricing.price_of(PriceEntry.FRAME_SIZE, size) is None:
+            return JsonResponse({'error': "ไม่รู้จักขนาดกรอบนี้"}, status=400)
+        result = pricing.quote_frame(size, quantity, shipping_method)
+    elif kind == 'plaque':
+        if pricing.price_of(PriceEntry.PLAQUE_SIZE, size) is None:
+            return JsonResponse({'error': "ไม่รู้จักขนาดป้ายนี้"}, status=400)
+        result = pricing.quote_plaque(size, shipping_method)
+    elif kind == 'product':
+        product_id = request.GET.get('product', '')
+        product = get_product(int(product_id)) if product_id.isdigit() else None
+        if product is None:
+            return JsonResponse({'error': "ไม่พบสินค้า"}, status=404)
+        result = pricing.quote_product(product, quantity, shipping_method)
+    elif kind == 'cart':
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': "กรุณาเข้าสู่ระบบ"}, status=403)
+        # ยอดสรุปของตะกร้าที่เก็บไว้บนแถว Cart (ไม่ต้องไล่รายการสินค้า)
+        subtotal = Cart.objects.filter(user=request.user).values_list('subtotal', flat=True).first()
+        result = pricing.quote_subtotal("สินค้าในตะกร้า", subtotal or 0, shipping_method)
+    else:
+        return JsonResponse({'error': "kind ต้องเป็น frame, plaque, product หรือ cart"}, status=400)
+
+    return JsonResponse(result)
 
 # 3. เพิ่มฟังก์ชันสำหรับบันทึกการแก้ไข (Update)
 @user_passes_test(is_admin)
@@ -186,4 +302,78 @@ def delete_event(request, event_id):
     title = event.title
     event.delete()
     messages.success(request, f"ลบคิวงาน '{title}' เรียบร้อยแล้ว")
-    return redirect('admin_calendar')
\ No newline at end of file
+    return redirect('admin_calendar')
+
+
+# --- เปลี่ยนสถานะออเดอร์หลายรายการพร้อมกัน (Admin) ดู core/transitions.py ---
+
+def _describe(target):
+    return f"#{target.order_id} ({ORDER_TYPES[target.order_type].label})"
+
+
+@require_POST
+@user_passes_test(is_staff)
+def bulk_order_status(request):
+    """
+    POST orders=<ประเภท>:<id>:<สถานะที่เห็น> (ส่งได้หลายค่า) และ status=<สถานะใหม่>
+    ?format=json ตอบเป็น JSON นอกนั้น redirect กลับหน้าเดิม (next) พร้อมข้อความสรุป
+    """
+    new_status = request.POST.get('status', '')
+    values = request.POST.getlist('orders')
+    targets = [transitions.parse_target(value) for value in values]
+    if new_status not in transitions.TRANSITIONS or not values or None in targets:
+        error = "กรุณาเลือกออเดอร์และสถานะใหม่ให้ถูกต้อง"
+        if wants_json(request):
+            return JsonResponse({'error': error}, status=400)
+        messages.error(request, error)
+        return _redirect_back(request)
+
+    result = transitions.bulk_transition(targets, new_status)
+    if wants_json(request):
+        return JsonResponse(result.as_dict(), json_dumps_params={'ensure_ascii': False})
+
+    label = transitions.STATUS_LABELS[new_status]
+    if result.updated:
+        messages.success(request, f"เปลี่ยนสถานะเป็น {label} แล้ว {len(result.updated)} รายการ")
+    if result.skipped:
+        skipped = ", ".join(
+            f"{_describe(target)} ตอนนี้เป็น {transitions.STATUS_LABELS.get(current, 'ไม่พบออเดอร์')}"
+            for target, current in result.skipped
+        )
+        messages.warning(request, f"ข้าม {len(result.skipped)} รายการที่มีคนเปลี่ยนไปก่อนแล้ว: {skipped}")
+    if result.invalid:
+        invalid = ", ".join(f"{_describe(target)} {reason}" for target, reason in result.invalid)
+        messages.error(request, f"เปลี่ยนไม่ได้ {len(result.invalid)} รายการ: {invalid}")
+    return _redirect_back(request)
+
+
+def _redirect_back(request):
+    next_url = request.POST.get('next', '')
+    if url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}, require_https=request.is_secure()):
+        return redirect(next_url)
+    return redirect('order_ledger')
+
+
+# --- ส่งออกออเดอร์เป็น CSV / XLSX (Admin) ดู core/export.py ---
+
+@require_GET
+@user_passes_test(is_staff)
+def export_orders(request):
+    """GET start=YYYY-MM-DD&end=YYYY-MM-DD (รวมวันสุดท้าย) &file=csv|xlsx &type=product|framing|plaque (ใส่ได้หลายค่า)"""
+    fmt = request.GET.get('file', 'csv')
+    order_types = [key for key in request.GET.getlist('type') if key in ORDER_TYPES]
+    try:
+        start = schedule.parse_day(request.GET['start'])
+        end = schedule.parse_day(request.GET['end'])
+    except (KeyError, ValueError):
+        return HttpResponse("กรุณาระบุ start และ end เป็น YYYY-MM-DD", status=400)
+    if fmt not in export.FORMATS or end < start:
+        return HttpResponse("รูปแบบไฟล์หรือช่วงวันที่ไม่ถูกต้อง", status=400)
+
+    response = StreamingHttpResponse(
+        export.stream_export(fmt, start, end, order_types),
+        content_type=export.FORMATS[fmt][0],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export.filename(fmt, start, end)}"'
+    response['Cache-Control'] = 'no-store'
+    return response
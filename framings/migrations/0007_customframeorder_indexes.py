@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('framings', '0006_alter_customframeorder_status'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customframeorder',
+            index=models.Index(fields=['created_at'], name='frame_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customframeorder',
+            index=models.Index(fields=['status', 'created_at'], name='frame_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customframeorder',
+            index=models.Index(fields=['user', 'created_at'], name='frame_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customframeorder',
+            index=models.Index(fields=['user', 'status', 'created_at'], name='frame_user_status_created_idx'),
+        ),
+    ]
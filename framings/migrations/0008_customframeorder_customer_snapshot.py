@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:23
+
+from django.db import migrations, models
+
+
+def backfill_customer_snapshot(apps, schema_editor):
+    """ออเดอร์เดิม: ใช้ข้อมูลปัจจุบันของลูกค้าเป็น snapshot (ทีละ 1,000 แถว)"""
+    Order = apps.get_model('framings', 'CustomFrameOrder')
+    fields = ['customer_name', 'customer_phone', 'customer_address']
+    last_pk = 0
+    while True:
+        batch = list(
+            Order.objects.filter(pk__gt=last_pk, user__isnull=False)
+            .select_related('user').order_by('pk')[:1000]
+        )
+        if not batch:
+            break
+        for order in batch:
+            user = order.user
+            order.customer_name = (f"{user.first_name} {user.last_name}".strip() or user.username)[:255]
+            order.customer_phone = (user.phone_number or '')[:20]
+            order.customer_address = user.address or ''
+        Order.objects.bulk_update(batch, fields)
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('framings', '0007_customframeorder_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customframeorder',
+            name='customer_address',
+            field=models.TextField(blank=True, default='', verbose_name='ที่อยู่ (ตอนสั่ง)'),
+        ),
+        migrations.AddField(
+            model_name='customframeorder',
+            name='customer_name',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='ชื่อลูกค้า (ตอนสั่ง)'),
+        ),
+        migrations.AddField(
+            model_name='customframeorder',
+            name='customer_phone',
+            field=models.CharField(blank=True, default='', max_length=20, verbose_name='เบอร์โทร (ตอนสั่ง)'),
+        ),
+        migrations.RunPython(backfill_customer_snapshot, migrations.RunPython.noop),
+    ]
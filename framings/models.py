@@ -1,7 +1,10 @@
 from django.db import models
 from django.conf import settings
 
-class CustomFrameOrder(models.Model):
+from core.models import CustomerSnapshot
+from core.pricing import frame_unit_price
+
+class CustomFrameOrder(CustomerSnapshot):
     # ==========================================
     # 1. กลุ่มตัวเลือก (Choices) - ประกาศตรงนี้ให้ครบก่อน
     # ==========================================
@@ -73,18 +76,19 @@ class CustomFrameOrder(models.Model):
     # สถานะและเวลา
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name="สถานะ")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="วันที่สั่ง")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='frame_created_idx'),                        # หน้าจัดการออเดอร์ (เรียงตามเวลา)
+            models.Index(fields=['status', 'created_at'], name='frame_status_created_idx'),       # Dashboard / คิวรอตรวจสอบ
+            models.Index(fields=['user', 'created_at'], name='frame_user_created_idx'),           # ประวัติการสั่งทำของลูกค้า
+            models.Index(fields=['user', 'status', 'created_at'], name='frame_user_status_created_idx'),  # ประวัติ + กรองสถานะ
+        ]
     
     @property
     def unit_price(self):
-        # กำหนดราคาสินค้าตามขนาด (ควรตั้งให้ตรงกับที่คุณใช้คำนวณใน views.py)
-        price_list = {
-            '8x10': 150,
-            '10x12': 200,
-            '16x20': 600,
-        }
-        # คืนค่าราคาตาม size_option ที่ลูกค้าเลือก
-        return price_list.get(self.size_option, 0)
-    # เพิ่มส่วนนี้เข้าไปครับ ^^^
+        # ราคาต่อชิ้นตาม size_option ที่ลูกค้าเลือก (ตารางราคาเดียวกับหน้าสั่งซื้อ ดู core/pricing.py)
+        return frame_unit_price(self.size_option)
 
     def __str__(self):
         return f"Order #{self.id} - {self.get_size_option_display()} ({self.get_status_display()})"
\ No newline at end of file
@@ -4,13 +4,14 @@ from django.views.generic import ListView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from .models import CustomFrameOrder
 from django.views.decorators.http import require_POST
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from core.pagination import KeysetPaginationMixin
+from core.uploads import normalize_image_upload
+from core import pricing
+from core.views import is_staff
 
-PRICE_LIST = {
-    '8x10': 150,   # ขนาด 8x10 นิ้ว = 150 บาท
-    '10x12': 200,    # ขนาด 10x12 = 400 บาท
-    '16x20': 600,    # ขนาด 16x20 = 600 บาท
-}
 
 # Mixin สำหรับเช็คสิทธิ์แอดมิน
 class AdminRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
@@ -20,7 +21,12 @@ class AdminRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
 @login_required(login_url='/accounts/login/')
 def create_custom_order(request):
     if request.method == 'POST':
-        uploaded_image = request.FILES.get('image')
+        # ย่อ/บีบอัดรูป และตัด EXIF ก่อนบันทึก (ดู core/uploads.py)
+        try:
+            uploaded_image = normalize_image_upload(request.FILES.get('image'))
+        except ValidationError as e:
+            messages.error(request, e.messages[0])
+            return redirect('create_custom_order')
         size = request.POST.get('size_option')
         style = request.POST.get('style_option')      
         mounting = request.POST.get('mounting_option')
@@ -28,7 +34,8 @@ def create_custom_order(request):
         # [เพิ่ม] รับค่าหมายเหตุจากฟอร์ม
         note = request.POST.get('note', '') 
 
-        estimated_price = PRICE_LIST.get(size, 0)
+        # ราคาต่อชิ้นตามขนาด (ตารางราคาอยู่ที่ core/pricing.py)
+        estimated_price = pricing.frame_unit_price(size)
 
         # สร้าง Order เบื้องต้น
         order = CustomFrameOrder.objects.create(
@@ -44,7 +51,12 @@ def create_custom_order(request):
         
         return redirect('order_confirmation', order_id=order.id)
 
-    return render(request, 'framings/create_orderframing.html')
+    # ตัวเลือกขนาดพร้อมราคาจากตารางราคา
+    size_options = [
+        (code, label, pricing.frame_unit_price(code))
+        for code, label in CustomFrameOrder.SIZE_CHOICES
+    ]
+    return render(request, 'framings/create_orderframing.html', {'size_options': size_options})
 
 def order_confirmation(request, order_id):
     order = get_object_or_404(CustomFrameOrder, id=order_id)
@@ -53,7 +65,11 @@ def order_confirmation(request, order_id):
         # รับค่าการจัดส่งและจ่ายเงิน
         shipping_method = request.POST.get('shipping_method')
         payment_method = request.POST.get('payment_method')
-        uploaded_slip = request.FILES.get('payment_slip')
+        try:
+            uploaded_slip = normalize_image_upload(request.FILES.get('payment_slip'))
+        except ValidationError as e:
+            messages.error(request, e.messages[0])
+            return redirect('order_confirmation', order_id=order.id)
 
         # รับค่าจำนวนสินค้า (Quantity)
         try:
@@ -62,19 +78,12 @@ def order_confirmation(request, order_id):
         except (ValueError, TypeError):
             quantity = 1
 
-        # คำนวณค่าส่ง
-        if shipping_method == 'pickup':
-            shipping_cost = 0          # รับเอง ฟรี
-        elif shipping_method == 'express':
-            shipping_cost = 100        # ด่วน 100
-        else:
-            shipping_cost = 50         # ธรรมดา 50 (standard)
+        # วิธีส่งที่ไม่รู้จักคิดเป็นขนส่งธรรมดา (standard)
+        if shipping_method not in dict(CustomFrameOrder.SHIPPING_CHOICES):
+            shipping_method = 'standard'
 
-        # คำนวณราคารวมใหม่
-        unit_price = PRICE_LIST.get(order.size_option, 0)
-        
-        # สูตร: (ราคาต่อชิ้น x จำนวน) + ค่าส่ง
-        grand_total = (unit_price * quantity) + shipping_cost
+        # คำนวณราคารวมใหม่: (ราคาต่อชิ้น x จำนวน) + ค่าส่ง (ดู core/pricing.py)
+        grand_total = pricing.quote_frame(order.size_option, quantity, shipping_method)['total']
 
         # บันทึกอัปเดตข้อมูลลง Database
         order.quantity = quantity
@@ -100,24 +109,38 @@ def order_confirmation(request, order_id):
 def order_success(request):
     return render(request, 'framings/order_success.html')
 
-class ShopManagerView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+class ShopManagerView(LoginRequiredMixin, UserPassesTestMixin, KeysetPaginationMixin, ListView):
     model = CustomFrameOrder
     template_name = 'framings/admin/orderframings_manager.html'
     context_object_name = 'orders'
-    ordering = ['-created_at']
+    paginate_by = 50
+    json_fields = ('id', 'user_id', 'customer_name', 'size_option', 'style_option', 'quantity', 'total_price', 'status', 'created_at')
+
+    def get_queryset(self):
+        # ข้อมูลลูกค้าอ่านจาก snapshot ในแถวออเดอร์, username/email มากับ JOIN (ไม่ query ทีละแถว)
+        return CustomFrameOrder.objects.select_related('user')
 
     def test_func(self):
         return self.request.user.is_staff and self.request.user.is_active
     
 @require_POST
+@user_passes_test(is_staff)
 def update_order_status(request, order_id):
     order = get_object_or_404(CustomFrameOrder, id=order_id)
     new_status = request.POST.get('status')
-    order.status = new_status
-    order.save()
+    # สถานะถูกเขียนต่อไปยังประวัติสถานะ/ตารางสรุป/สมุดรวม รับเฉพาะค่าที่รู้จัก
+    if new_status in dict(CustomFrameOrder.STATUS_CHOICES):
+        order.status = new_status
+        # บันทึกสถานะกับประวัติสถานะ (signal) ใน transaction เดียวกัน
+        with transaction.atomic():
+            order.save()
+        messages.success(request, f"อัปเดตสถานะออเดอร์ #{order.id} เรียบร้อยแล้ว")
+    else:
+        messages.error(request, "ค่าสถานะไม่ถูกต้อง")
     return redirect('orderframings_manager')
 
 @require_POST
+@user_passes_test(is_staff)
 def delete_order(request, order_id):
     order = get_object_or_404(CustomFrameOrder, id=order_id)
     order.delete()
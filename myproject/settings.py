@@ -58,6 +58,18 @@ AUTH_USER_MODEL = 'accounts.CustomUser'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# ไฟล์ที่ผู้ใช้อัปโหลดเก็บตามเนื้อหา (SHA-256) ไฟล์ซ้ำเก็บชุดเดียว (ดู core/storage.py)
+# ไฟล์ที่ระบบสร้างเอง เช่น รูปย่อสินค้า ใช้ 'derived' ซึ่งเป็น FileSystemStorage ธรรมดา
+STORAGES = {
+    'default': {'BACKEND': 'core.storage.DedupFileSystemStorage'},
+    'derived': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+# วิธีส่งไฟล์ media หลังตรวจสิทธิ์แล้ว: 'django' (ส่งเอง), 'nginx' (X-Accel-Redirect), 'sendfile' (X-Sendfile)
+MEDIA_SERVE_BACKEND = 'django'
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
 # ตั้งค่าสำหรับไฟล์สแตติกเก็บรูปตัวอย่างสินค้า
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / "static",]
@@ -118,6 +130,36 @@ DATABASES = {
 # }
 # DATABASES เดิมใช้ SQLite3
 
+# Cache (ใช้กับ cache แคตตาล็อกสินค้า ดู stores/catalog.py)
+# LocMemCache แยกกันในแต่ละ process ถ้ารันหลาย worker ให้ใช้ FileBasedCache แทน
+# เพื่อให้ทุก worker เห็นเลขเวอร์ชันแคตตาล็อกเดียวกัน
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+# CACHES = {
+#     'default': {
+#         'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+#         'LOCATION': os.path.join(BASE_DIR, 'cache'),
+#     }
+# }
+
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24  # เก็บแต่ละหน้าไว้ไม่เกิน 1 วัน (ข้อมูลเปลี่ยนเมื่อไหร่ก็ล้างทันทีอยู่แล้ว)
+
+# ความกว้าง (px) ของรูปย่อสินค้าที่สร้างเป็น JPEG + WebP (ดู stores/images.py)
+PRODUCT_IMAGE_WIDTHS = (320, 640, 1024)
+
+# รูปย่อในหน้าจัดการออเดอร์ (ดู core/thumbnails.py) เก็บนอก MEDIA_ROOT
+THUMBNAIL_SIZES = (64, 128, 256)
+THUMBNAIL_CACHE_DIR = os.path.join(BASE_DIR, 'cache', 'thumbnails')
+THUMBNAIL_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# รูปที่ลูกค้าอัปโหลด (สลิป/รูปสั่งทำ) ถูกย่อและบีบอัดใหม่ก่อนบันทึก (ดู core/uploads.py)
+UPLOAD_IMAGE_MAX_SIDE = 2048
+UPLOAD_IMAGE_QUALITY = 85
+UPLOAD_IMAGE_MAX_BYTES = 25 * 1024 * 1024
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
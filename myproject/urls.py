@@ -17,7 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include # <-- เพิ่ม include
 from django.conf import settings # <-- เพิ่ม settings สำหรับ media files
-from django.conf.urls.static import static # <-- เพิ่ม static สำหรับ media files
+from core.views import serve_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -30,5 +30,8 @@ urlpatterns = [
     path('cart/', include('cart.urls')),                            # <-- URL ของ cart จะเป็นหน้าตะกร้าสินค้า
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT) # <-- เพิ่มบรรทัดนี้เพื่อให้ Django เสิร์ฟ media files ในโหมด DEBUG
\ No newline at end of file
+# ไฟล์ media เสิร์ฟผ่าน view ที่ตรวจสิทธิ์ก่อนเสมอ (ทั้ง DEBUG และ production)
+# production ให้ nginx ส่งไฟล์แทนผ่าน X-Accel-Redirect (ดู MEDIA_SERVE_BACKEND และ core/media.py)
+urlpatterns += [
+    path(settings.MEDIA_URL.lstrip('/') + '<path:name>', serve_media, name='media'),
+]
\ No newline at end of file
@@ -1,5 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 from .models import CustomPlaqueOrder
+from core.uploads import normalize_image_upload
 
 class CustomPlaqueOrderForm(forms.ModelForm):
     class Meta:
@@ -21,4 +23,11 @@ class CustomPlaqueOrderForm(forms.ModelForm):
             'stone_style': forms.Select(attrs={'class': 'form-select'}),
             'size': forms.Select(attrs={'class': 'form-select', 'id': 'id_size'}), # id ยังคงสำคัญสำหรับ script ราคา
             'note': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
-        }
\ No newline at end of file
+        }
+
+    def clean_deceased_photo(self):
+        # ย่อ/บีบอัดรูป และตัด EXIF ก่อนบันทึก (ดู core/uploads.py)
+        photo = self.cleaned_data.get('deceased_photo')
+        if isinstance(photo, UploadedFile):
+            return normalize_image_upload(photo)
+        return photo
@@ -1,7 +1,10 @@
 from django.db import models
 from django.conf import settings  # <--- จำเป็นต้อง import เพื่อเรียกใช้ Custom User
 
-class CustomPlaqueOrder(models.Model):
+from core import pricing
+from core.models import CustomerSnapshot
+
+class CustomPlaqueOrder(CustomerSnapshot):
     # --- 1. ตัวเลือกต่างๆ (Choices) ---
     SIZE_CHOICES = [
         ('15x20', '15x20 ซม. (1,000 บาท)'),
@@ -62,23 +65,11 @@ class CustomPlaqueOrder(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="วันที่สั่ง")
 
     def save(self, *args, **kwargs):
-        # 1. คำนวณราคาป้ายตามขนาด
-        if self.size == '15x20':
-            self.price = 1000
-        elif self.size == '14x29':
-            self.price = 1700
-        else:
-            self.price = 0
-
-        # 2. คำนวณค่าส่ง (เผื่อกรณีมีการแก้ไขในหน้า Admin จะได้คำนวณถูกเสมอ)
-        shipping_cost = 0
-        if self.shipping_method == 'standard':
-            shipping_cost = 50
-        elif self.shipping_method == 'express':
-            shipping_cost = 100
-        
-        # 3. รวมเป็นราคาสุทธิ
-        self.final_price = self.price + shipping_cost
+        # คำนวณราคาป้ายตามขนาด + ค่าส่งทุกครั้ง (เผื่อกรณีมีการแก้ไขในหน้า Admin จะได้คำนวณถูกเสมอ)
+        # ตารางราคาอยู่ที่ core/pricing.py
+        quote = pricing.quote_plaque(self.size, self.shipping_method)
+        self.price = quote['subtotal']
+        self.final_price = quote['total']
 
         super().save(*args, **kwargs)
 
@@ -89,4 +80,10 @@ class CustomPlaqueOrder(models.Model):
 
     class Meta:
         verbose_name = "รายการสั่งทำป้าย"
-        verbose_name_plural = "รายการสั่งทำป้ายทั้งหมด"
\ No newline at end of file
+        verbose_name_plural = "รายการสั่งทำป้ายทั้งหมด"
+        indexes = [
+            models.Index(fields=['created_at'], name='plaque_created_idx'),                        # หน้าจัดการออเดอร์ (เรียงตามเวลา)
+            models.Index(fields=['status', 'created_at'], name='plaque_status_created_idx'),       # Dashboard / คิวรอตรวจสอบ
+            models.Index(fields=['user', 'created_at'], name='plaque_user_created_idx'),           # ประวัติการสั่งทำของลูกค้า
+            models.Index(fields=['user', 'status', 'created_at'], name='plaque_user_status_created_idx'),  # ประวัติ + กรองสถานะ
+        ]
\ No newline at end of file
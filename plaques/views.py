@@ -1,7 +1,14 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.decorators import login_required # <--- จำเป็นต้องใช้
+from django.contrib.auth.decorators import login_required, user_passes_test # <--- จำเป็นต้องใช้
+from django.contrib import messages
+from django.core.exceptions import ValidationError
 from .forms import CustomPlaqueOrderForm
+from django.db import transaction
+from django.db.models import Sum
+from core.pagination import paginate_keyset, wants_json, keyset_json_response
 from .models import CustomPlaqueOrder
+from core.uploads import normalize_image_upload
+from core.views import is_staff
 
 # 1. หน้าสั่งทำ (บังคับล็อกอิน)
 @login_required(login_url='/accounts/login/') 
@@ -33,18 +40,16 @@ def plaque_checkout(request, order_id):
 
     if request.method == 'POST':
         shipping_method = request.POST.get('shipping_method')
-        payment_slip = request.FILES.get('payment_slip')
 
-        # คำนวณค่าส่ง
-        shipping_cost = 0
-        if shipping_method == 'standard':
-            shipping_cost = 50
-        elif shipping_method == 'express':
-            shipping_cost = 100
-        
-        # อัปเดตข้อมูล
+        # ย่อ/บีบอัดสลิป และตัด EXIF ก่อนบันทึก (ดู core/uploads.py)
+        try:
+            payment_slip = normalize_image_upload(request.FILES.get('payment_slip'))
+        except ValidationError as e:
+            messages.error(request, e.messages[0])
+            return redirect('plaque_checkout', order_id=order.id)
+
+        # อัปเดตข้อมูล (ราคาสุทธิ = ราคาป้าย + ค่าส่ง คำนวณใหม่ใน CustomPlaqueOrder.save)
         order.shipping_method = shipping_method
-        order.final_price = order.price + shipping_cost 
         
         if payment_slip:
             order.PAYMENT_SLIP = payment_slip
@@ -61,27 +66,44 @@ def order_success(request):
     # ใช้ไฟล์ html เดิม (thankyou.html) หรือจะเปลี่ยนชื่อไฟล์ html ก็ได้
     return render(request, 'plaques/order_success.html')
 
-# 4. หน้า Manager (สำหรับแอดมิน)
-# ควรใส่ @user_passes_test หรือเช็คว่าเป็น superuser ไหม เพื่อความปลอดภัย
+# 4. หน้า Manager (สำหรับแอดมิน) เฉพาะพนักงาน (มีข้อมูลลูกค้า)
+@user_passes_test(is_staff)
 def orderplaques_manager(request):
-    orders = CustomPlaqueOrder.objects.all().order_by('-created_at')
-    total_sales = sum(order.price for order in orders if order.price)
+    # แบ่งหน้าด้วย keyset (created_at, id) ไม่โหลดทั้งตาราง
+    # ข้อมูลลูกค้าอ่านจาก snapshot ในแถวออเดอร์, username/email มากับ JOIN (ไม่ query ทีละแถว)
+    page = paginate_keyset(request, CustomPlaqueOrder.objects.select_related('user'), per_page=50)
+    if wants_json(request):
+        return keyset_json_response(page, (
+            'id', 'user_id', 'customer_name', 'deceased_name', 'size', 'final_price', 'status', 'created_at',
+        ))
+
+    # ยอดรวมให้ฐานข้อมูลคำนวณ (ไม่ต้องวนลูปทุกออเดอร์ใน Python)
+    total_sales = CustomPlaqueOrder.objects.aggregate(total=Sum('price'))['total'] or 0
     
     return render(request, 'plaques/admin/orderplaques_manager.html', {
-        'orders': orders,
+        'orders': page.object_list,
+        'page_obj': page,
         'total_sales': total_sales
     })
 
 # 5. อัปเดตสถานะ (สำหรับแอดมิน)
+@user_passes_test(is_staff)
 def update_order_status(request, order_id):
     if request.method == 'POST':
         order = get_object_or_404(CustomPlaqueOrder, pk=order_id)
         new_status = request.POST.get('status')
-        if new_status:
+        # สถานะถูกเขียนต่อไปยังประวัติสถานะ/ตารางสรุป/สมุดรวม รับเฉพาะค่าที่รู้จัก
+        if new_status in dict(CustomPlaqueOrder.STATUS_CHOICES):
             order.status = new_status
-            order.save()
+            # บันทึกสถานะกับประวัติสถานะ (signal) ใน transaction เดียวกัน
+            with transaction.atomic():
+                order.save()
+            messages.success(request, f"อัปเดตสถานะออเดอร์ #{order.id} เรียบร้อยแล้ว")
+        else:
+            messages.error(request, "ค่าสถานะไม่ถูกต้อง")
     return redirect('orderplaques_manager')
 
+@user_passes_test(is_staff)
 def delete_plaque_order(request, order_id):
     if request.method == 'POST':
         order = get_object_or_404(CustomPlaqueOrder, pk=order_id)
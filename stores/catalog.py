@@ -0,0 +1,57 @@
+"""
+ชั้น cache สำหรับการอ่านข้อมูลแคตตาล็อก (สินค้า + หมวดหมู่)
+
+เวอร์ชันของแคตตาล็อกจะถูกเพิ่มทุกครั้งที่ Product หรือ Category ถูกบันทึก/ลบ
+(ดู stores/signals.py) ไม่ว่าจะผ่านหน้าจัดการสินค้าหรือ Django admin
+"""
+from django.conf import settings
+
+from core.cache import VersionedCache
+
+from .models import Category, Product
+
+catalog_cache = VersionedCache(
+    'catalog',
+    timeout=getattr(settings, 'CATALOG_CACHE_TIMEOUT', 60 * 60 * 24),
+)
+
+
+def get_categories():
+    """หมวดหมู่ทั้งหมด (ใช้ทำแท็บในหน้ารายการสินค้า)"""
+    return catalog_cache.get_or_set('categories', lambda: list(Category.objects.all()))
+
+
+def get_product(pk):
+    """สินค้า 1 ชิ้น หรือ None ถ้าไม่พบ"""
+    return catalog_cache.get_or_set(
+        f'product:{pk}',
+        lambda: Product.objects.select_related('category').filter(pk=pk).first(),
+    )
+
+
+def get_product_page(name, fetch):
+    """
+    หน้ารายการสินค้า 1 หน้า (name ต้องรวมตัวกรองและ cursor ของหน้านั้นแล้ว)
+    สต็อกในหน้าที่ cache ไว้อาจเก่า (การขายไม่ bump แคตตาล็อก) จึงอ่านสต็อกล่าสุดทับด้วย query เดียว
+    """
+    page = catalog_cache.get_or_set(f'page:{name}', fetch)
+    refresh_stock(page.object_list)
+    return page
+
+
+def refresh_stock(products):
+    """อ่านสต็อกปัจจุบันของสินค้าในรายการจากฐานข้อมูล (1 query) แล้วเขียนทับค่าที่มากับ cache"""
+    if not products:
+        return
+    stock = dict(Product.objects.filter(pk__in=[product.pk for product in products]).values_list('pk', 'stock'))
+    for product in products:
+        product.stock = stock.get(product.pk, 0)
+
+
+def invalidate_catalog():
+    return catalog_cache.bump()
+
+
+def invalidate_products(pks):
+    """ล้างเฉพาะหน้ารายละเอียดของสินค้าที่ระบุ (หน้ารายการ/ผลค้นหายังใช้ cache เดิม)"""
+    catalog_cache.delete_many([f'product:{pk}' for pk in pks])
@@ -0,0 +1,144 @@
+"""
+รูปย่อของรูปสินค้า (Product.image)
+
+ทุกครั้งที่รูปสินค้าเปลี่ยน จะสร้างรูปความกว้างคงที่ (PRODUCT_IMAGE_WIDTHS)
+ทั้ง JPEG และ WebP เก็บไว้ที่ products/variants/<ชื่อไฟล์ต้นฉบับเต็ม>/<กว้าง>.<นามสกุล>
+แล้วบันทึกโฟลเดอร์และความกว้างที่สร้างได้ไว้ใน Product.image_variants
+template ใช้ {% product_picture %} / {% product_srcset %} (stores/templatetags/product_images.py)
+
+รูปต้นฉบับอ่านจาก default storage (เก็บตามเนื้อหา สินค้าหลายชิ้นอาจใช้ไฟล์เดียวกัน)
+ส่วนรูปย่อเขียนลง storages['derived'] เพราะต้องกำหนดชื่อไฟล์เอง
+"""
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage, storages
+
+from core.images import encode, open_image, resize_to_width
+
+PRODUCT_IMAGE_WIDTHS = tuple(getattr(settings, 'PRODUCT_IMAGE_WIDTHS', (320, 640, 1024)))
+
+# (รูปแบบของ Pillow, นามสกุลไฟล์, MIME type)
+VARIANT_FORMATS = (
+    ('WEBP', 'webp', 'image/webp'),
+    ('JPEG', 'jpg', 'image/jpeg'),
+)
+
+VARIANT_ROOT = 'products/variants'
+
+
+def variant_storage():
+    return storages['derived']
+
+
+def variant_dir(source_name):
+    # ใช้ชื่อไฟล์ต้นฉบับทั้ง path (รวมนามสกุล) ไฟล์ต่างกันที่ชื่อไฟล์เหมือนกันจึงไม่ทับกัน
+    return posixpath.join(VARIANT_ROOT, source_name)
+
+
+def _stored_variant_dir(variants):
+    # image_variants ที่สร้างก่อนมี 'dir' ใช้โฟลเดอร์ตามชื่อไฟล์อย่างเดียว (แบบเดิม)
+    if variants.get('dir'):
+        return variants['dir']
+    stem = posixpath.splitext(posixpath.basename(variants['source']))[0]
+    return posixpath.join(VARIANT_ROOT, stem)
+
+
+def variant_name(source_name, width, extension):
+    return posixpath.join(variant_dir(source_name), f'{width}.{extension}')
+
+
+def variant_url(source_name, width, extension):
+    return variant_storage().url(variant_name(source_name, width, extension))
+
+
+def delete_variants(directory, widths):
+    storage = variant_storage()
+    for width in widths:
+        for _format, extension, _mime in VARIANT_FORMATS:
+            name = posixpath.join(directory, f'{width}.{extension}')
+            if storage.exists(name):
+                storage.delete(name)
+
+
+def release_variants(variants, exclude_pk=None):
+    """ลบรูปย่อตาม image_variants ที่บันทึกไว้ ถ้าไม่มีสินค้าชิ้นอื่นใช้ไฟล์ต้นฉบับเดียวกันอยู่"""
+    from .models import Product
+
+    if Product.objects.filter(image=variants['source']).exclude(pk=exclude_pk).exists():
+        return False
+    delete_variants(_stored_variant_dir(variants), variants.get('widths', []))
+    return True
+
+
+def render_variants(source_name):
+    """
+    สร้างรูปย่อทุกขนาดจากไฟล์ต้นฉบับใน storage คืนค่า list ความกว้างที่สร้างได้
+    ถ้ารูปต้นฉบับเล็กกว่าขนาดใหญ่สุด ขนาดสุดท้ายจะเท่ารูปจริง (ไม่ขยายรูป)
+    ใช้ได้ทั้งจาก signal และจาก process ลูกของคำสั่ง build_product_image_variants
+    """
+    with default_storage.open(source_name, 'rb') as fileobj:
+        image = open_image(fileobj)
+
+    widths = [width for width in PRODUCT_IMAGE_WIDTHS if width < image.width]
+    if image.width <= max(PRODUCT_IMAGE_WIDTHS):
+        widths.append(image.width)
+    storage = variant_storage()
+    for width in widths:
+        resized = resize_to_width(image, width)
+        for format, extension, _mime in VARIANT_FORMATS:
+            name = variant_name(source_name, width, extension)
+            if storage.exists(name):
+                storage.delete(name)
+            storage.save(name, ContentFile(encode(resized, format)))
+    return widths
+
+
+def variants_for(source_name, widths):
+    """ค่า image_variants ของไฟล์ต้นฉบับที่สร้างรูปย่อไว้แล้ว"""
+    return {'source': source_name, 'dir': variant_dir(source_name), 'widths': widths}
+
+
+def variants_match(source_name, variants):
+    return (
+        bool(source_name)
+        and variants.get('source') == source_name
+        and variants.get('dir') == variant_dir(source_name)
+    )
+
+
+def variants_are_current(product):
+    return bool(product.image) and variants_match(product.image.name, product.image_variants or {})
+
+
+def build_variants(product, force=False):
+    """
+    สร้างรูปย่อของสินค้า (ถ้ารูปยังไม่เปลี่ยนและไม่ force จะข้าม)
+    บันทึกผลด้วย UPDATE ตรง ไม่เรียก save() ซ้ำ คืนค่า True ถ้ามีการสร้างใหม่
+    """
+    previous = product.image_variants or {}
+    if not force and (variants_are_current(product) or (not product.image and not previous)):
+        return False
+
+    if previous.get('source') and not variants_match(product.image.name, previous):
+        release_variants(previous, exclude_pk=product.pk)
+
+    variants = {}
+    if product.image:
+        variants = variants_for(product.image.name, render_variants(product.image.name))
+
+    product.image_variants = variants
+    type(product).objects.filter(pk=product.pk).update(image_variants=variants)
+    return True
+
+
+def srcset(product, extension):
+    """ค่า srcset ของรูปแบบไฟล์นี้ เช่น "/media/.../320.webp 320w, /media/.../640.webp 640w" """
+    if not variants_are_current(product):
+        return ''
+    source = product.image.name
+    return ', '.join(
+        f'{variant_url(source, width, extension)} {width}w'
+        for width in product.image_variants['widths']
+    )
@@ -0,0 +1,97 @@
+"""
+ตัดสต็อกสินค้าแบบ atomic ด้วย UPDATE ... WHERE stock >= จำนวนที่สั่ง
+
+ตัดสต็อกของทั้งตะกร้าด้วยคำสั่ง UPDATE เดียว (ใช้ CASE เลือกจำนวนตามสินค้า)
+ถ้ามีบางรายการไม่พอ จะ rollback ทั้งชุดแล้วแจ้งว่ารายการไหนไม่พอ
+ไม่ต้องอ่าน stock มาลบใน Python จึงไม่เกิด lost update และไม่ขายเกินสต็อก
+"""
+from collections import OrderedDict
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .catalog import invalidate_products
+from .models import Product
+
+# จำนวนครั้งที่ลองใหม่เมื่อสต็อกเปลี่ยนระหว่างตรวจสอบ
+MAX_ATTEMPTS = 3
+
+
+class OutOfStock(Exception):
+    """สต็อกไม่พอ: failures เป็น list ของ dict (product_id, name, requested, available)"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        names = ', '.join(f"{line['name']} (เหลือ {line['available']})" for line in failures)
+        super().__init__(f"สินค้าไม่พอ: {names}")
+
+
+def _combine(lines):
+    """รวมจำนวนของสินค้าตัวเดียวกัน: [(product_id, qty), ...] -> {product_id: qty}"""
+    wanted = OrderedDict()
+    for product_id, quantity in lines:
+        wanted[product_id] = wanted.get(product_id, 0) + quantity
+    return wanted
+
+
+def _quantity_case(wanted):
+    return Case(
+        *[When(pk=product_id, then=Value(quantity)) for product_id, quantity in wanted.items()],
+        output_field=IntegerField(),
+    )
+
+
+def _find_failures(wanted):
+    available = {
+        row['pk']: row
+        for row in Product.objects.filter(pk__in=wanted).values('pk', 'name', 'stock')
+    }
+    failures = []
+    for product_id, quantity in wanted.items():
+        row = available.get(product_id)
+        stock = row['stock'] if row else 0
+        if stock < quantity:
+            failures.append({
+                'product_id': product_id,
+                'name': row['name'] if row else f"#{product_id}",
+                'requested': quantity,
+                'available': max(stock, 0),
+            })
+    return failures
+
+
+def decrement_stock(lines):
+    """
+    ตัดสต็อกของทุกรายการพร้อมกัน ได้ทั้งหมดหรือไม่ได้เลย
+    lines: [(product_id, quantity), ...]  ถ้าไม่พอจะ raise OutOfStock
+    """
+    wanted = _combine(lines)
+    if not wanted:
+        return 0
+
+    quantity = _quantity_case(wanted)
+    for _ in range(MAX_ATTEMPTS):
+        with transaction.atomic():
+            updated = (
+                Product.objects
+                .filter(pk__in=wanted, stock__gte=quantity)
+                .update(stock=F('stock') - quantity)
+            )
+            if updated == len(wanted):
+                # สต็อกเปลี่ยนทุกครั้งที่ขาย: ล้างเฉพาะหน้ารายละเอียดของสินค้าที่ขายไป
+                # ไม่ bump ทั้งแคตตาล็อก หน้ารายการ/ค้นหาอ่านสต็อกล่าสุดเองทุกครั้ง (catalog.get_product_page)
+                transaction.on_commit(lambda: invalidate_products(list(wanted)))
+                return updated
+            # บางรายการไม่พอ: ย้อนกลับเฉพาะการตัดสต็อกในชุดนี้
+            transaction.set_rollback(True)
+
+        failures = _find_failures(wanted)
+        if failures:
+            raise OutOfStock(failures)
+        # ถ้าหาไม่เจอว่ารายการไหนไม่พอ แปลว่ามีการเติมสต็อกระหว่างนั้น ให้ลองใหม่
+
+    raise OutOfStock(_find_failures(wanted) or [
+        {'product_id': pk, 'name': f"#{pk}", 'requested': qty, 'available': 0}
+        for pk, qty in wanted.items()
+    ])
+
@@ -0,0 +1,71 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from stores.catalog import invalidate_catalog
+from stores.images import release_variants, render_variants, variants_for, variants_match
+from stores.models import Product
+
+
+def _setup_worker():
+    # process ลูกที่ไม่ได้ fork มาจาก process หลัก (เช่น spawn) ต้องโหลด Django เอง
+    import django
+    django.setup()
+
+
+def _render(pk, source_name):
+    try:
+        return pk, source_name, render_variants(source_name), None
+    except Exception as exc:  # รูปเสีย/ไฟล์หาย ให้รายงานแล้วทำรายการอื่นต่อ
+        return pk, source_name, None, str(exc)
+
+
+class Command(BaseCommand):
+    help = "สร้างรูปย่อ JPEG/WebP ของรูปสินค้าที่มีอยู่แล้ว โดยแบ่งงานไปหลาย process ตามจำนวน CPU"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="จำนวน process (ค่าเริ่มต้น = จำนวน CPU)")
+        parser.add_argument('--force', action='store_true', help="สร้างใหม่ทั้งหมด แม้รูปย่อจะเป็นปัจจุบันอยู่แล้ว")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        pending = []
+        for pk, image, variants in Product.objects.exclude(image='').exclude(image__isnull=True).values_list('pk', 'image', 'image_variants'):
+            variants = variants or {}
+            if options['force'] or not variants_match(image, variants):
+                if variants.get('source') and not variants_match(image, variants):
+                    release_variants(variants, exclude_pk=pk)
+                pending.append((pk, image))
+
+        if not pending:
+            self.stdout.write(self.style.SUCCESS("รูปย่อของสินค้าทุกชิ้นเป็นปัจจุบันแล้ว"))
+            return
+
+        # ไม่ส่ง connection ฐานข้อมูลที่เปิดค้างไปให้ process ลูก
+        connections.close_all()
+
+        done = failed = 0
+        workers = max(1, options['workers'])
+        with ProcessPoolExecutor(max_workers=workers, initializer=_setup_worker) as executor:
+            futures = [executor.submit(_render, pk, image) for pk, image in pending]
+            for future in as_completed(futures):
+                pk, source, widths, error = future.result()
+                if error:
+                    failed += 1
+                    self.stderr.write(f"สินค้า #{pk} ({source}): {error}")
+                    continue
+                # บันทึกผลใน process หลัก (ไม่เรียก save() เพื่อไม่ให้ signal สร้างรูปซ้ำ)
+                Product.objects.filter(pk=pk, image=source).update(image_variants=variants_for(source, widths))
+                done += 1
+
+        if done:
+            invalidate_catalog()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"สร้างรูปย่อ {done} รายการ ล้มเหลว {failed} รายการ ใช้ {workers} process เสร็จใน {elapsed:.1f} วินาที"
+        ))
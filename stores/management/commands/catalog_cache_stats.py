@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from stores.catalog import catalog_cache
+
+
+class Command(BaseCommand):
+    help = "แสดงจำนวน hit/miss ของ cache แคตตาล็อกสินค้า"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="ล้างตัวนับหลังแสดงผล")
+
+    def handle(self, *args, **options):
+        stats = catalog_cache.stats()
+        self.stdout.write(
+            f"เวอร์ชันแคตตาล็อก: {stats['version']}\n"
+            f"hits: {stats['hits']}  misses: {stats['misses']}  hit rate: {stats['hit_rate']:.1%}"
+        )
+        if options['reset']:
+            catalog_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS("ล้างตัวนับเรียบร้อยแล้ว"))
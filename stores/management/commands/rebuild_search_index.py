@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from stores.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "สร้าง index สำหรับค้นหาสินค้าใหม่ทั้งหมด (ใช้ตอนติดตั้งครั้งแรก หรือเมื่อ index ไม่ตรงกับข้อมูล)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="จำนวนสินค้าที่ทำ index ต่อรอบ")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        indexed = rebuild_index(batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"ทำ index สินค้า {indexed} รายการ เสร็จใน {elapsed:.1f} วินาที"))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stores', '0007_remove_order_product_remove_order_quantity_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=32)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='stores.product')),
+            ],
+            options={
+                'verbose_name': 'คำค้นหาสินค้า',
+                'verbose_name_plural': 'คำค้นหาสินค้า',
+                'indexes': [models.Index(fields=['term', 'product'], name='stores_search_term_idx')],
+            },
+        ),
+    ]
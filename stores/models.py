@@ -3,6 +3,8 @@ from django.conf import settings
 from django.utils.text import slugify
 from decimal import Decimal
 
+from core.models import CustomerSnapshot
+
 # --- 1. Model หมวดหมู่ (Category) ---
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True, verbose_name="ชื่อหมวดหมู่")
@@ -55,6 +57,8 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="ราคาสินค้า") 
     stock = models.IntegerField(default=0, verbose_name="จำนวนคงเหลือ")
     image = models.ImageField(upload_to='products/', null=True, blank=True, verbose_name="รูปสินค้า")
+    # รูปย่อที่สร้างจาก image: {'source': ชื่อไฟล์ต้นฉบับ, 'widths': [320, 640, ...]} (ดู stores/images.py)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name="รูปย่อ")
     
     # --- 2. เพิ่ม 4 field เดียวกันนี้ ---
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="เวลาสร้าง")
@@ -79,8 +83,25 @@ class Product(models.Model):
     def __str__(self):
         return self.name
 
+# --- 2.1 Index สำหรับค้นหาสินค้า (ดู stores/search.py) ---
+class ProductSearchTerm(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='search_terms')
+    term = models.CharField(max_length=32)
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        verbose_name = "คำค้นหาสินค้า"
+        verbose_name_plural = "คำค้นหาสินค้า"
+        indexes = [
+            # ค้นหาด้วย term แล้วได้ product_id จาก index ได้เลย ไม่ต้องอ่านตาราง
+            models.Index(fields=['term', 'product'], name='stores_search_term_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> {self.product_id}"
+
 # --- 3. Model คำสั่งซื้อ (Order) ---
-class Order(models.Model):
+class Order(CustomerSnapshot):
     SHIPPING_CHOICES = [
         ('pickup', 'รับเองที่ร้าน (ฟรี)'),
         ('standard', 'ขนส่งธรรมดา (50 บาท)'),
@@ -120,6 +141,12 @@ class Order(models.Model):
     class Meta:
         verbose_name = "คำสั่งซื้อ"
         verbose_name_plural = "คำสั่งซื้อ"
+        indexes = [
+            models.Index(fields=['created_at'], name='order_created_idx'),                          # หน้าจัดการออเดอร์ (เรียงตามเวลา)
+            models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),         # Dashboard / คิวรอตรวจสอบ
+            models.Index(fields=['customer', 'created_at'], name='order_customer_created_idx'),     # ประวัติการสั่งซื้อของลูกค้า
+            models.Index(fields=['customer', 'status', 'created_at'], name='order_cust_status_created_idx'),  # ประวัติ + กรองสถานะ
+        ]
 
     def __str__(self):
         return f"Order #{self.id} - {self.product.name}"
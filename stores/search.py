@@ -0,0 +1,154 @@
+"""
+ระบบค้นหาสินค้าแบบ Inverted Index (ใช้แทน icontains ที่ต้องสแกนทั้งตาราง)
+
+- ภาษาไทยไม่มีการเว้นวรรคระหว่างคำ จึงตัดเป็น bigram (ทีละ 2 ตัวอักษร)
+  ทั้งตอนสร้าง index และตอนค้นหา ทำให้ค้นคำบางส่วนของประโยคไทยได้
+- ภาษาอังกฤษ/ตัวเลข ตัดตามคำ และเก็บ prefix ของคำไว้ด้วย เพื่อให้พิมพ์ไม่จบคำก็เจอ
+- คะแนนความเกี่ยวข้อง = ผลรวมน้ำหนักของคำที่ตรง (ชื่อสินค้ามีน้ำหนักมากกว่ารายละเอียด)
+"""
+import re
+import unicodedata
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, Q, Sum, Value, When
+
+from .models import Product, ProductSearchTerm
+
+# ความยาวสูงสุดของคำใน index (ต้องตรงกับ max_length ของ ProductSearchTerm.term)
+MAX_TERM_LENGTH = 32
+
+# prefix ของคำภาษาอังกฤษที่สั้นที่สุดที่จะเก็บลง index
+MIN_PREFIX_LENGTH = 2
+
+# น้ำหนักของแต่ละช่อง
+NAME_WEIGHT = 3
+DESCRIPTION_WEIGHT = 1
+
+# น้ำหนักสูงสุดต่อคำ (PositiveSmallIntegerField)
+MAX_WEIGHT = 32767
+
+# ช่วงอักษรไทย (รวมสระ/วรรณยุกต์) กับคำภาษาอื่นที่ไม่ใช่อักษรไทย
+_TOKEN_RE = re.compile(r'[\u0E00-\u0E7F]+|[^\W_\u0E00-\u0E7F]+')
+_THAI_RE = re.compile(r'[\u0E00-\u0E7F]')
+
+
+def _normalize(text):
+    return unicodedata.normalize('NFC', text or '').lower()
+
+
+def _thai_bigrams(run):
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def tokenize(text, prefixes=False):
+    """
+    แปลงข้อความเป็นรายการคำสำหรับ index
+    prefixes=True ใช้ตอนสร้าง index (เก็บ prefix ของคำภาษาอังกฤษด้วย)
+    """
+    terms = []
+    for token in _TOKEN_RE.findall(_normalize(text)):
+        if _THAI_RE.match(token):
+            terms.extend(_thai_bigrams(token))
+            continue
+
+        word = token[:MAX_TERM_LENGTH]
+        if prefixes:
+            terms.extend(word[:n] for n in range(MIN_PREFIX_LENGTH, len(word)))
+        terms.append(word)
+    return terms
+
+
+def query_terms(query):
+    """คำที่ต้องเจอครบทุกคำ ถึงจะนับว่าสินค้านั้นตรงกับคำค้นหา"""
+    return sorted(set(tokenize(query)))
+
+
+def document_terms(product):
+    """คืนค่า {term: weight} ของสินค้า 1 ชิ้น"""
+    weights = Counter()
+    for term in tokenize(product.name, prefixes=True):
+        weights[term] += NAME_WEIGHT
+    for term in tokenize(product.description, prefixes=True):
+        weights[term] += DESCRIPTION_WEIGHT
+    return weights
+
+
+def _build_rows(product):
+    return [
+        ProductSearchTerm(product_id=product.pk, term=term, weight=min(weight, MAX_WEIGHT))
+        for term, weight in document_terms(product).items()
+    ]
+
+
+def index_product(product):
+    """สร้าง index ใหม่ของสินค้า 1 ชิ้น (ลบของเก่าแล้วเขียนใหม่)"""
+    with transaction.atomic():
+        ProductSearchTerm.objects.filter(product_id=product.pk).delete()
+        ProductSearchTerm.objects.bulk_create(_build_rows(product))
+
+
+def rebuild_index(batch_size=500):
+    """สร้าง index ใหม่ทั้งหมด (ใช้กับคำสั่ง rebuild_search_index) คืนค่าจำนวนสินค้าที่ทำ index"""
+    ProductSearchTerm.objects.all().delete()
+
+    indexed = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            Product.objects.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .only('pk', 'name', 'description')[:batch_size]
+        )
+        if not batch:
+            break
+
+        rows = []
+        for product in batch:
+            rows.extend(_build_rows(product))
+        ProductSearchTerm.objects.bulk_create(rows, batch_size=1000)
+
+        indexed += len(batch)
+        last_pk = batch[-1].pk
+    return indexed
+
+
+def search_products(queryset, query):
+    """
+    กรอง queryset ด้วยคำค้นหา และเรียงตามความเกี่ยวข้อง (search_rank)
+    ทุกคำในคำค้นหาต้องเจอในสินค้า (AND) โดยค้นผ่าน index ของคอลัมน์ term
+    """
+    terms = query_terms(query)
+    if not terms:
+        return queryset.none()
+    if min(len(term) for term in terms) < MIN_PREFIX_LENGTH:
+        return _scan_products(queryset, query)
+
+    return (
+        queryset.filter(search_terms__term__in=terms)
+        .annotate(
+            search_rank=Sum('search_terms__weight'),
+            search_hits=Count('search_terms__term', distinct=True),
+        )
+        .filter(search_hits=len(terms))
+        .order_by('-search_rank', '-pk')
+    )
+
+
+def _scan_products(queryset, query):
+    """
+    คำค้นสั้นกว่าคำที่สั้นที่สุดใน index (เช่นพิมพ์ 1 ตัวอักษร) หาจาก index ไม่เจอ
+    จึงกลับไปใช้ icontains แบบเดิม ให้คะแนนแบบเดียวกับ index (ตรงในชื่อมากกว่ารายละเอียด)
+    """
+    query = query.strip()
+    return (
+        queryset.filter(Q(name__icontains=query) | Q(description__icontains=query))
+        .annotate(search_rank=Case(
+            When(name__icontains=query, then=Value(NAME_WEIGHT)),
+            default=Value(DESCRIPTION_WEIGHT),
+            output_field=IntegerField(),
+        ))
+        .order_by('-search_rank', '-pk')
+    )
@@ -0,0 +1,42 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalog import invalidate_catalog
+from .images import build_variants, release_variants
+from .models import Category, Product
+from .search import index_product
+
+
+# สร้างรูปย่อ JPEG/WebP เมื่อรูปสินค้าเปลี่ยน (ต้องลงทะเบียนก่อน bump_catalog_version
+# เพื่อให้ cache ที่สร้างใหม่หลังจากนี้เห็น image_variants ล่าสุด)
+@receiver(post_save, sender=Product)
+def build_product_image_variants(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    build_variants(instance)
+
+
+@receiver(post_delete, sender=Product)
+def delete_product_image_variants(sender, instance, **kwargs):
+    variants = instance.image_variants or {}
+    if variants.get('source'):
+        transaction.on_commit(lambda: release_variants(variants))
+
+
+# อัปเดต index ค้นหาทุกครั้งที่บันทึกสินค้า (การลบสินค้าจะลบ index ตามไปเองด้วย CASCADE)
+@receiver(post_save, sender=Product)
+def reindex_product(sender, instance, update_fields=None, **kwargs):
+    # ถ้าบันทึกเฉพาะบาง field ที่ไม่เกี่ยวกับการค้นหา (เช่น stock) ไม่ต้องทำ index ใหม่
+    if update_fields is not None and not {'name', 'description'} & set(update_fields):
+        return
+    index_product(instance)
+
+
+# เพิ่มเวอร์ชันแคตตาล็อกเมื่อสินค้า/หมวดหมู่เปลี่ยน (หลัง commit เพื่อไม่ให้ cache ข้อมูลที่ยังไม่ commit)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_catalog_version(sender, **kwargs):
+    transaction.on_commit(invalidate_catalog)
@@ -0,0 +1,41 @@
+from django import template
+
+from ..images import VARIANT_FORMATS, srcset, variant_url, variants_are_current
+
+register = template.Library()
+
+# ค่า sizes เริ่มต้น: การ์ดสินค้าในหน้ารายการ (1/2/5 คอลัมน์ตามความกว้างจอ)
+DEFAULT_SIZES = '(min-width: 1024px) 20vw, (min-width: 640px) 50vw, 100vw'
+
+
+@register.simple_tag
+def product_srcset(product, extension='jpg'):
+    """srcset ของรูปย่อสินค้า เช่น {% product_srcset product 'webp' %}"""
+    return srcset(product, extension)
+
+
+@register.inclusion_tag('stores/partials/product_picture.html')
+def product_picture(product, sizes=DEFAULT_SIZES, css_class='', alt=None):
+    """
+    <picture> ที่มี srcset ของ WebP และ JPEG ให้เบราว์เซอร์เลือกขนาดเอง
+    ถ้ายังไม่มีรูปย่อ (เช่น ยังไม่ได้รัน build_product_image_variants) จะใช้รูปต้นฉบับ
+    """
+    context = {
+        'product': product,
+        'sizes': sizes,
+        'css_class': css_class,
+        'alt': product.name if alt is None else alt,
+        'sources': [],
+        'src': product.image.url if product.image else '',
+        'srcset': '',
+    }
+    if variants_are_current(product):
+        widths = product.image_variants['widths']
+        context['sources'] = [
+            {'type': mime, 'srcset': srcset(product, extension)}
+            for _format, extension, mime in VARIANT_FORMATS
+            if extension != 'jpg'
+        ]
+        context['srcset'] = srcset(product, 'jpg')
+        context['src'] = variant_url(product.image.name, widths[len(widths) // 2], 'jpg')
+    return context
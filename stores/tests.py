@@ -1,3 +1,453 @@
-from django.test import TestCase
+import io
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from cart import cleanup, merge
+from cart.models import Cart, CartItem
+from core import pricing
+from .catalog import catalog_cache, get_product
+from .images import variant_dir, variant_storage
+from .inventory import decrement_stock
+from .models import Order, OrderItem, Product
+from .search import search_products
+
+
+class CartCheckoutTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='buyer', password='secret')
+        self.client.force_login(self.user)
+        self.cart = Cart.objects.create(user=self.user)
+        self.products = [
+            Product.objects.create(name=f"สินค้า {i}", description="-", price=Decimal('10.00'), stock=100)
+            for i in range(20)
+        ]
+        # โหลดตารางราคาเข้า cache ก่อน (ครั้งแรกเท่านั้นที่อ่านจากฐานข้อมูล ไม่เกี่ยวกับขนาดตะกร้า)
+        pricing.snapshot()
+
+    def _fill_cart(self, lines):
+        CartItem.objects.filter(cart=self.cart).delete()
+        for product in self.products[:lines]:
+            CartItem.objects.create(cart=self.cart, product=product, quantity=2)
+
+    def _checkout_queries(self, lines):
+        self._fill_cart(lines)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('cart_checkout'), {'shipping_method': 'standard'})
+        self.assertRedirects(response, reverse('store_order_success'), fetch_redirect_response=False)
+        return len(ctx)
+
+    def test_query_count_does_not_grow_with_basket_size(self):
+        single = self._checkout_queries(1)
+        full = self._checkout_queries(20)
+        self.assertEqual(single, full)
+
+    def test_checkout_creates_order_and_decrements_stock(self):
+        self._fill_cart(3)
+        self.client.post(reverse('cart_checkout'), {'shipping_method': 'express'})
+
+        order = Order.objects.get(customer=self.user)
+        self.assertEqual(order.total_price, Decimal('160.00'))
+        self.assertEqual(OrderItem.objects.filter(order=order).count(), 3)
+        self.assertFalse(CartItem.objects.filter(cart=self.cart).exists())
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).stock, 98)
+
+    def test_out_of_stock_basket_is_rejected(self):
+        self._fill_cart(2)
+        Product.objects.filter(pk=self.products[1].pk).update(stock=1)
+
+        response = self.client.post(reverse('cart_checkout'), {'shipping_method': 'pickup'})
+
+        self.assertRedirects(response, reverse('cart:cart_detail'), fetch_redirect_response=False)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(Product.objects.get(pk=self.products[0].pk).stock, 100)
+        self.assertEqual(CartItem.objects.filter(cart=self.cart).count(), 2)
+
+
+class CartApiTests(TestCase):
+    def setUp(self):
+        User = get_user_model()
+        self.user = User.objects.create_user(username='buyer', password='secret')
+        self.client.force_login(self.user)
+        self.product = Product.objects.create(name="กรอบ", description="-", price=Decimal('10.00'), stock=5)
+        self.other = Product.objects.create(name="ป้าย", description="-", price=Decimal('25.00'), stock=50)
+
+    def _post(self, name, pk, **data):
+        return self.client.post(reverse(f'cart:{name}', args=[pk]), data, HTTP_ACCEPT='application/json')
+
+    def _add(self, product, quantity):
+        response = self._post('api_add_to_cart', product.pk, quantity=quantity)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_add_returns_line_subtotal_and_badge(self):
+        self._add(self.other, 1)
+        data = self._add(self.product, 2)
+
+        item = CartItem.objects.get(cart__user=self.user, product=self.product)
+        self.assertEqual(data['line']['id'], item.pk)
+        self.assertEqual((data['line']['quantity'], data['line']['line_total']), (2, '20.00'))
+        self.assertEqual((data['subtotal'], data['item_count'], data['badge_count']), ('45.00', 3, 3))
+
+        data = self._add(self.product, 1)
+        self.assertEqual((data['line']['quantity'], data['item_count'], data['badge_count']), (3, 4, 4))
+
+    def test_update_is_clamped_to_stock(self):
+        item_id = self._add(self.product, 1)['line']['id']
+
+        response = self._post('api_update_cart', item_id, quantity=9)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['line']['quantity'], data['level']), (5, 'warning'))
+        self.assertEqual((data['subtotal'], data['badge_count']), ('50.00', 5))
+        self.assertEqual(CartItem.objects.get(pk=item_id).quantity, 5)
+
+    def test_zero_quantity_deletes_the_line(self):
+        self._add(self.other, 2)
+        item_id = self._add(self.product, 1)['line']['id']
+
+        data = self._post('api_update_cart', item_id, quantity=0).json()
+        self.assertIsNone(data['line'])
+        self.assertEqual((data['subtotal'], data['item_count'], data['badge_count']), ('50.00', 2, 2))
+        self.assertFalse(CartItem.objects.filter(pk=item_id).exists())
+
+        other_id = CartItem.objects.get(product=self.other).pk
+        data = self._post('api_remove_from_cart', other_id).json()
+        self.assertIsNone(data['line'])
+        self.assertEqual((data['subtotal'], data['item_count'], data['badge_count']), ('0.00', 0, 0))
+
+    def test_items_of_another_cart_are_not_found(self):
+        stranger = get_user_model().objects.create_user(username='stranger', password='secret')
+        foreign = CartItem.objects.create(cart=Cart.objects.create(user=stranger), product=self.product, quantity=1)
+        self._add(self.product, 1)
+
+        for name in ('api_update_cart', 'api_remove_from_cart'):
+            response = self._post(name, foreign.pk, quantity=3)
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(response.json()['level'], 'error')
+        self.assertEqual(CartItem.objects.get(pk=foreign.pk).quantity, 1)
+
+    def test_non_integer_quantity_is_rejected(self):
+        item_id = self._add(self.product, 2)['line']['id']
+
+        response = self._post('api_update_cart', item_id, quantity='สอง')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['level'], 'error')
+        self.assertEqual(CartItem.objects.get(pk=item_id).quantity, 2)
+
+    def test_anonymous_callers_get_json_401(self):
+        item_id = self._add(self.product, 1)['line']['id']
+        self.client.logout()
+
+        for name, pk in (('api_add_to_cart', self.product.pk), ('api_update_cart', item_id), ('api_remove_from_cart', item_id)):
+            response = self._post(name, pk, quantity=1)
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(CartItem.objects.get(pk=item_id).quantity, 1)
+
+
+class CartBadgeTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='buyer', password='secret')
+        self.client.force_login(self.user)
+        self.product = Product.objects.create(name="กรอบ", description="-", price=Decimal('10.00'), stock=50)
+        self.other = Product.objects.create(name="ป้าย", description="-", price=Decimal('25.00'), stock=50)
+        self.client.post(reverse('cart:api_add_to_cart', args=[self.product.pk]), {'quantity': 2})
+        self.client.post(reverse('cart:api_add_to_cart', args=[self.other.pk]), {'quantity': 1})
+
+    def _badge(self, client=None):
+        response = (client or self.client).get(reverse('home'))
+        return response.context['cart_item_count']
+
+    def test_cached_badge_costs_no_cart_query(self):
+        self.assertEqual(self._badge(), 3)
+        # session + user เท่านั้น ไม่แตะตารางตะกร้า
+        with self.assertNumQueries(2):
+            self.assertEqual(self._badge(), 3)
+
+    def test_product_delete_refreshes_the_stored_count(self):
+        self.assertEqual(self._badge(), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.delete()
+        self.assertEqual(self._badge(), 1)
+        self.assertEqual(Cart.objects.get(user=self.user).item_count, 1)
+
+    def test_change_from_another_device_refreshes_the_stored_count(self):
+        self.assertEqual(self._badge(), 3)
+        other_device = Client()
+        other_device.force_login(self.user)
+        item = CartItem.objects.get(cart__user=self.user, product=self.other)
+        other_device.post(reverse('cart:api_update_cart', args=[item.pk]), {'quantity': 4})
+
+        self.assertEqual(self._badge(), 6)
+        self.assertEqual(self._badge(other_device), 6)
+
+
+class StockDecrementTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sold, self.other = [
+                Product.objects.create(name=name, description="-", price=Decimal('10.00'), stock=100)
+                for name in ("ขายแล้ว", "ไม่ได้ขาย")
+            ]
+        catalog_cache.bump()
+
+    def _listed_stock(self):
+        response = self.client.get(reverse('product_list'), {'format': 'json'})
+        return {row['id']: row['stock'] for row in response.json()['results']}
+
+    def test_sale_refreshes_only_the_sold_products(self):
+        version = catalog_cache.version()
+        get_product(self.sold.pk)
+        get_product(self.other.pk)
+        self.assertEqual(self._listed_stock(), {self.sold.pk: 100, self.other.pk: 100})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            decrement_stock([(self.sold.pk, 100)])
+
+        # ไม่ bump แคตตาล็อก: หน้ารายการใช้ cache เดิมแต่สต็อกต้องเป็นค่าล่าสุด
+        self.assertEqual(catalog_cache.version(), version)
+        self.assertEqual(self._listed_stock(), {self.sold.pk: 0, self.other.pk: 100})
+        page = self.client.get(reverse('product_list'))
+        self.assertNotContains(page, f'id="add-to-cart-form-{self.sold.pk}"')
+        self.assertContains(page, f'id="add-to-cart-form-{self.other.pk}"')
+        self.assertEqual(get_product(self.sold.pk).stock, 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_product(self.other.pk).stock, 100)
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        self.teak = Product.objects.create(
+            name="กรอบรูปไม้สัก", description="Golden frame for wedding photos", price=Decimal('10.00'), stock=1,
+        )
+        self.glass = Product.objects.create(
+            name="Glass frame", description="กรอบกระจกใส", price=Decimal('10.00'), stock=1,
+        )
+
+    def _search(self, query):
+        return list(search_products(Product.objects.all(), query))
+
+    def test_thai_bigrams_match_inside_words(self):
+        self.assertEqual(self._search("รูปไม้"), [self.teak])
+        self.assertEqual(self._search("กรอบ"), [self.teak, self.glass])  # ตรงในชื่อได้คะแนนมากกว่า
+        self.assertEqual(self._search("ไม้กระจก"), [])
+
+    def test_english_prefixes_and_every_term_required(self):
+        self.assertEqual(self._search("Gol"), [self.teak])
+        self.assertEqual(self._search("FRAME gla"), [self.glass])
+        self.assertEqual(self._search("frame plastic"), [])
+
+    def test_single_character_query_falls_back_to_scan(self):
+        self.assertEqual(self._search("w"), [self.teak])
+        self.assertEqual(self._search("ม"), [self.teak])
+
+        response = self.client.get(reverse('product_list'), {'q': 'g'})
+        self.assertEqual(list(response.context['products']), [self.glass, self.teak])
+
+
+class ProductImageVariantTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+
+    def _png(self, color):
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (400, 300), color).save(buffer, 'PNG')
+        return ContentFile(buffer.getvalue())
+
+    def test_variant_dir_is_keyed_on_the_full_source_name(self):
+        names = ['products/a/photo.jpg', 'products/b/photo.jpg', 'products/a/photo.png']
+        self.assertEqual(len({variant_dir(name) for name in names}), 3)
+
+    def test_products_with_same_file_name_keep_their_own_variants(self):
+        products = []
+        for color in ('red', 'blue'):
+            product = Product(name=color, description="-", price=Decimal('10.00'), stock=1)
+            product.image.save('photo.png', self._png(color), save=False)
+            product.save()
+            products.append(product)
+
+        dirs = {product.image_variants['dir'] for product in products}
+        self.assertEqual(len(dirs), 2)
+        for product in products:
+            self.assertEqual(product.image_variants['widths'], [320, 400])
+            self.assertTrue(variant_storage().exists(f"{product.image_variants['dir']}/320.webp"))
+
+
+class CartSummaryTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name="กรอบ", description="-", price=Decimal('10.00'), stock=10)
+        self.cart = Cart.objects.create()
+        CartItem.objects.create(cart=self.cart, product=self.product, quantity=3)
+        self.cart.refresh_summary()
+
+    def test_only_price_changes_refresh_cart_summaries(self):
+        # ทำให้ยอดสรุปผิดไว้ก่อน ถ้าถูกคำนวณใหม่จะเห็นได้ทันที
+        Cart.objects.filter(pk=self.cart.pk).update(subtotal=0)
+        self.product.name = "กรอบใหม่"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.subtotal, 0)
+
+        self.product.price = Decimal('12.50')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        self.cart.refresh_from_db()
+        self.assertEqual((self.cart.subtotal, self.cart.item_count), (Decimal('37.50'), 3))
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product = Product.objects.create(name="กรอบเดิม", description="-", price=Decimal('10.00'), stock=5)
+        catalog_cache.bump()
+
+    def test_pages_are_cached_until_a_product_changes(self):
+        detail = reverse('product_detail', args=[self.product.pk])
+        # หน้ารายการอ่านสต็อกล่าสุด 1 query นอกนั้นมาจาก cache
+        for url, queries in ((reverse('product_list'), 1), (detail, 0)):
+            self.client.get(url)
+            with self.assertNumQueries(queries):
+                self.assertContains(self.client.get(url), "กรอบเดิม")
+
+        self.product.name = "กรอบใหม่"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+
+        for url in (reverse('product_list'), detail):
+            response = self.client.get(url)
+            self.assertContains(response, "กรอบใหม่")
+            self.assertNotContains(response, "กรอบเดิม")
+
+
+class GuestCartMergeTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='buyer', password='secret')
+        self.products = [
+            Product.objects.create(name=f"สินค้า {i}", description="-", price=Decimal('10.00'), stock=100)
+            for i in range(10)
+        ]
+
+    def _carts(self, lines):
+        guest = Cart.objects.create(session_key='guest')
+        cart, _ = Cart.objects.get_or_create(user=self.user)
+        CartItem.objects.filter(cart=cart).delete()
+        # ตะกร้าของ user มีสินค้าชิ้นแรกอยู่แล้ว 1 ชิ้น
+        CartItem.objects.create(cart=cart, product=self.products[0], quantity=1)
+        for product in self.products[:lines]:
+            CartItem.objects.create(cart=guest, product=product, quantity=2)
+        return guest, cart
+
+    def _merge_queries(self, lines):
+        guest, cart = self._carts(lines)
+        with CaptureQueriesContext(connection) as ctx:
+            merge.merge_carts(guest, cart)
+        return len(ctx)
+
+    def test_merge_upserts_in_constant_queries(self):
+        self.assertEqual(self._merge_queries(1), self._merge_queries(10))
+
+    def test_login_merges_guest_cart_into_existing_lines(self):
+        guest, cart = self._carts(3)
+        session = self.client.session
+        session[merge.SESSION_KEY] = guest.pk
+        session.save()
+
+        self.client.post(reverse('login'), {'username': 'buyer', 'password': 'secret'})
+
+        self.assertFalse(Cart.objects.filter(pk=guest.pk).exists())
+        quantities = dict(CartItem.objects.filter(cart=cart).values_list('product_id', 'quantity'))
+        self.assertEqual(quantities, {self.products[0].pk: 3, self.products[1].pk: 2, self.products[2].pk: 2})
+        cart.refresh_from_db()
+        self.assertEqual((cart.item_count, cart.subtotal), (7, Decimal('70.00')))
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db')
+class StaleCartPurgeTests(TestCase):
+    def test_purge_deletes_only_abandoned_guest_carts_and_expired_sessions(self):
+        from django.contrib.sessions.models import Session
+
+        now = timezone.now()
+        product = Product.objects.create(name="กรอบ", description="-", price=Decimal('10.00'), stock=10)
+        Session.objects.create(session_key='live', session_data='', expire_date=now + timedelta(days=1))
+        Session.objects.create(session_key='expired', session_data='', expire_date=now - timedelta(days=1))
+        live = Cart.objects.create(session_key='live')
+        owned = Cart.objects.create(user=get_user_model().objects.create_user(username='buyer', password='x'))
+        stale = [Cart.objects.create(session_key=key) for key in ('expired', 'gone-1', 'gone-2')]
+        for cart in stale:
+            CartItem.objects.create(cart=cart, product=product, quantity=1)
+
+        # ชุดละ 2 แถว: ตะกร้าที่ค้าง 3 ใบต้องถูกลบข้ามชุด
+        deleted = cleanup.purge(batch_size=2, pause=0, now=now)
+
+        self.assertEqual(deleted['cart.Cart'], 3)
+        self.assertEqual(deleted['cart.CartItem'], 3)
+        self.assertEqual(deleted['sessions.Session'], 1)
+        self.assertEqual(set(Cart.objects.values_list('pk', flat=True)), {live.pk, owned.pk})
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+
+
+    def test_cart_revived_between_select_and_delete_is_kept(self):
+        from django.contrib.sessions.models import Session
+
+        now = timezone.now()
+        session = Session.objects.create(session_key='renewing', session_data='', expire_date=now - timedelta(minutes=1))
+        revived = Cart.objects.create(session_key='renewing')
+        stale = Cart.objects.create(session_key='gone')
+
+        # ลูกค้ากลับมาเปิดเว็บ (session ถูกต่ออายุ) หลังอ่าน pk ของชุดนี้ไปแล้ว แต่ก่อนสั่งลบ
+        revive = {'pending': True}
+
+        def renew_after_select(execute, sql, params, many, context):
+            result = execute(sql, params, many, context)
+            if revive['pending'] and 'LIMIT' in sql:
+                revive['pending'] = False
+                Session.objects.filter(pk=session.pk).update(expire_date=now + timedelta(days=1))
+            return result
+
+        with connection.execute_wrapper(renew_after_select):
+            deleted = cleanup.delete_in_batches(cleanup.stale_guest_carts(now), batch_size=10, pause=0)
+
+        self.assertFalse(revive['pending'])
+        self.assertEqual(deleted['cart.Cart'], 1)
+        self.assertEqual(list(Cart.objects.values_list('pk', flat=True)), [revived.pk])
+        self.assertFalse(Cart.objects.filter(pk=stale.pk).exists())
+
+class OrderHistoryQueryTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='buyer', password='secret')
+        self.client.force_login(self.user)
+        self.product = Product.objects.create(name="กรอบ", description="-", price=Decimal('10.00'), stock=100)
+
+    def _add_orders(self, count):
+        for _ in range(count):
+            order = Order.objects.create(customer=self.user, total_price=Decimal('20.00'))
+            OrderItem.objects.create(order=order, product=self.product, quantity=2, price=Decimal('10.00'))
+
+    def _history_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('order_history', args=['products']))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx)
+
+    def test_query_count_does_not_grow_with_order_count(self):
+        self._add_orders(1)
+        # request แรกนับ badge ตะกร้าแล้วเขียนลง session ไม่เกี่ยวกับจำนวนออเดอร์
+        self._history_queries()
+        single = self._history_queries()
+        self._add_orders(9)
+        with self.assertNumQueries(single):
+            self.client.get(reverse('order_history', args=['products']))
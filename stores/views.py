@@ -1,37 +1,60 @@
-from decimal import Decimal
+import hashlib
 
 # --- Django Imports ---
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse_lazy
 from django.views import View
+from django.http import Http404
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView
 from django.db import transaction
+from django.db.models import Prefetch
+from django.core.exceptions import ValidationError
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.utils.decorators import method_decorator
 from django.views.decorators.http import require_POST
-from django.db.models import Q
 
 # --- Project Imports ---
 from .models import Product, Category, Order, OrderItem
 from .forms import ProductForm, CategoryForm
+from .search import search_products
+from .catalog import get_categories, get_product, get_product_page
+from .inventory import OutOfStock, decrement_stock
 from cart.models import Cart, CartItem
+from cart import badge
+from core.pagination import CURSOR_PARAM, KeysetPaginationMixin
+from core.uploads import normalize_image_upload
+from core import pricing
 
 # ==========================================
 # 🛒 ส่วนของลูกค้า (Customer Views)
 # ==========================================
 
 # 1. หน้าแสดงสินค้าทั้งหมด
-class ProductListView(ListView):
+class ProductListView(KeysetPaginationMixin, ListView):
     model = Product
     template_name = 'stores/product_list.html'
     context_object_name = 'products'
+    paginate_by = 20
+    json_fields = ('id', 'name', 'price', 'stock', 'image', 'category_id')
+
+    def get_keyset_ordering(self):
+        # ถ้ามีการค้นหา ให้เรียงตามความเกี่ยวข้องแทนเวลาสร้าง
+        if self.request.GET.get('q'):
+            return ('-search_rank', '-id')
+        return super().get_keyset_ordering()
+
+    def get_keyset_page(self, queryset, page_size):
+        # หน้ารายการสินค้าอ่านจาก cache ของแคตตาล็อก (แยก key ตามตัวกรอง + cursor)
+        params = [self.request.GET.get(name, '') for name in ('category', 'q', CURSOR_PARAM)]
+        name = hashlib.md5('|'.join(params + [str(page_size)]).encode()).hexdigest()
+        return get_product_page(name, lambda: super(ProductListView, self).get_keyset_page(queryset, page_size))
 
     def get_context_data(self, **kwargs):
         # เพิ่มข้อมูลหมวดหมู่ทั้งหมดไปที่ template เพื่อเอาไปวนลูปสร้างแท็บ
         context = super().get_context_data(**kwargs)
-        context['categories'] = Category.objects.all() 
+        context['categories'] = get_categories()
         return context
 
     def get_queryset(self):
@@ -42,13 +65,10 @@ class ProductListView(ListView):
         if category_id:
             queryset = queryset.filter(category_id=category_id)
 
-        # 2. กรองตามคำค้นหา (Search)
+        # 2. กรองตามคำค้นหา (Search) ผ่าน index และเรียงตามความเกี่ยวข้อง
         query = self.request.GET.get('q')
         if query:
-            queryset = queryset.filter(
-                Q(name__icontains=query) | 
-                Q(description__icontains=query)
-            )
+            queryset = search_products(queryset, query)
             
         return queryset
 
@@ -58,70 +78,79 @@ class ProductDetailView(DetailView):
     template_name = 'stores/product_detail.html'
     context_object_name = 'product'
 
+    def get_object(self, queryset=None):
+        product = get_product(self.kwargs['pk'])
+        if product is None:
+            raise Http404("ไม่พบสินค้า")
+        return product
+
 
 # 2. ฟังก์ชันสั่งซื้อสินค้าจากตะกร้า (Checkout Cart)
 @login_required(login_url='login')
 def cart_checkout(request):
-    # 2.1 ดึงข้อมูลตะกร้า
-    try:
-        cart = Cart.objects.get(user=request.user)
-        cart_items = CartItem.objects.filter(cart=cart)
-    except Cart.DoesNotExist:
-        cart = None
-        cart_items = []
+    # 2.1 ดึงรายการในตะกร้าพร้อมข้อมูลสินค้าในคำสั่งเดียว (ไม่ต้องดึง product ทีละรายการ)
+    cart_items = list(
+        CartItem.objects.filter(cart__user=request.user).select_related('product')
+    )
 
     if not cart_items:
-        return redirect('product-list') # หรือ 'home'
+        return redirect('product_list') # หรือ 'home'
 
-    # 2.2 คำนวณราคารวมสินค้า (Subtotal)
-    total_price = sum(item.product.price * item.quantity for item in cart_items)
+    # 2.2 คำนวณราคารวมสินค้า (Subtotal) ในฐานข้อมูล
+    total_price = CartItem.objects.filter(pk__in=[item.pk for item in cart_items]).totals()['subtotal']
 
     if request.method == 'POST':
         shipping_method = request.POST.get('shipping_method')
-        payment_slip = request.FILES.get('payment_slip')
-        
-        # คำนวณค่าส่ง
-        shipping_cost = 0
-        if shipping_method == 'standard':
-            shipping_cost = 50
-        elif shipping_method == 'express':
-            shipping_cost = 100
+
+        # ย่อ/บีบอัดสลิป และตัด EXIF ก่อนบันทึก (ดู core/uploads.py)
+        try:
+            payment_slip = normalize_image_upload(request.FILES.get('payment_slip'))
+        except ValidationError as e:
+            messages.error(request, e.messages[0])
+            return redirect('cart_checkout')
         
-        grand_total = total_price + shipping_cost
+        # คำนวณค่าส่ง + ยอดสุทธิ (ดู core/pricing.py)
+        quote = pricing.quote_subtotal("สินค้าในตะกร้า", total_price, shipping_method)
+        shipping_cost = quote['shipping']
+        grand_total = quote['total']
 
-        # ใช้ transaction เพื่อความปลอดภัย (Create Order + Create Items + Cut Stock)
-        with transaction.atomic():
-            # 2.3 สร้าง Order (หัวบิล)
-            new_order = Order.objects.create(
-                customer=request.user,         # ⚠️ เช็ค models.py ว่าใช้ 'user' หรือ 'customer'
-                total_price=grand_total,
-                shipping_cost=shipping_cost,
-                shipping_method=shipping_method,
-                payment_slip=payment_slip,
-                status='pending'
-            )
-
-            # 2.4 ย้ายสินค้าจาก Cart -> OrderItem
-            for item in cart_items:
-                OrderItem.objects.create(
-                    order=new_order,
-                    product=item.product,
-                    quantity=item.quantity,
-                    price=item.product.price
+        # ใช้ transaction เพื่อความปลอดภัย (Cut Stock + Create Order + Create Items)
+        try:
+            with transaction.atomic():
+                # 2.3 ตัดสต็อกทั้งตะกร้าในครั้งเดียว ถ้ามีรายการไหนไม่พอจะไม่สร้างออเดอร์เลย
+                decrement_stock((item.product_id, item.quantity) for item in cart_items)
+
+                # 2.4 สร้าง Order (หัวบิล)
+                new_order = Order.objects.create(
+                    customer=request.user,         # ⚠️ เช็ค models.py ว่าใช้ 'user' หรือ 'customer'
+                    total_price=grand_total,
+                    shipping_cost=shipping_cost,
+                    shipping_method=shipping_method,
+                    payment_slip=payment_slip,
+                    status='pending'
                 )
-                
-                # ตัดสต็อกสินค้าทันที
-                if item.product.stock >= item.quantity:
-                    item.product.stock -= item.quantity
-                    item.product.save()
-                else:
-                    # กรณีของหมดกลางคัน (Optional: อาจจะ raise error หรือข้ามไป)
-                    pass
-
-            # 2.5 ล้างตะกร้า
-            cart_items.delete()
-            # cart.delete() # ถ้าต้องการลบตัวตะกร้าด้วย
 
+                # 2.5 ย้ายสินค้าจาก Cart -> OrderItem (INSERT ทีเดียวทั้งตะกร้า)
+                OrderItem.objects.bulk_create([
+                    OrderItem(
+                        order=new_order,
+                        product=item.product,
+                        quantity=item.quantity,
+                        price=item.product.price
+                    )
+                    for item in cart_items
+                ])
+
+                # 2.6 ล้างตะกร้า (ลบเฉพาะรายการที่สั่งไปแล้ว)
+                CartItem.objects.filter(pk__in=[item.pk for item in cart_items]).delete()
+                Cart.objects.filter(user=request.user).refresh_summary()
+                # cart.delete() # ถ้าต้องการลบตัวตะกร้าด้วย
+        except OutOfStock as e:
+            messages.error(request, str(e))
+            return redirect('cart:cart_detail')
+
+        # ตะกร้าว่างแล้ว (badge บน navbar อ่านค่าจาก session)
+        badge.clear(request)
         return redirect('store_order_success')
 
     context = {
@@ -149,7 +178,12 @@ class ProductCheckoutView(View):
             
         shipping_method = request.POST.get('shipping_method', 'pickup')
         payment_method = request.POST.get('payment_method', 'transfer')
-        payment_slip = request.FILES.get('payment_slip')
+
+        try:
+            payment_slip = normalize_image_upload(request.FILES.get('payment_slip'))
+        except ValidationError as e:
+            messages.error(request, e.messages[0])
+            return redirect('product_checkout', pk=pk)
 
         # Validate Stock
         if quantity < 1: quantity = 1
@@ -157,38 +191,39 @@ class ProductCheckoutView(View):
             messages.error(request, f"สินค้าเหลือเพียง {product.stock} ชิ้น")
             return redirect('product_checkout', pk=pk)
 
-        # คำนวณราคา
-        shipping_cost = Decimal('0.00')
-        if shipping_method == 'standard': shipping_cost = Decimal('50.00')
-        elif shipping_method == 'express': shipping_cost = Decimal('100.00')
-
+        # คำนวณราคา (ดู core/pricing.py)
+        quote = pricing.quote_product(product, quantity, shipping_method)
         unit_price = product.price
-        total_price = (unit_price * quantity) + shipping_cost
+        shipping_cost = quote['shipping']
+        total_price = quote['total']
 
         # บันทึกลง Database
-        with transaction.atomic():
-            # สร้าง Order
-            order = Order.objects.create(
-                customer=request.user,      # ⚠️ เช็ค models.py ว่าใช้ 'user' หรือ 'customer'
-                shipping_method=shipping_method,
-                shipping_cost=shipping_cost,
-                total_price=total_price,
-                payment_method=payment_method,
-                payment_slip=payment_slip,
-                status='pending'
-            )
-
-            # สร้าง OrderItem
-            OrderItem.objects.create(
-                order=order,
-                product=product,
-                quantity=quantity,
-                price=unit_price
-            )
-
-            # ตัด Stock
-            product.stock -= quantity
-            product.save()
+        try:
+            with transaction.atomic():
+                # ตัด Stock แบบมีเงื่อนไข (กันสั่งพร้อมกันจนขายเกินสต็อก)
+                decrement_stock([(product.pk, quantity)])
+
+                # สร้าง Order
+                order = Order.objects.create(
+                    customer=request.user,      # ⚠️ เช็ค models.py ว่าใช้ 'user' หรือ 'customer'
+                    shipping_method=shipping_method,
+                    shipping_cost=shipping_cost,
+                    total_price=total_price,
+                    payment_method=payment_method,
+                    payment_slip=payment_slip,
+                    status='pending'
+                )
+
+                # สร้าง OrderItem
+                OrderItem.objects.create(
+                    order=order,
+                    product=product,
+                    quantity=quantity,
+                    price=unit_price
+                )
+        except OutOfStock as e:
+            messages.error(request, str(e))
+            return redirect('product_checkout', pk=pk)
 
         messages.success(request, "สั่งซื้อสำเร็จ! กรุณารอการตรวจสอบ")
         return redirect('store_order_success')
@@ -213,10 +248,15 @@ class AdminRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
         return self.request.user.is_staff
 
 # --- จัดการสินค้า (Product) ---
-class ProductManageListView(AdminRequiredMixin, ListView):
+class ProductManageListView(AdminRequiredMixin, KeysetPaginationMixin, ListView):
     model = Product
     template_name = 'stores/admin/product_manage_list.html'
     context_object_name = 'products'
+    paginate_by = 50
+    json_fields = ('id', 'name', 'price', 'stock', 'category_id', 'created_at', 'updated_at')
+
+    def get_queryset(self):
+        return super().get_queryset().select_related('category', 'created_by', 'updated_by')
 
 class ProductCreateView(AdminRequiredMixin, CreateView):
     model = Product
@@ -244,10 +284,12 @@ class ProductDeleteView(AdminRequiredMixin, DeleteView):
     success_url = reverse_lazy('product-manage-list')
 
 # --- จัดการหมวดหมู่ (Category) ---
-class CategoryManageListView(AdminRequiredMixin, ListView):
+class CategoryManageListView(AdminRequiredMixin, KeysetPaginationMixin, ListView):
     model = Category
     template_name = 'stores/admin/category_manage_list.html'
     context_object_name = 'categories'
+    paginate_by = 50
+    json_fields = ('id', 'name', 'slug', 'created_at', 'updated_at')
 
 class CategoryCreateView(AdminRequiredMixin, CreateView):
     model = Category
@@ -275,11 +317,19 @@ class CategoryDeleteView(AdminRequiredMixin, DeleteView):
     success_url = reverse_lazy('category-manage-list')
 
 # --- จัดการคำสั่งซื้อ (Order) ---
-class OrderManageListView(AdminRequiredMixin, ListView):
+class OrderManageListView(AdminRequiredMixin, KeysetPaginationMixin, ListView):
     model = Order
     template_name = 'stores/admin/order_list.html'
     context_object_name = 'orders'
-    ordering = ['-created_at']
+    paginate_by = 50
+    json_fields = ('id', 'customer_id', 'customer_name', 'total_price', 'shipping_method', 'status', 'created_at')
+
+    def get_queryset(self):
+        # ชื่อ/เบอร์/ที่อยู่อ่านจาก snapshot ในแถวออเดอร์, username/email มากับ JOIN
+        # รายการสินค้า + สินค้าดึงทีเดียวทั้งหน้า (รวมทั้งหน้าใช้ query คงที่ ไม่ขึ้นกับจำนวนออเดอร์)
+        return Order.objects.select_related('customer').prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.select_related('product').order_by('pk'))
+        )
 
 # ฟังก์ชันอัปเดตสถานะ (Admin)
 @require_POST
@@ -294,7 +344,9 @@ def admin_update_order_status(request, pk):
     valid_status = dict(Order.STATUS_CHOICES).keys()
     if new_status in valid_status:
         order.status = new_status
-        order.save()
+        # บันทึกสถานะกับประวัติสถานะ (signal) ใน transaction เดียวกัน
+        with transaction.atomic():
+            order.save()
         messages.success(request, f"อัปเดตสถานะออเดอร์ #{order.id} เรียบร้อยแล้ว")
     else:
         messages.error(request, "ค่าสถานะไม่ถูกต้อง")